@@ -1,18 +1,20 @@
-from datetime import datetime
-import json
-from typing import List
+import asyncio
+import base64
+import itertools
+import time
 
 import logging
-from datetime import datetime
-from typing import Any, Dict, Optional, List
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, List, Tuple
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Request, HTTPException, BackgroundTasks
-from starlette.responses import PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi import Query
 from fastapi.encoders import jsonable_encoder
 from sqlmodel import select, Session
+from sqlalchemy import and_, func, or_
 
 from .database import get_session
-from .models import Message, Feedback, AdminNotice, Contact, FeedbackAssignment, ZoneConfig, Approval, ReplyTemplate
+from .models import Message, OutboundMessage, Feedback, AdminNotice, Contact, FeedbackAssignment, ZoneConfig, Approval, ReplyTemplate, HeatmapSnapshot
 from .schemas import (
     WebhookMessage,
     MessageOut,
@@ -21,6 +23,8 @@ from .schemas import (
     FeedbackIn,
     FeedbackOut,
     FeedbackListOut,
+    FeedbackWithAssigneeOut,
+    SearchOut,
     NoticeIn,
     NoticeOut,
     TranslateIn,
@@ -47,21 +51,36 @@ from .schemas import (
     AgentInvokeOut,
     ApprovalOut,
     ApprovalDecisionIn,
+    ApprovalBatchDecisionIn,
+    ApprovalBatchDecisionOut,
+    ReplyCacheEntryOut,
+    AgentBatchIn,
+    AgentBatchItemOut,
+    ReplyCacheDecisionIn,
     RequestLocationIn,
     SendLocationPinIn,
+    RouteClosureIn,
 )
-from .services.language import detect_language
-from .services.samwad import send_via_samwad, send_location_pin, request_location
-from .services.ai import generate_reply, translate as ai_translate, classify_intent as ai_classify_intent, summarize_conversation as ai_summarize
+from .services.language import detect_language, TEMPLATE_LANGUAGE
+from .services.samwad import send_location_pin, request_location
+from .services.geo import zone_for_point, reload_index as reload_zone_index
+from .services.text import TextFeatures, analyze as analyze_text, DIGITS_RE
+from .services import archive, coalesce, delivery, export, knowledge, metrics, priority, ratelimit, routing, search
+from .services.conversation import get_state as get_conversation_state
+from .services.summaries import get_summary as get_conversation_summary
+from .services.reply_cache import cache as reply_cache
+from .services.tools import ToolArgError, ToolRegistry, ToolSpec
+from .services.approvals import approval_queue
+from .services.heatmap import aggregator as heatmap, cells_payload, WINDOWS_MINUTES
+from .services.ai import generate_reply, translate as ai_translate, classify_intent as ai_classify_intent, usage_stats as ai_usage_stats
 from .config import get_settings
 from .database import engine
 from sqlmodel import Session as DBSession
 from .websocket_manager import manager
-import httpx
 import mimetypes
 from urllib.parse import urlparse, quote_plus
-import re
 import json as _json
+import orjson
 
 
 router = APIRouter()
@@ -216,35 +235,50 @@ def _normalize_webhook(data: Dict[str, Any]) -> WebhookMessage:
     return WebhookMessage(**norm)
 
 
-async def _auto_reply_task(phone_number: str, body: str) -> None:
+async def _llm_reply(body: str, language: Optional[str], context: Optional[List[str]] = None) -> str:
+    """LLM reply, reusing a cached reply to a near-duplicate question when there is one."""
+    if settings.REPLY_CACHE_ENABLED:
+        cached = reply_cache.lookup(body, language)
+        if cached:
+            return cached
+    reply, _raw = await generate_reply(body, company=settings.APP_NAME, context=context)
+    if reply and settings.REPLY_CACHE_ENABLED:
+        reply_cache.store(body, language, reply)
+    return reply
+
+
+@metrics.track_inflight("auto_reply")
+async def _auto_reply_task(phone_number: str, body: str, features: Optional[TextFeatures] = None) -> None:
     try:
+        f = features or analyze_text(body)
         # Classify to decide if we should use a crisp civic template
         intent_res, _r = await ai_classify_intent(body)
         intent = (intent_res.get("intent") or "").lower()
         conf = float(intent_res.get("confidence") or 0)
-        zone = _resolve_zone(phone_number, body)
-        # Heuristic override for POC consistency
-        def _hi(txt: str) -> Optional[str]:
-            t = txt.lower()
-            # Guidance first (e.g., lost my way)
-            if any(k in t for k in [
-                "how to reach", "how do i get", "route", "directions", "raasta", "rasta",
-                "kaise pahu", "kaise pahun", "kaise jaa", "lost my way", "lost way", "rasta bhool"
-            ]):
-                return "guidance"
-            # Lost & found only if an item mentioned
-            if any(k in t for k in ["wallet", "purse", "phone", "mobile", "bag", "keys", "id card", "aadhaar", "pan card"]) or \
-               any(k in t for k in ["kho gaya", "kho gyi", "gum gaya", "stolen", "missing item"]):
-                return "lost_found"
-            return None
-        hint = _hi(body)
-        if hint:
-            intent = hint
+        state = get_conversation_state(phone_number)
+        zone = _resolve_zone(phone_number, body, state.zone, features=f)
+        # Heuristic override for POC consistency (guidance first, lost & found only if an item is mentioned)
+        if f.hint:
+            intent = f.hint
             conf = max(conf, 0.8)
+        elif state.last_intent in {"guidance", "directions"} and intent in {"other", "info", ""} \
+                and f.destination and len(f.tokens) <= 4:
+            # Short follow-up naming the destination we asked for ("ghat 3")
+            intent = state.last_intent
+            conf = max(conf, 0.8)
+
+        guidance = intent in {"guidance", "directions"}
+        dest: Optional[str] = None
+        if guidance:
+            dest = f.destination or state.pending_destination
+            if zone and zone == f.zone and zone == dest:
+                # The only place named is where they want to go; start from what we know
+                zone = f.origin or _resolve_zone(phone_number, "", state.zone)
 
         reply_text: Optional[str] = None
+        reply_lang_llm = False
         requested_loc = False
-        if intent in {"guidance", "directions", "lost_found"} and not zone:
+        if intent in {"guidance", "directions", "lost_found"} and not zone and not state.location_requested:
             try:
                 await request_location(phone_number, "Please share your live location to assist you better")
                 requested_loc = True
@@ -254,62 +288,44 @@ async def _auto_reply_task(phone_number: str, body: str) -> None:
                 )
             except Exception:
                 pass
-        if intent in {"sanitation", "emergency", "guidance", "info", "directions", "lost_found"} and conf >= 0.4:
+        # Info questions: answer from the local knowledge base when a passage clearly matches
+        kb_answer: Optional[str] = None
+        kb_context: List[str] = []
+        if intent in {"info", "other", ""}:
+            kb_answer = knowledge.get_index().answer(body)
+            if not kb_answer and intent == "info":
+                kb_context = knowledge.context_passages(body)
+        if kb_answer:
+            reply_text = kb_answer
+        elif kb_context:
+            reply_text = await _llm_reply(body, state.language, kb_context)
+            reply_lang_llm = True
+        elif intent in {"sanitation", "emergency", "guidance", "info", "directions", "lost_found"} and conf >= 0.4:
             _structured = _compose_structured_reply2(intent=intent, zone=zone, original=body)
             if _structured:
                 reply_text = f"{reply_text}\n{_structured}" if reply_text else _structured
 
-        # Special case: guidance → generate steps
-        if intent in {"guidance", "directions"}:
-            dest = None
-            t = body.lower()
-            if "main ghat" in t:
-                dest = "Main Ghat"
-            else:
-                m = re.search(r"ghat\s*(\d{1,2})", t)
-                if m:
-                    dest = f"Ghat {m.group(1)}"
-            if zone or dest:
-                steps = []
-                if zone:
-                    steps = [
-                        f"Start at {zone}",
-                        "Walk ~200m to the main corridor",
-                        "Follow signs towards the plaza",
-                        f"Proceed to {dest or 'destination'}",
-                    ]
-                else:
-                    steps = [f"Head to nearest info kiosk and ask for directions to {dest or 'the venue'}"]
-                reply_text = " → ".join(steps)
-
-        # Special case: lost & found → register ticket and respond with ID
-        # Guidance/directions: ensure concrete destination and helpful prompt
-        if intent in {"guidance", "directions"}:
-            t2 = body.lower()
-            dest2: Optional[str] = None
-            if "main ghat" in t2:
-                dest2 = "Main Ghat"
-            else:
-                m = re.search(r"\bghat\s*(\d{1,2})\b", t2)
-                if m:
-                    dest2 = f"Ghat {m.group(1)}"
-                else:
-                    m2 = re.search(r"\b(zone|sector|gate)\s*([A-Za-z0-9-]{1,6})\b", t2)
-                    if m2:
-                        dest2 = f"{m2.group(1).title()} {m2.group(2)}"
-                    elif "ghat" in t2:
-                        dest2 = "Main Ghat"
-            if zone and dest2:
-                steps = [f"Start at {zone}", "Walk ~200m to the main corridor", "Follow signs towards the plaza", f"Proceed to {dest2}"]
-                st = " → ".join(steps)
-                reply_text = f"{reply_text}\n{st}" if reply_text and (st not in (reply_text or "")) else (reply_text or st)
-            elif zone and not dest2 and not requested_loc:
+        # Guidance/directions: route steps, or ask for the missing destination/location
+        route_sent = False
+        if guidance:
+            if dest:
+                state.update(pending_destination=dest)
+            if zone and dest:
+                reply_text = " → ".join(_route_steps(zone, dest))
+                route_sent = True
+            elif zone and not requested_loc:
                 ask = ("I can guide you. Which destination (ghat/gate/zone) should I route to? If unsure, please share your live location and I will send directions.")
                 reply_text = f"{reply_text}\n{ask}" if reply_text else ask
-            elif not zone and dest2:
-                st = f"Head to nearest info kiosk and ask for directions to {dest2}"
+            elif dest:
+                st = f"Head to nearest info kiosk and ask for directions to {dest}"
                 reply_text = f"{reply_text}\n{st}" if reply_text else st
 
+        state.update(
+            last_intent=intent or state.last_intent,
+            zone=zone or state.zone,
+            location_requested=state.location_requested or requested_loc,
+        )
+
         if intent == "lost_found":
             with DBSession(engine) as s:
                 fb = Feedback(
@@ -328,48 +344,46 @@ async def _auto_reply_task(phone_number: str, body: str) -> None:
                     f"Ticket ID: {fb.id}. Please share your contact number to reach you if found."
                 )
 
+        # Structured replies come from English templates; only LLM text needs detection
+        reply_lang: Optional[str] = None if reply_lang_llm else TEMPLATE_LANGUAGE
         # Fallback to LLM if we didn't produce a structured reply
         if not reply_text:
-            reply_text, _raw = await generate_reply(body, company=settings.APP_NAME)
+            reply_text = await _llm_reply(body, state.language, knowledge.context_passages(body))
+            reply_lang = None
         if not reply_text:
             return
 
-        _ = await send_via_samwad(phone_number, reply_text)
+        await delivery.send(phone_number, reply_text, zone=zone)
+        if route_sent:
+            # answered; later requests must name their own destination
+            state.update(pending_destination=None, location_requested=False)
         # persist and broadcast as admin message
         with DBSession(engine) as s:
             msg = Message(
                 phone_number=phone_number,
                 body=reply_text,
-                language=detect_language(reply_text),
+                language=reply_lang or detect_language(reply_text),
                 is_from_admin=True,
             )
             s.add(msg)
             s.commit()
             s.refresh(msg)
-            await manager.broadcast(json.dumps(jsonable_encoder({"type": "message", "data": MessageOut.model_validate(msg)})))
+            await manager.broadcast(jsonable_encoder({"type": "message", "data": MessageOut.model_validate(msg)}))
     except Exception as e:
         webhook_logger.warning("auto-reply failed phone=%s error=%s", phone_number, str(e))
 
 
-_zone_re = re.compile(r"\b(zone|sector|gate|ghat)\s*([A-Za-z0-9-]{1,6})\b", re.IGNORECASE)
-
-
-def _extract_zone(text: str) -> Optional[str]:
-    try:
-        m = _zone_re.search(text or "")
-        if m:
-            kind = m.group(1)
-            val = m.group(2)
-            return f"{kind.title()} {val}"
-    except Exception:
-        pass
-    return None
-
-
-def _resolve_zone(phone_number: str, body: str) -> Optional[str]:
-    z = _extract_zone(body)
-    if z:
-        return z
+def _resolve_zone(phone_number: str, body: str, known: Optional[str] = None, *,
+                  features: Optional[TextFeatures] = None) -> Optional[str]:
+    f = features or analyze_text(body)
+    if f.geo:
+        z = zone_for_point(*f.geo)
+        if z:
+            return z
+    if f.zone:
+        return f.zone
+    if known:
+        return known
     try:
         with DBSession(engine) as s:
             c = s.get(Contact, phone_number)
@@ -383,6 +397,19 @@ def _resolve_zone(phone_number: str, body: str) -> Optional[str]:
     return None
 
 
+def _remember_zone(session: Session, phone_number: str, zone: str) -> None:
+    """Persist a resolved zone on the contact so later lookups and zone broadcasts see it."""
+    c = session.get(Contact, phone_number)
+    if c is None:
+        c = Contact(phone_number=phone_number, zone=zone)
+    elif c.zone == zone:
+        return
+    else:
+        c.zone = zone
+    session.add(c)
+    session.commit()
+
+
 def _resolve_etas(zone: Optional[str]) -> tuple[int, int]:
     se = settings.SANITATION_ETA_MINUTES
     me = settings.MEDICAL_ETA_MINUTES
@@ -397,7 +424,7 @@ def _resolve_etas(zone: Optional[str]) -> tuple[int, int]:
                         me = cfg.medical_eta_minutes
                 else:
                     # Try numeric-only zone key and common labels
-                    m = re.search(r"(\d{1,3})", zone)
+                    m = DIGITS_RE.search(zone)
                     if m:
                         n = m.group(1)
                         for key in (n, f"Zone {n}", f"Sector {n}", f"Gate {n}", f"Ghat {n}"):
@@ -413,6 +440,25 @@ def _resolve_etas(zone: Optional[str]) -> tuple[int, int]:
     return se, me
 
 
+def _route_steps(origin: Optional[str], dest: str, *, point: Optional[tuple] = None) -> List[str]:
+    """Walking steps from the offline route graph, or generic guidance if it cannot route."""
+    route = routing.find_route(origin, dest, point=point)
+    if route:
+        return routing.route_steps(route)
+    return _fallback_steps(origin, dest)
+
+
+def _fallback_steps(origin: Optional[str], dest: str) -> List[str]:
+    if origin:
+        return [
+            f"Start at {origin}",
+            "Walk ~200m to the main corridor",
+            "Follow signs towards the plaza",
+            f"Proceed to {dest}",
+        ]
+    return [f"Head to nearest info kiosk and ask for directions to {dest}"]
+
+
 def _compose_structured_reply(*, intent: str, zone: Optional[str], original: str) -> str:
     ztxt = zone if zone else None
     if intent == "sanitation":
@@ -493,15 +539,229 @@ def list_zone_config(session: Session = Depends(get_session)):
     return rows
 
 
-async def _auto_classify_and_log_task(phone_number: str, body: str) -> None:
+# Admin: crowd-density heatmap
+@router.get("/api/admin/heatmap")
+async def heatmap_current(window: int = 15):
+    if window not in WINDOWS_MINUTES:
+        raise HTTPException(status_code=400, detail=f"window must be one of {list(WINDOWS_MINUTES)}")
+    return {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "window": window,
+        "precision": heatmap.precision,
+        "cells": cells_payload(heatmap.snapshot(window)),
+    }
+
+
+@router.get("/api/admin/heatmap/history")
+def heatmap_history(window: int = 15, since_hours: int = 6, session: Session = Depends(get_session)):
+    from datetime import timedelta
+
+    start = datetime.utcnow() - timedelta(hours=max(1, since_hours))
+    rows = session.exec(
+        select(HeatmapSnapshot)
+        .where(HeatmapSnapshot.taken_at >= start, HeatmapSnapshot.window_minutes == window)
+        .order_by(HeatmapSnapshot.taken_at.asc())
+    ).all()
+    snaps: Dict[str, Dict[str, int]] = {}
+    for r in rows:
+        snaps.setdefault(r.taken_at.isoformat() + "Z", {})[r.cell] = r.count
+    return {"window": window, "snapshots": [{"taken_at": k, "cells": cells_payload(v)} for k, v in snaps.items()]}
+
+
+# Admin: routing graph and edge closures (crowd control)
+@router.get("/api/admin/routes")
+def route_graph_info():
+    g = routing.get_graph()
+    return {
+        "loaded": g is not None,
+        "nodes": len(g.nodes) if g else 0,
+        "edges": len(g.edge_keys) if g else 0,
+        "closures": routing.list_closures(),
+    }
+
+
+@router.post("/api/admin/routes/closures")
+def set_route_closure(data: RouteClosureIn):
+    if not routing.set_closure(data.from_node, data.to_node, data.closed):
+        raise HTTPException(status_code=404, detail="edge_not_found")
+    webhook_logger.info("route edge %s-%s closed=%s", data.from_node, data.to_node, data.closed)
+    return {"status": "ok", "closures": routing.list_closures()}
+
+
+@router.post("/api/admin/routes/reload")
+def reload_routes():
+    g = routing.reload_graph()
+    return {"status": "ok", "loaded": g is not None, "nodes": len(g.nodes) if g else 0}
+
+
+# Admin: knowledge base (FAQs/schedules/SOPs used for info answers)
+@router.post("/api/admin/knowledge/reload")
+def reload_knowledge():
+    idx = knowledge.reload_index()
+    return {"status": "ok", "passages": len(idx.passages), "terms": len(idx.postings),
+            "schedule": len(idx.schedule or [])}
+
+
+@router.get("/api/admin/knowledge/search")
+def search_knowledge(q: str, k: int = Query(5, ge=1, le=20)):
+    idx = knowledge.get_index()
+    hits = idx.search(q, k)
+    return {
+        "answer": idx.answer(q),
+        "hits": [{"score": score, "coverage": round(cov, 2), "source": p.source, "title": p.title, "text": p.text}
+                 for score, cov, p in hits],
+    }
+
+
+@router.get("/api/admin/ratelimit")
+def ratelimit_stats():
+    return {**ratelimit.limiter.stats(), "coalesce": coalesce.debouncer.stats()}
+
+
+@router.get("/api/admin/priority")
+def priority_stats():
+    return priority.lane.stats()
+
+
+@router.get("/api/admin/delivery")
+def list_deliveries(status: Optional[str] = None, phone: Optional[str] = None, broadcast_id: Optional[int] = None,
+                    limit: int = Query(100, ge=1, le=1000), session: Session = Depends(get_session)):
+    q = select(OutboundMessage)
+    if status:
+        q = q.where(OutboundMessage.status == status)
+    if phone:
+        q = q.where(OutboundMessage.phone_number == phone)
+    if broadcast_id is not None:
+        q = q.where(OutboundMessage.broadcast_id == broadcast_id)
+    return session.exec(q.order_by(OutboundMessage.id.desc()).limit(limit)).all()
+
+
+# Delivery latency and failure rates per zone or per broadcast
+@router.get("/api/admin/delivery/stats")
+def delivery_stats(since_hours: int = Query(24, ge=1, le=24 * 60),
+                   by: str = Query("zone", pattern="^(zone|broadcast)$")):
+    since = datetime.utcnow() - timedelta(hours=since_hours)
+    return {"since": since, "by": by, "groups": delivery.stats(since, by)}
+
+
+@router.get("/api/admin/archive")
+def list_archive():
+    return {"hot_days": settings.ARCHIVE_HOT_DAYS, "partitions": [p.model_dump() for p in archive.partitions()]}
+
+
+@router.post("/api/admin/archive/run")
+async def run_archive():
+    moved = await archive.compact_now()
+    return {"status": "ok", "partitions": [p.model_dump() for p in moved]}
+
+
+# Streaming bulk export for end-of-shift handover; constant memory at any size
+@router.get("/api/admin/export/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    phone: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    zone: Optional[str] = None,
+):
+    if dataset not in export.COLUMNS:
+        raise HTTPException(status_code=404, detail="unknown_dataset")
+    try:
+        body = export.stream(dataset, format, since=since, until=until, phone=phone,
+                             category=category, status=status, zone=zone)
+    except export.ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(body, media_type=export.MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# Admin: reload zone polygons used to resolve shared locations
+@router.post("/api/admin/zones/reload")
+def reload_zones():
+    idx = reload_zone_index()
+    return {"status": "ok", "zones": [z.name for z in idx.zones], "cells": len(idx.cells)}
+
+
+def _emergency_text(zone: Optional[str], body: str) -> str:
+    return f"Emergency reported{(' in ' + zone) if zone else ''}: {body}\nPlease dispatch medical team."
+
+
+# Emergency lane: escalate first, then log and assign the ticket
+@metrics.track_inflight("emergency")
+async def _handle_emergency(job: priority.EmergencyJob) -> None:
+    zone = _resolve_zone(job.phone_number, job.body, features=job.features)
+    numbers = priority.escalation_numbers()
+    failed: List[str] = []
+    if numbers:
+        failed = await priority.escalate(numbers, _emergency_text(zone, job.body), zone=zone)
+        priority.lane.mark_dispatched(job)
+    with DBSession(engine) as s:
+        fb = Feedback(phone_number=job.phone_number, category="emergency", status="new", zone=zone,
+                      location=zone, message=job.body)
+        s.add(fb)
+        s.commit()
+        fb_id = job.feedback_id = fb.id
+        if settings.ASSIGNEE_EMERGENCY:
+            s.add(FeedbackAssignment(feedback_id=fb_id, assignee=settings.ASSIGNEE_EMERGENCY, note="auto-assigned"))
+            s.commit()
+    webhook_logger.info("emergency lane feedback id=%s zone=%s escalated=%d failed=%d dispatch_ms=%s",
+                        fb_id, zone or "-", len(numbers), len(failed),
+                        f"{job.dispatch_ms:.0f}" if job.dispatch_ms is not None else "-")
+
+
+priority.lane.handler = _handle_emergency
+
+
+# Feedback category for a classifier intent when a keyword-lane ticket turns out not to be an emergency
+_INTENT_CATEGORY = {"sanitation": "sanitation", "lost_found": "lost_found", "info": "info"}
+
+
+async def _recategorize_emergency(job: priority.EmergencyJob, intent: str, conf: float) -> None:
+    """Give a keyword-lane ticket the classifier's category when it confidently disagrees."""
+    if not intent or intent == "emergency" or conf < 0.4:
+        return
+    try:
+        await asyncio.wait_for(job.logged.wait(), timeout=60)
+    except asyncio.TimeoutError:
+        return
+    if job.feedback_id is None:
+        return
+    category = _INTENT_CATEGORY.get(intent, "other")
+    with DBSession(engine) as s:
+        fb = s.get(Feedback, job.feedback_id)
+        if fb is None or fb.category != "emergency":
+            return
+        fb.category = category
+        s.add(fb)
+        for a in s.exec(select(FeedbackAssignment).where(FeedbackAssignment.feedback_id == fb.id,
+                                                         FeedbackAssignment.note == "auto-assigned")).all():
+            s.delete(a)
+        if category == "sanitation" and settings.ASSIGNEE_SANITATION:
+            s.add(FeedbackAssignment(feedback_id=fb.id, assignee=settings.ASSIGNEE_SANITATION, note="auto-assigned"))
+        s.commit()
+    webhook_logger.info("emergency keyword hit recategorized feedback id=%s intent=%s conf=%.2f",
+                        job.feedback_id, intent, conf)
+
+
+@metrics.track_inflight("classify")
+async def _auto_classify_and_log_task(phone_number: str, body: str, features: Optional[TextFeatures] = None,
+                                      emergency: Optional[priority.EmergencyJob] = None) -> None:
     try:
         result, _raw = await ai_classify_intent(body)
         intent = (result.get("intent") or "").lower()
         conf = float(result.get("confidence") or 0)
+        if emergency is not None:
+            # the priority lane already escalated and logged this message
+            await _recategorize_emergency(emergency, intent, conf)
+            return
         # Only log for clear actionable categories
         # Only auto-log sanitation/emergency here to avoid double-logging.
         if intent in {"sanitation", "emergency"} and conf >= 0.4:
-            zone = _resolve_zone(phone_number, body)
+            zone = _resolve_zone(phone_number, body, features=features)
             with DBSession(engine) as s:
                 fb = Feedback(
                     phone_number=phone_number,
@@ -527,14 +787,7 @@ async def _auto_classify_and_log_task(phone_number: str, body: str) -> None:
                     s.commit()
                 # Auto-escalate for emergencies to configured numbers
                 if intent == "emergency":
-                    raw = (settings.ESCALATION_NUMBERS or "").strip()
-                    numbers = [n.strip() for n in raw.split(",") if n.strip()] if raw else []
-                    for pn in numbers:
-                        try:
-                            msg = f"Emergency reported{(' in ' + zone) if zone else ''}: {body}\nPlease dispatch medical team."
-                            _ = await send_via_samwad(pn, msg)
-                        except Exception:
-                            pass
+                    await priority.escalate(priority.escalation_numbers(), _emergency_text(zone, body), zone=zone)
                 webhook_logger.info(
                     "auto-logged feedback id=%s intent=%s conf=%.2f zone=%s",
                     fb.id, intent, conf, zone or "-",
@@ -546,7 +799,9 @@ async def _auto_classify_and_log_task(phone_number: str, body: str) -> None:
 
 
 @router.post("/whatsapp/webhook", response_model=MessageOut)
+@metrics.timed(metrics.WEBHOOK_SECONDS, status_label="status")
 async def whatsapp_webhook(request: Request, background: BackgroundTasks, session: Session = Depends(get_session)):
+    received_at = time.perf_counter()
     # Minimal, safe logging of incoming webhook
     client_ip = getattr(request.client, "host", "-")
     ua = request.headers.get("user-agent", "-")
@@ -572,7 +827,24 @@ async def whatsapp_webhook(request: Request, background: BackgroundTasks, sessio
 
     webhook_logger.info("received webhook ip=%s ua=%s payload=%s", client_ip, ua, data)
 
+    # Provider delivery/read receipts update the outbound ledger; they are not pilgrim messages
+    statuses = delivery.parse_statuses(data)
+    if statuses:
+        return JSONResponse({"status": "ok", "updated": delivery.ingest_statuses(statuses)})
+
     payload = _normalize_webhook(data)
+    # One text-analysis pass; every later stage reads these features
+    features = analyze_text(payload.body)
+    # Emergencies skip the LLM classifier and go straight to the priority lane
+    urgent = priority.is_emergency(features)
+    if urgent:
+        job = priority.EmergencyJob(payload.phone_number, payload.body, features, received_at)
+        priority.lane.submit(job)
+        # keyword hits can be false positives; the classifier gives those tickets their real category
+        background.add_task(_auto_classify_and_log_task, payload.phone_number, payload.body, features, job)
+    # Per-phone flood control: over the limit, text is coalesced into one deferred turn or shed
+    admitted = ratelimit.PROCESS if urgent else ratelimit.limiter.admit(payload.phone_number, payload.body)
+
     ts = payload.timestamp or datetime.utcnow()
     lang = detect_language(payload.body)
     msg = Message(
@@ -586,62 +858,108 @@ async def whatsapp_webhook(request: Request, background: BackgroundTasks, sessio
     session.commit()
     session.refresh(msg)
 
+    # Every stored message goes out live; the limiter only gates the AI stages
     await manager.broadcast(
-        json.dumps(
-            jsonable_encoder({
-                "type": "message",
-                "data": MessageOut.model_validate(msg),
-            })
-        )
+        jsonable_encoder({
+            "type": "message",
+            "data": MessageOut.model_validate(msg),
+        })
     )
 
+    # Feed the crowd-density heatmap (location shares and zone mentions); shed floods are left out
+    point = features.geo
+    if admitted == ratelimit.SHED:
+        pass
+    elif point:
+        heatmap.record_point(*point)
+    elif features.zone:
+        heatmap.record_zone(features.zone)
+
+    state = get_conversation_state(payload.phone_number)
+    state.update(language=lang)
+    if features.destination and (features.hint == "guidance" or "Ghat" in features.destination):
+        state.update(pending_destination=features.destination)
+
     # If user shared a geo location like "geo:lat,lng", reply with a Google Maps link
     try:
-        if isinstance(payload.body, str) and payload.body.startswith("geo:"):
-            coords = payload.body.split(":", 1)[1]
-            lat, lng = coords.split(",", 1)
-            # Infer destination from recent messages (simple heuristic)
-            dest = "Main Ghat"
-            prev = session.exec(
-                select(Message)
-                .where(Message.phone_number == payload.phone_number)
-                .order_by(Message.timestamp.desc())
-            ).all()
-            txtblob = "\n".join([p.body or "" for p in prev[:5]])
-            t = (txtblob or "").lower()
-            if "main ghat" in t:
-                dest = "Main Ghat"
-            else:
-                m = re.search(r"ghat\s*(\d{1,2})", t)
-                if m:
-                    dest = f"Ghat {m.group(1)}"
+        if point:
+            lat, lng = point
+            cur_zone = zone_for_point(lat, lng)
+            if cur_zone:
+                _remember_zone(session, payload.phone_number, cur_zone)
+            # Destination the pilgrim asked for earlier in this conversation
+            dest = state.pending_destination or "Main Ghat"
+            state.update(zone=cur_zone or state.zone, location_requested=False, pending_destination=None)
             link = f"https://www.google.com/maps/dir/?api=1&origin={lat},{lng}&destination={quote_plus(dest)}"
-            gm_reply = f"Thanks for the location. Open directions to {dest}: {link}"
-            _ = await send_via_samwad(payload.phone_number, gm_reply)
+            where = f" You are in {cur_zone}." if cur_zone else ""
+            route = routing.find_route(None, dest, point=(lat, lng))
+            if route:
+                gm_reply = f"Thanks for the location.{where} Route to {dest}: " + " → ".join(routing.route_steps(route)) + f"\nMap: {link}"
+            else:
+                gm_reply = f"Thanks for the location.{where} Open directions to {dest}: {link}"
+            await delivery.send(payload.phone_number, gm_reply, zone=cur_zone)
             msg2 = Message(
                 phone_number=payload.phone_number,
                 body=gm_reply,
-                language=detect_language(gm_reply),
+                language=TEMPLATE_LANGUAGE,
                 is_from_admin=True,
             )
             session.add(msg2)
             session.commit()
             session.refresh(msg2)
             await manager.broadcast(
-                json.dumps(jsonable_encoder({"type": "message", "data": MessageOut.model_validate(msg2)}))
+                jsonable_encoder({"type": "message", "data": MessageOut.model_validate(msg2)})
             )
     except Exception:
         pass
 
-    # Always trigger auto classify/log/assign in background
-    background.add_task(_auto_classify_and_log_task, payload.phone_number, payload.body)
+    if admitted != ratelimit.PROCESS:
+        return msg
+
+    # Quick follow-ups ("hello", "zone 4", "toilet dirty") become one turn; location shares answer at once
+    if settings.COALESCE_ENABLED and not point:
+        coalesce.debouncer.add(payload.phone_number, payload.body, urgent=urgent)
+        return msg
+
+    # Classify/log/assign in background (urgent messages were handed to the classifier above)
+    if not urgent:
+        background.add_task(_auto_classify_and_log_task, payload.phone_number, payload.body, features)
 
     # Optionally trigger AI auto-reply for pilgrim messages
     if settings.AI_AUTOREPLY:
-        background.add_task(_auto_reply_task, payload.phone_number, payload.body)
+        background.add_task(_auto_reply_task, payload.phone_number, payload.body, features)
     return msg
 
 
+# One logical turn: reply over the joined text of the messages it covers; only the
+# non-urgent ones are classified here (the webhook already classified urgent ones)
+async def _process_turn(phone_number: str, body: str, count: int, plain: str) -> None:
+    features = analyze_text(body)
+    tasks = []
+    if plain:
+        tasks.append(_auto_classify_and_log_task(phone_number, plain, features if plain == body else None))
+    if settings.AI_AUTOREPLY:
+        tasks.append(_auto_reply_task(phone_number, body, features))
+    await asyncio.gather(*tasks)
+
+
+# Flush of messages the limiter held back (already stored and broadcast): process them as one turn
+async def _process_coalesced(phone_number: str, body: str, count: int) -> None:
+    if settings.COALESCE_ENABLED:
+        coalesce.debouncer.add(phone_number, body, count=count)
+    else:
+        await _process_turn(phone_number, body, count, body)
+
+
+coalesce.debouncer.processor = _process_turn
+ratelimit.limiter.processor = _process_coalesced
+
+metrics.QUEUE_DEPTH.set_function(approval_queue.depth, queue="approvals")
+metrics.QUEUE_DEPTH.set_function(priority.lane.depth, queue="emergency")
+metrics.QUEUE_DEPTH.set_function(coalesce.debouncer.depth, queue="coalesce_turns")
+metrics.QUEUE_DEPTH.set_function(ratelimit.limiter.depth, queue="ratelimit_flushes")
+
+
 @router.get("/whatsapp/webhook")
 async def whatsapp_webhook_verify(
     hub_mode: Optional[str] = Query(default=None, alias="hub.mode"),
@@ -655,24 +973,40 @@ async def whatsapp_webhook_verify(
     return PlainTextResponse("ok")
 
 
+# Message ids are the sync sequence: ?since=<last_id> returns only newer messages.
+# Both read the archived days as well as the hot table.
 @router.get("/api/messages", response_model=MessagesResponse)
-def list_messages(session: Session = Depends(get_session)):
-    results: List[Message] = session.exec(select(Message).order_by(Message.timestamp.asc())).all()
-    return {"messages": [MessageOut.model_validate(r) for r in results]}
+def list_messages(since: Optional[int] = None, limit: Optional[int] = Query(None, ge=1, le=10000)):
+    if since is None and limit is None:
+        results = list(archive.iter_messages())
+        last_id = max((r["id"] for r in results), default=None)
+        return {"messages": results, "last_id": last_id}
+    results = archive.messages_after(since or 0, limit=limit + 1 if limit else None)
+    has_more = bool(limit) and len(results) > limit
+    results = results[:limit] if limit else results
+    last_id = results[-1]["id"] if results else since
+    return {"messages": results, "last_id": last_id, "has_more": has_more}
+
+
+# Full history across the hot table and the daily archive files, routed by time range
+@router.get("/api/messages/history", response_model=MessagesResponse)
+def list_message_history(since: Optional[datetime] = None, until: Optional[datetime] = None,
+                         phone: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000)):
+    results = list(itertools.islice(archive.iter_messages(since, until, phone), limit + 1))
+    has_more = len(results) > limit
+    results = results[:limit]
+    return {"messages": results, "has_more": has_more}
 
 
 @router.get("/api/messages/by_phone/{phone_number}", response_model=MessagesResponse)
-def list_messages_by_phone(phone_number: str, session: Session = Depends(get_session)):
-    results: List[Message] = session.exec(
-        select(Message).where(Message.phone_number == phone_number).order_by(Message.timestamp.asc())
-    ).all()
-    return {"messages": [MessageOut.model_validate(r) for r in results]}
+def list_messages_by_phone(phone_number: str):
+    return {"messages": list(archive.iter_messages(phone=phone_number))}
 
 
 @router.post("/api/reply", response_model=MessageOut)
 async def send_reply(data: SendReplyIn, session: Session = Depends(get_session)):
     # Send to external API (stubbed)
-    _ = await send_via_samwad(data.phone_number, data.body)
+    await delivery.send(data.phone_number, data.body, zone=get_conversation_state(data.phone_number).zone)
 
     # Store outgoing message
     msg = Message(
@@ -687,12 +1021,10 @@ async def send_reply(data: SendReplyIn, session: Session = Depends(get_session))
     session.refresh(msg)
 
     await manager.broadcast(
-        json.dumps(
-            jsonable_encoder({
-                "type": "message",
-                "data": MessageOut.model_validate(msg),
-            })
-        )
+        jsonable_encoder({
+            "type": "message",
+            "data": MessageOut.model_validate(msg),
+        })
     )
 
     return msg
@@ -715,26 +1047,94 @@ async def log_issue(data: FeedbackIn, session: Session = Depends(get_session)):
     return fb
 
 
-# Tools: list feedback (with simple filters)
+def _encode_cursor(created_at: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+
+# Tools: list feedback newest-first with its current assignee.
+# Pages by keyset (?cursor=next_cursor) so deep pages cost the same as the first; offset is kept for old clients.
 @router.get("/api/tools/feedback/list", response_model=FeedbackListOut)
 def list_feedback(
     category: Optional[str] = None,
     status: Optional[str] = None,
     zone: Optional[str] = None,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
     offset: int = 0,
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session),
 ):
-    q = select(Feedback)
+    current = (
+        select(func.max(FeedbackAssignment.id))
+        .where(FeedbackAssignment.feedback_id == Feedback.id)
+        .correlate(Feedback)
+        .scalar_subquery()
+    )
+    q = select(Feedback, FeedbackAssignment).outerjoin(FeedbackAssignment, FeedbackAssignment.id == current)
     if category:
         q = q.where(Feedback.category == category)
     if status:
         q = q.where(Feedback.status == status)
     if zone:
         q = q.where(Feedback.zone == zone)
-    q = q.order_by(Feedback.created_at.desc()).offset(offset).limit(limit)
+    if cursor:
+        ts, row_id = _decode_cursor(cursor)
+        q = q.where(or_(Feedback.created_at < ts, and_(Feedback.created_at == ts, Feedback.id < row_id)))
+    elif offset:
+        q = q.offset(offset)
+    q = q.order_by(Feedback.created_at.desc(), Feedback.id.desc()).limit(limit + 1)
     rows = session.exec(q).all()
-    return {"items": rows}
+    items = []
+    for fb, fa in rows[:limit]:
+        item = FeedbackWithAssigneeOut.model_validate(fb)
+        if fa is not None:
+            item.assignee, item.assignment_note, item.assigned_at = fa.assignee, fa.note, fa.assigned_at
+        items.append(item)
+    last = rows[limit - 1][0] if len(rows) > limit else None
+    return {"items": items, "next_cursor": _encode_cursor(last.created_at, last.id) if last else None}
+
+
+# Full-text search over messages and feedback, ranked by bm25
+@router.get("/api/search", response_model=SearchOut)
+def search_text(
+    q: str = Query(..., min_length=1),
+    scope: str = Query("all", pattern="^(messages|feedback|all)$"),
+    match: str = Query("any", pattern="^(any|all)$"),
+    phone: Optional[str] = None,
+    zone: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    # zone/category/status only exist on feedback; with those set, messages are skipped
+    feedback_only = bool(zone or category or status)
+    opts = {"phone": phone, "since": since, "until": until, "match_all": match == "all"}
+    hits = []
+    if scope in ("messages", "all") and not feedback_only:
+        n = limit + 1 if scope == "messages" else offset + limit + 1
+        for r in search.search_messages(q, limit=n, offset=offset if scope == "messages" else 0, **opts):
+            hits.append({"kind": "message", **r})
+    if scope in ("feedback", "all"):
+        n = limit + 1 if scope == "feedback" else offset + limit + 1
+        for r in search.search_feedback(q, zone=zone, category=category, status=status, limit=n,
+                                        offset=offset if scope == "feedback" else 0, **opts):
+            hits.append({"kind": "feedback", **r})
+    if scope == "all":
+        hits.sort(key=lambda h: h["score"])
+        hits = hits[offset:]
+    through = archive.archived_through() if scope in ("messages", "all") and not feedback_only else None
+    return {"hits": hits[:limit], "has_more": len(hits) > limit, "archived_through": through}
 
 
 # Tools: get single feedback
@@ -765,7 +1165,7 @@ async def broadcast_notice(data: NoticeIn, session: Session = Depends(get_sessio
     numbers = data.phone_numbers or []
     for pn in numbers:
         try:
-            _ = await send_via_samwad(pn, data.message)
+            await delivery.send(pn, data.message, broadcast_id=notice.id)
         except Exception as e:
             webhook_logger.warning("broadcast failed phone=%s error=%s", pn, str(e))
     return notice
@@ -788,6 +1188,37 @@ async def ai_reply(data: AIReplyIn):
     return AIReplyOut(reply=reply, raw=raw)
 
 
+# Admin: near-duplicate reply cache (approve/edit, reject, invalidate)
+def _reply_cache_out(e) -> ReplyCacheEntryOut:
+    return ReplyCacheEntryOut(id=e.id, language=e.language, text_key=e.key, reply=e.reply,
+                              approved=e.approved, hits=e.hits, created_at=e.created_at)
+
+
+@router.get("/api/admin/reply_cache", response_model=List[ReplyCacheEntryOut])
+async def reply_cache_entries(status: Optional[str] = None):
+    approved = {"approved": True, "pending": False}.get(status or "")
+    return [_reply_cache_out(e) for e in reply_cache.entries(approved)]
+
+
+@router.post("/api/admin/reply_cache/{entry_id}/decision", response_model=ReplyCacheEntryOut)
+async def reply_cache_decision(entry_id: int, data: ReplyCacheDecisionIn):
+    e = reply_cache.decide(entry_id, data.approve, data.reply)
+    if e is None:
+        raise HTTPException(status_code=404, detail="entry_not_found")
+    return _reply_cache_out(e)
+
+
+@router.delete("/api/admin/reply_cache")
+async def reply_cache_invalidate(language: Optional[str] = None):
+    return {"status": "ok", "removed": reply_cache.invalidate(language)}
+
+
+# Admin: LLM token usage and latency per call kind (reply/classifier/translator/summarizer/warm)
+@router.get("/api/admin/ai/usage")
+def ai_usage():
+    return ai_usage_stats()
+
+
 # Resolve context (zone + ETAs) for a phone
 @router.get("/api/tools/resolve_context")
 def resolve_context(phone_number: str):
@@ -929,19 +1360,16 @@ async def classify_intent(data: ClassifyIn):
 # Phase 1+: summarize conversation
 @router.post("/api/tools/summarize", response_model=SummarizeOut)
 async def summarize(data: SummarizeIn, session: Session = Depends(get_session)):
-    q = select(Message).where(Message.phone_number == data.phone_number).order_by(Message.timestamp.asc())
-    msgs: List[Message] = session.exec(q).all()
-    if data.max_messages and len(msgs) > data.max_messages:
-        msgs = msgs[-data.max_messages :]
-    pairs = [("admin" if m.is_from_admin else "user", m.body) for m in msgs]
-    summary, _raw = await ai_summarize(pairs)
-    return SummarizeOut(summary=summary)
+    summary, cached, partial = await get_conversation_summary(session, data.phone_number, data.max_messages or 50)
+    return SummarizeOut(summary=summary, cached=cached, partial=partial)
 
 
 # Phase 1+: send media via URL
 @router.post("/api/tools/send_media", response_model=MessageOut)
 async def send_media(data: SendMediaIn, session: Session = Depends(get_session)):
     # Fetch image and send via Samwad
+    import httpx
+
     try:
         async with httpx.AsyncClient(timeout=20) as client:
             resp = await client.get(data.image_url)
@@ -953,7 +1381,7 @@ async def send_media(data: SendMediaIn, session: Session = Depends(get_session))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"image_fetch_failed: {str(e)}")
 
-    _ = await send_via_samwad(data.phone_number, data.body or "", image=(fname, content, mime))
+    await delivery.send(data.phone_number, data.body or "", image=(fname, content, mime))
 
     msg = Message(
         phone_number=data.phone_number,
@@ -964,36 +1392,27 @@ async def send_media(data: SendMediaIn, session: Session = Depends(get_session))
     session.add(msg)
     session.commit()
     session.refresh(msg)
-    await manager.broadcast(json.dumps(jsonable_encoder({"type": "message", "data": MessageOut.model_validate(msg)})))
+    await manager.broadcast(jsonable_encoder({"type": "message", "data": MessageOut.model_validate(msg)}))
     return msg
 
 
 # Phase 1+: escalate emergency
 @router.post("/api/tools/escalate_emergency")
 async def escalate_emergency(data: EscalateIn):
-    numbers = data.phone_numbers or []
-    if not numbers:
-        raw = (settings.ESCALATION_NUMBERS or "").strip()
-        if raw:
-            numbers = [n.strip() for n in raw.split(",") if n.strip()]
+    numbers = data.phone_numbers or priority.escalation_numbers()
     if not numbers:
         raise HTTPException(status_code=400, detail="no_numbers_provided")
-    failures: List[str] = []
-    for pn in numbers:
-        try:
-            msg = data.message
-            if data.severity or data.location:
-                parts = [msg]
-                if data.severity:
-                    parts.append(f"[severity: {data.severity}]")
-                if data.location:
-                    parts.append(f"[location: {data.location}]")
-                msg = " ".join(parts)
-            resp = await send_via_samwad(pn, msg)
-            if (resp or {}).get("status") != "ok":
-                failures.append(pn)
-        except Exception:
-            failures.append(pn)
+    msg = data.message
+    if data.severity or data.location:
+        parts = [msg]
+        if data.severity:
+            parts.append(f"[severity: {data.severity}]")
+        if data.location:
+            parts.append(f"[location: {data.location}]")
+        msg = " ".join(parts)
+    # the ledger's zone column holds canonical zone names only, not free-text locations
+    zone = analyze_text(data.location).zone if data.location else None
+    failures = await priority.escalate(numbers, msg, zone=zone)
     return {"status": "ok", "failed": failures}
 
 
@@ -1016,37 +1435,208 @@ async def api_send_location(data: SendLocationPinIn):
     return out
 
 
-_HIGH_RISK = {"send_template", "broadcast_notice", "send_media", "escalate_emergency"}
-
-
-def _tools_registry() -> List[Dict[str, Any]]:
-    return [
-        {"name": "classify_intent", "risk": "low", "description": "Classify text intent.", "params": {"text": "string"}},
-        {"name": "summarize", "risk": "low", "description": "Summarize conversation for a phone.", "params": {"phone_number": "string", "max_messages": "int"}},
-        {"name": "translate", "risk": "low", "description": "Translate text.", "params": {"text": "string", "target_language": "string"}},
-        {"name": "log_issue", "risk": "medium", "description": "Log sanitation/emergency/info issue.", "params": {"phone_number": "string", "category": "string", "message": "string", "location": "string?", "zone": "string?"}},
-        {"name": "update_issue_status", "risk": "medium", "description": "Update issue status.", "params": {"id": "int", "status": "new|in_progress|resolved"}},
-        {"name": "assign_issue", "risk": "medium", "description": "Assign issue.", "params": {"feedback_id": "int", "assignee": "string", "note": "string?"}},
-        {"name": "set_contact_metadata", "risk": "medium", "description": "Upsert contact zone/language/name.", "params": {"phone_number": "string", "zone": "string?", "language_pref": "string?", "name": "string?"}},
-        {"name": "send_template", "risk": "high", "description": "Send a templated message to a phone.", "params": {"phone_number": "string", "body": "string"}},
-        {"name": "broadcast_notice", "risk": "high", "description": "Broadcast message to zones/phones.", "params": {"message": "string", "zones": "string[]?", "phone_numbers": "string[]?"}},
-        {"name": "send_media", "risk": "high", "description": "Send image via URL.", "params": {"phone_number": "string", "image_url": "string", "body": "string?"}},
-        {"name": "escalate_emergency", "risk": "high", "description": "Notify ops escalation numbers.", "params": {"message": "string", "phone_numbers": "string[]?", "severity": "string?", "location": "string?"}},
-        {"name": "resolve_context", "risk": "low", "description": "Resolve zone + ETAs for a phone.", "params": {"phone_number": "string"}},
-        {"name": "request_location", "risk": "low", "description": "Ask user to share live location.", "params": {"phone_number": "string", "body": "string?"}},
-        {"name": "send_location", "risk": "low", "description": "Send a location pin.", "params": {"phone_number": "string", "latitude": "float", "longitude": "float", "name": "string?", "address": "string?"}},
-        # POC tools
-        {"name": "get_sanitation_facility", "risk": "low", "description": "List nearby toilets/water/cleaning crews (dummy).", "params": {"zone": "string?", "phone_number": "string?"}},
-        {"name": "get_festival_schedule", "risk": "low", "description": "Festival schedule for today (dummy).", "params": {"date": "string?"}},
-        {"name": "get_route_to_venue", "risk": "low", "description": "Route guidance (dummy).", "params": {"origin": "string?", "destination": "string"}},
-        {"name": "register_lost_item", "risk": "medium", "description": "Register lost & found ticket (stores as feedback).", "params": {"phone_number": "string", "description": "string", "zone": "string?"}},
-        {"name": "escalate_to_authorities", "risk": "high", "description": "Alias to emergency escalation.", "params": {"message": "string", "phone_numbers": "string[]?", "severity": "string?", "location": "string?"}},
-    ]
+def _save(session: Session, obj: Any, commit: bool) -> None:
+    """Persist a tool's row; in a batch transaction only flush so the id is assigned."""
+    session.add(obj)
+    if commit:
+        session.commit()
+        session.refresh(obj)
+    else:
+        session.flush()
+
+
+# Agent tool handlers: (validated args, session, commit) -> result dict
+async def _tool_classify_intent(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    out, _ = await ai_classify_intent(args["text"])
+    return out
+
+
+async def _tool_summarize(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    summary, cached, partial = await get_conversation_summary(session, args["phone_number"], args.get("max_messages") or 50)
+    return {"summary": summary, "cached": cached, "partial": partial}
+
+
+async def _tool_translate(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    out, _ = await ai_translate(args["text"], args.get("target_language") or "en")
+    return {"text": out}
+
+
+async def _tool_log_issue(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    fb = Feedback(
+        phone_number=args["phone_number"],
+        category=args.get("category") or "info",
+        status="new",
+        location=args.get("location"),
+        zone=args.get("zone"),
+        message=args.get("message"),
+    )
+    _save(session, fb, commit)
+    return {"id": fb.id}
+
+
+async def _tool_update_issue_status(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    fb = session.get(Feedback, args["id"])
+    if not fb:
+        raise HTTPException(status_code=404, detail="feedback_not_found")
+    fb.status = args["status"]
+    _save(session, fb, commit)
+    return {"id": fb.id, "status": fb.status}
+
+
+async def _tool_assign_issue(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    existing = session.exec(select(FeedbackAssignment).where(FeedbackAssignment.feedback_id == args["feedback_id"])).first()
+    if existing:
+        existing.assignee = args["assignee"]
+        existing.note = args.get("note")
+        _save(session, existing, commit)
+        return {"id": existing.id}
+    rec = FeedbackAssignment(feedback_id=args["feedback_id"], assignee=args["assignee"], note=args.get("note"))
+    _save(session, rec, commit)
+    return {"id": rec.id}
+
+
+async def _tool_set_contact_metadata(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    pn = args["phone_number"]
+    c = session.get(Contact, pn)
+    if c is None:
+        c = Contact(phone_number=pn)
+    if args.get("zone") is not None:
+        c.zone = args["zone"]
+    if args.get("language_pref") is not None:
+        c.language_pref = args["language_pref"]
+    if args.get("name") is not None:
+        c.name = args["name"]
+    _save(session, c, commit)
+    return {"phone_number": c.phone_number, "zone": c.zone, "language_pref": c.language_pref, "name": c.name}
+
+
+async def _tool_send_template(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    saved = await send_reply(SendReplyIn(phone_number=args["phone_number"], body=args["body"]), session)
+    return {"message_id": saved.id}
+
+
+async def _tool_broadcast_notice(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    data = NoticeIn(message=args["message"], zones=args.get("zones"), phone_numbers=args.get("phone_numbers"))
+    out = await broadcast_notice(data, session)  # type: ignore
+    return {"id": out.id}
+
+
+async def _tool_send_media(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    data = SendMediaIn(phone_number=args["phone_number"], image_url=args["image_url"], body=args.get("body"))
+    out = await send_media(data, session)  # type: ignore
+    return {"message_id": out.id}
+
+
+async def _tool_escalate_emergency(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    data = EscalateIn(message=args["message"], phone_numbers=args.get("phone_numbers"),
+                      severity=args.get("severity"), location=args.get("location"))
+    return await escalate_emergency(data)  # type: ignore
+
+
+async def _tool_resolve_context(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    zone = _resolve_zone(args["phone_number"], "")
+    se, me = _resolve_etas(zone)
+    return {"zone": zone, "sanitation_eta_minutes": se, "medical_eta_minutes": me}
+
+
+async def _tool_request_location(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    return await request_location(args["phone_number"], args.get("body") or "Please share your location")
+
+
+async def _tool_send_location(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    return await send_location_pin(
+        args["phone_number"],
+        args["latitude"],
+        args["longitude"],
+        name=args.get("name"),
+        address=args.get("address"),
+    )
+
+
+# POC tools with dummy data
+async def _tool_get_sanitation_facility(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    zone = args.get("zone")
+    if not zone and args.get("phone_number"):
+        zone = _resolve_zone(args["phone_number"], "")
+    return {"zone": zone, "facilities": _POC_SAN_FACILITIES.get(zone or "", [])}
+
+
+async def _tool_get_festival_schedule(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    return {"schedule": knowledge.get_index().schedule or _POC_SCHEDULE}
+
+
+async def _tool_get_route_to_venue(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    origin = args.get("origin") or args.get("zone") or args.get("from")
+    dest = args.get("destination") or "Main Ghat"
+    route = routing.find_route(origin, dest)
+    if route:
+        return {"origin": origin, "destination": dest, "steps": routing.route_steps(route),
+                "meters": route["meters"], "minutes": route["minutes"]}
+    if origin:
+        steps = _fallback_steps(origin, dest)
+    else:
+        steps = ["Head to the nearest info kiosk", f"Ask for directions to {dest}"]
+    return {"origin": origin, "destination": dest, "steps": steps}
+
+
+async def _tool_register_lost_item(args: Dict[str, Any], session: Session, commit: bool) -> Dict[str, Any]:
+    # Store as Feedback with category 'lost_found'
+    fb = Feedback(
+        phone_number=args["phone_number"],
+        category="lost_found",
+        status="new",
+        zone=args.get("zone"),
+        message=f"Lost item: {args['description']}",
+    )
+    _save(session, fb, commit)
+    return {"ticket_id": fb.id, "status": fb.status}
+
+
+_ESCALATE_PARAMS = {"message": "string", "phone_numbers": "string[]?", "severity": "string?", "location": "string?"}
+
+tool_registry = ToolRegistry()
+for _spec in (
+    ToolSpec("classify_intent", "low", "Classify text intent.", {"text": "string"}, _tool_classify_intent),
+    ToolSpec("summarize", "low", "Summarize conversation for a phone.", {"phone_number": "string", "max_messages": "int?"}, _tool_summarize),
+    ToolSpec("translate", "low", "Translate text.", {"text": "string", "target_language": "string?"}, _tool_translate),
+    ToolSpec("log_issue", "medium", "Log sanitation/emergency/info issue.", {"phone_number": "string", "category": "string?", "message": "string?", "location": "string?", "zone": "string?"}, _tool_log_issue, db_only=True),
+    ToolSpec("update_issue_status", "medium", "Update issue status.", {"id": "int", "status": "new|in_progress|resolved"}, _tool_update_issue_status, db_only=True),
+    ToolSpec("assign_issue", "medium", "Assign issue.", {"feedback_id": "int", "assignee": "string", "note": "string?"}, _tool_assign_issue, db_only=True),
+    ToolSpec("set_contact_metadata", "medium", "Upsert contact zone/language/name.", {"phone_number": "string", "zone": "string?", "language_pref": "string?", "name": "string?"}, _tool_set_contact_metadata, db_only=True),
+    ToolSpec("send_template", "high", "Send a templated message to a phone.", {"phone_number": "string", "body": "string"}, _tool_send_template, needs_approval=True),
+    ToolSpec("broadcast_notice", "high", "Broadcast message to zones/phones.", {"message": "string", "zones": "string[]?", "phone_numbers": "string[]?"}, _tool_broadcast_notice, needs_approval=True),
+    ToolSpec("send_media", "high", "Send image via URL.", {"phone_number": "string", "image_url": "string", "body": "string?"}, _tool_send_media, needs_approval=True),
+    ToolSpec("escalate_emergency", "high", "Notify ops escalation numbers.", _ESCALATE_PARAMS, _tool_escalate_emergency, needs_approval=True),
+    ToolSpec("resolve_context", "low", "Resolve zone + ETAs for a phone.", {"phone_number": "string"}, _tool_resolve_context),
+    ToolSpec("request_location", "low", "Ask user to share live location.", {"phone_number": "string", "body": "string?"}, _tool_request_location),
+    ToolSpec("send_location", "low", "Send a location pin.", {"phone_number": "string", "latitude": "float", "longitude": "float", "name": "string?", "address": "string?"}, _tool_send_location),
+    # POC tools
+    ToolSpec("get_sanitation_facility", "low", "List nearby toilets/water/cleaning crews (dummy).", {"zone": "string?", "phone_number": "string?"}, _tool_get_sanitation_facility),
+    ToolSpec("get_festival_schedule", "low", "Festival schedule for today.", {"date": "string?"}, _tool_get_festival_schedule),
+    ToolSpec("get_route_to_venue", "low", "Walking route over the venue graph.", {"origin": "string?", "destination": "string?"}, _tool_get_route_to_venue),
+    ToolSpec("register_lost_item", "medium", "Register lost & found ticket (stores as feedback).", {"phone_number": "string", "description": "string", "zone": "string?"}, _tool_register_lost_item, db_only=True),
+    # alias kept out of the approval queue so emergencies are not held
+    ToolSpec("escalate_to_authorities", "high", "Alias to emergency escalation.", _ESCALATE_PARAMS, _tool_escalate_emergency),
+):
+    tool_registry.register(_spec)
+
+_HIGH_RISK = tool_registry.names(lambda s: s.needs_approval)
+# Tools that only write to the database; a batch runs them in one transaction
+_DB_TOOLS = tool_registry.names(lambda s: s.db_only)
 
 
 @router.get("/api/agent/tools", response_model=List[AgentToolOut])
-def agent_tools():
-    return _tools_registry()
+def agent_tools(request: Request):
+    payload, etag = tool_registry.listing()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get("/api/agent/tools/stats")
+def agent_tool_stats():
+    return tool_registry.stats()
 
 
 _INTENT_TOOL_MAP: Dict[str, str] = {
@@ -1064,136 +1654,14 @@ def intent_map():
     return _INTENT_TOOL_MAP
 
 
-async def _execute_tool(tool: str, args: Dict[str, Any], session: Session) -> Dict[str, Any]:
-    if tool == "classify_intent":
-        out, _ = await ai_classify_intent(args.get("text", ""))
-        return out
-    if tool == "summarize":
-        pn = args.get("phone_number")
-        max_messages = int(args.get("max_messages") or 50)
-        q = select(Message).where(Message.phone_number == pn).order_by(Message.timestamp.asc())
-        msgs: List[Message] = session.exec(q).all()
-        if len(msgs) > max_messages:
-            msgs = msgs[-max_messages:]
-        pairs = [("admin" if m.is_from_admin else "user", m.body) for m in msgs]
-        summary, _raw = await ai_summarize(pairs)
-        return {"summary": summary}
-    if tool == "translate":
-        out, _ = await ai_translate(args.get("text", ""), args.get("target_language", "en"))
-        return {"text": out}
-    if tool == "log_issue":
-        fb = Feedback(
-            phone_number=args.get("phone_number", ""),
-            category=args.get("category", "info"),
-            status="new",
-            location=args.get("location"),
-            zone=args.get("zone"),
-            message=args.get("message"),
-        )
-        session.add(fb); session.commit(); session.refresh(fb)
-        return {"id": fb.id}
-    if tool == "update_issue_status":
-        fb = session.get(Feedback, int(args.get("id")))
-        if not fb:
-            raise HTTPException(status_code=404, detail="feedback_not_found")
-        fb.status = args.get("status", fb.status)
-        session.add(fb); session.commit(); session.refresh(fb)
-        return {"id": fb.id, "status": fb.status}
-    if tool == "assign_issue":
-        existing = session.exec(select(FeedbackAssignment).where(FeedbackAssignment.feedback_id == int(args.get("feedback_id")))).first()
-        if existing:
-            existing.assignee = args.get("assignee")
-            existing.note = args.get("note")
-            session.add(existing); session.commit(); session.refresh(existing)
-            return {"id": existing.id}
-        rec = FeedbackAssignment(feedback_id=int(args.get("feedback_id")), assignee=args.get("assignee"), note=args.get("note"))
-        session.add(rec); session.commit(); session.refresh(rec)
-        return {"id": rec.id}
-    if tool == "set_contact_metadata":
-        pn = args.get("phone_number")
-        c = session.get(Contact, pn)
-        if c is None:
-            c = Contact(phone_number=pn)
-        if "zone" in args and args.get("zone") is not None:
-            c.zone = args.get("zone")
-        if "language_pref" in args and args.get("language_pref") is not None:
-            c.language_pref = args.get("language_pref")
-        if "name" in args and args.get("name") is not None:
-            c.name = args.get("name")
-        session.add(c); session.commit(); session.refresh(c)
-        return {"phone_number": c.phone_number, "zone": c.zone, "language_pref": c.language_pref, "name": c.name}
-    if tool == "send_template":
-        data = SendReplyIn(phone_number=args.get("phone_number"), body=args.get("body", ""))
-        saved = await send_reply(data, session)
-        return {"message_id": saved.id}
-    if tool == "broadcast_notice":
-        data = NoticeIn(message=args.get("message", ""), zones=args.get("zones"), phone_numbers=args.get("phone_numbers"))
-        out = await broadcast_notice(data, session)  # type: ignore
-        return {"id": out.id}
-    if tool == "send_media":
-        data = SendMediaIn(phone_number=args.get("phone_number"), image_url=args.get("image_url"), body=args.get("body"))
-        out = await send_media(data, session)  # type: ignore
-        return {"message_id": out.id}
-    if tool == "escalate_emergency":
-        data = EscalateIn(message=args.get("message", ""), phone_numbers=args.get("phone_numbers"), severity=args.get("severity"), location=args.get("location"))
-        out = await escalate_emergency(data)  # type: ignore
-        return out
-    if tool == "resolve_context":
-        pn = args.get("phone_number")
-        zone = _resolve_zone(pn, "")
-        se, me = _resolve_etas(zone)
-        return {"zone": zone, "sanitation_eta_minutes": se, "medical_eta_minutes": me}
-    if tool == "request_location":
-        pn = args.get("phone_number")
-        body = args.get("body") or "Please share your location"
-        return await request_location(pn, body)
-    if tool == "send_location":
-        return await send_location_pin(
-            args.get("phone_number"),
-            float(args.get("latitude")),
-            float(args.get("longitude")),
-            name=args.get("name"),
-            address=args.get("address"),
-        )
-    # POC tools with dummy data
-    if tool == "get_sanitation_facility":
-        zone = args.get("zone")
-        if not zone and args.get("phone_number"):
-            zone = _resolve_zone(args.get("phone_number"), "")
-        facilities = _POC_SAN_FACILITIES.get(zone or "", [])
-        return {"zone": zone, "facilities": facilities}
-    if tool == "get_festival_schedule":
-        return {"schedule": _POC_SCHEDULE}
-    if tool == "get_route_to_venue":
-        origin = args.get("origin") or args.get("zone") or args.get("from")
-        dest = args.get("destination") or "Main Ghat"
-        steps = []
-        if origin:
-            steps = [
-                f"Start at {origin}",
-                "Walk 200m to the main corridor",
-                "Follow signs towards the plaza",
-                f"Proceed to {dest}",
-            ]
-        else:
-            steps = ["Head to the nearest info kiosk", f"Ask for directions to {dest}"]
-        return {"origin": origin, "destination": dest, "steps": steps}
-    if tool == "register_lost_item":
-        # Store as Feedback with category 'lost_found'
-        fb = Feedback(
-            phone_number=args.get("phone_number", ""),
-            category="lost_found",
-            status="new",
-            zone=args.get("zone"),
-            message=f"Lost item: {args.get('description','')}",
-        )
-        session.add(fb); session.commit(); session.refresh(fb)
-        return {"ticket_id": fb.id, "status": fb.status}
-    if tool == "escalate_to_authorities":
-        data = EscalateIn(message=args.get("message", ""), phone_numbers=args.get("phone_numbers"), severity=args.get("severity"), location=args.get("location"))
-        out = await escalate_emergency(data)  # type: ignore
-        return out
-    raise HTTPException(status_code=400, detail="unknown_tool")
+async def _execute_tool(tool: str, args: Dict[str, Any], session: Session, *, commit: bool = True) -> Dict[str, Any]:
+    spec = tool_registry.get(tool)
+    if spec is None:
+        raise HTTPException(status_code=400, detail="unknown_tool")
+    try:
+        return await tool_registry.run(spec, args, session, commit)
+    except ToolArgError as e:
+        raise HTTPException(status_code=422, detail=f"invalid_args: {e}")
 
 
 @router.post("/api/agent/tools/invoke", response_model=AgentInvokeOut)
@@ -1204,7 +1672,7 @@ async def agent_invoke(data: AgentInvokeIn, session: Session = Depends(get_sessi
     if data.dry_run:
         return AgentInvokeOut(status="ok", result={"dry_run": True, "tool": tool, "args": args})
     if high_risk and not settings.AGENT_AUTO_APPROVE_HIGHRISK:
-        rec = Approval(tool_name=tool, args_json=_json.dumps(args), status="pending")
+        rec = Approval(tool_name=tool, args_json=orjson.dumps(args).decode(), status="pending")
         session.add(rec); session.commit(); session.refresh(rec)
         return AgentInvokeOut(status="pending", approval_id=rec.id)
     try:
@@ -1216,28 +1684,175 @@ async def agent_invoke(data: AgentInvokeIn, session: Session = Depends(get_sessi
         return AgentInvokeOut(status="error", error=str(e))
 
 
+async def _run_batch(data: AgentBatchIn):
+    """Yield one AgentBatchItemOut per call as it finishes, then a summary line.
+
+    DB-only tools run in order in a single transaction and are reported after
+    the commit; other tools run concurrently (bounded by ``parallelism``),
+    each with its own session. High-risk calls become pending approvals.
+    """
+    parallelism = max(1, min(data.parallelism or settings.AGENT_BATCH_PARALLELISM, 64))
+    sem = asyncio.Semaphore(parallelism)
+    queue: "asyncio.Queue[AgentBatchItemOut]" = asyncio.Queue()
+    counts = {"ok": 0, "pending": 0, "error": 0}
+
+    async def run_one(i: int, call: AgentInvokeIn) -> None:
+        async with sem:
+            try:
+                with DBSession(engine) as s:
+                    result = await _execute_tool(call.tool, call.args or {}, s)
+                item = AgentBatchItemOut(index=i, tool=call.tool, status="ok", result=result)
+            except HTTPException as e:
+                item = AgentBatchItemOut(index=i, tool=call.tool, status="error", error=str(e.detail))
+            except Exception as e:
+                item = AgentBatchItemOut(index=i, tool=call.tool, status="error", error=str(e))
+        await queue.put(item)
+
+    async def run_db(calls: List[Tuple[int, AgentInvokeIn]]) -> None:
+        done: List[AgentBatchItemOut] = []
+        pending_rows: List[Tuple[int, str, Approval]] = []
+        with DBSession(engine) as s:
+            try:
+                if not data.atomic:
+                    # pysqlite starts transactions lazily, so the first SAVEPOINT would
+                    # otherwise open (and its RELEASE commit) the outer transaction
+                    s.connection().exec_driver_sql("BEGIN")
+                for i, call in calls:
+                    args = call.args or {}
+                    if call.tool in _HIGH_RISK:
+                        rec = Approval(tool_name=call.tool, args_json=orjson.dumps(args).decode(), status="pending")
+                        s.add(rec)
+                        pending_rows.append((i, call.tool, rec))
+                        continue
+                    if data.atomic:
+                        result = await _execute_tool(call.tool, args, s, commit=False)
+                        done.append(AgentBatchItemOut(index=i, tool=call.tool, status="ok", result=result))
+                        continue
+                    # each call in its own SAVEPOINT so a failure undoes only that call
+                    try:
+                        with s.begin_nested():
+                            result = await _execute_tool(call.tool, args, s, commit=False)
+                        done.append(AgentBatchItemOut(index=i, tool=call.tool, status="ok", result=result))
+                    except HTTPException as e:
+                        done.append(AgentBatchItemOut(index=i, tool=call.tool, status="error", error=str(e.detail)))
+                    except Exception as e:
+                        done.append(AgentBatchItemOut(index=i, tool=call.tool, status="error", error=str(e)))
+                s.commit()
+                for rec in (r for _, _, r in pending_rows):
+                    s.refresh(rec)
+                done += [AgentBatchItemOut(index=i, tool=t, status="pending", approval_id=r.id) for i, t, r in pending_rows]
+            except Exception as e:
+                s.rollback()
+                err = str(e.detail) if isinstance(e, HTTPException) else str(e)
+                done = [AgentBatchItemOut(index=i, tool=c.tool, status="error", error=f"transaction_rolled_back: {err}")
+                        for i, c in calls]
+        for item in done:
+            await queue.put(item)
+
+    db_calls: List[Tuple[int, AgentInvokeIn]] = []
+    tasks = []
+    for i, call in enumerate(data.calls):
+        if call.dry_run:
+            await queue.put(AgentBatchItemOut(index=i, tool=call.tool, status="ok",
+                                              result={"dry_run": True, "tool": call.tool, "args": call.args or {}}))
+        elif call.tool in _DB_TOOLS or (call.tool in _HIGH_RISK and not settings.AGENT_AUTO_APPROVE_HIGHRISK):
+            db_calls.append((i, call))
+        else:
+            tasks.append(asyncio.create_task(run_one(i, call)))
+    if db_calls:
+        tasks.append(asyncio.create_task(run_db(db_calls)))
+    expected = len(data.calls)
+    try:
+        for _ in range(expected):
+            item = await queue.get()
+            counts[item.status] = counts.get(item.status, 0) + 1
+            yield item.model_dump_json(exclude_none=True) + "\n"
+    finally:
+        for t in tasks:
+            t.cancel()
+    yield _json.dumps({"done": True, "total": expected, **counts}) + "\n"
+
+
+# Batch of tool calls; results stream back as NDJSON in completion order
+@router.post("/api/agent/tools/invoke_batch")
+async def agent_invoke_batch(data: AgentBatchIn):
+    if len(data.calls) > settings.AGENT_BATCH_MAX_CALLS:
+        raise HTTPException(status_code=400, detail="too_many_calls")
+    return StreamingResponse(_run_batch(data), media_type="application/x-ndjson")
+
+
+def _approval_out(r: Approval) -> ApprovalOut:
+    return ApprovalOut(
+        id=r.id,
+        tool_name=r.tool_name,
+        args=orjson.loads(r.args_json or "{}"),
+        status=r.status,
+        result=orjson.loads(r.result_json) if r.result_json else None,
+        created_at=r.created_at,
+        decided_at=r.decided_at,
+        decided_by=r.decided_by,
+    )
+
+
+async def _broadcast_approval(r: Approval) -> None:
+    await manager.broadcast({"type": "approval", "data": _approval_out(r).model_dump(mode="json")})
+
+
+async def _execute_approval(approval_id: int) -> None:
+    """Run an approved tool call; called by the approval workers."""
+    with DBSession(engine) as s:
+        rec = s.get(Approval, approval_id)
+        if not rec or rec.status != "approved":
+            return
+        rec.status = "running"
+        s.add(rec); s.commit(); s.refresh(rec)
+        await _broadcast_approval(rec)
+        try:
+            result = await _execute_tool(rec.tool_name, orjson.loads(rec.args_json or "{}"), s)
+            rec.result_json = orjson.dumps(result, default=str).decode()
+            rec.status = "executed"
+        except Exception as e:
+            s.rollback()
+            err = str(e.detail) if isinstance(e, HTTPException) else str(e)
+            rec.result_json = orjson.dumps({"error": err}).decode()
+            rec.status = "failed"
+        s.add(rec); s.commit(); s.refresh(rec)
+        await _broadcast_approval(rec)
+
+
+approval_queue.executor = _execute_approval
+
+
 @router.get("/api/admin/approvals", response_model=List[ApprovalOut])
 def approvals(status: Optional[str] = None, limit: int = 100, offset: int = 0, session: Session = Depends(get_session)):
     q = select(Approval)
     if status:
         q = q.where(Approval.status == status)
     q = q.order_by(Approval.created_at.desc()).offset(offset).limit(limit)
-    rows = session.exec(q).all()
-    out = []
-    for r in rows:
-        out.append(ApprovalOut(
-            id=r.id,
-            tool_name=r.tool_name,
-            args=_json.loads(r.args_json or "{}"),
-            status=r.status,
-            result=_json.loads(r.result_json) if r.result_json else None,
-            created_at=r.created_at,
-            decided_at=r.decided_at,
-            decided_by=r.decided_by,
-        ))
-    return out
+    return [_approval_out(r) for r in session.exec(q).all()]
+
+
+@router.get("/api/admin/approvals/{approval_id}", response_model=ApprovalOut)
+def approval_status(approval_id: int, session: Session = Depends(get_session)):
+    rec = session.get(Approval, approval_id)
+    if not rec:
+        raise HTTPException(status_code=404, detail="approval_not_found")
+    return _approval_out(rec)
+
+
+def _decide(session: Session, rows: List[Approval], data: ApprovalDecisionIn) -> None:
+    now = datetime.utcnow()
+    for rec in rows:
+        rec.status = "approved" if data.approve else "denied"
+        rec.decided_at = now
+        rec.decided_by = data.actor
+        session.add(rec)
+    session.commit()
+    if data.approve:
+        approval_queue.enqueue(r.id for r in rows)
 
 
+# Approving only queues the action; poll the approval or watch /ws for executed/failed
 @router.post("/api/admin/approvals/{approval_id}/decision", response_model=ApprovalOut)
 async def approval_decision(approval_id: int, data: ApprovalDecisionIn, session: Session = Depends(get_session)):
     rec = session.get(Approval, approval_id)
@@ -1245,37 +1860,37 @@ async def approval_decision(approval_id: int, data: ApprovalDecisionIn, session:
         raise HTTPException(status_code=404, detail="approval_not_found")
     if rec.status != "pending":
         raise HTTPException(status_code=400, detail="already_decided")
-    if data.approve:
-        try:
-            result = await _execute_tool(rec.tool_name, _json.loads(rec.args_json or "{}"), session)
-            rec.result_json = _json.dumps(result)
-            rec.status = "approved"
-        except Exception as e:
-            rec.result_json = _json.dumps({"error": str(e)})
-            rec.status = "approved"
-    else:
-        rec.status = "denied"
-    rec.decided_at = datetime.utcnow()
-    rec.decided_by = data.actor
-    session.add(rec); session.commit(); session.refresh(rec)
-    return ApprovalOut(
-        id=rec.id,
-        tool_name=rec.tool_name,
-        args=_json.loads(rec.args_json or "{}"),
-        status=rec.status,
-        result=_json.loads(rec.result_json) if rec.result_json else None,
-        created_at=rec.created_at,
-        decided_at=rec.decided_at,
-        decided_by=rec.decided_by,
-    )
+    _decide(session, [rec], data)
+    session.refresh(rec)
+    await _broadcast_approval(rec)
+    return _approval_out(rec)
+
+
+@router.post("/api/admin/approvals/decisions", response_model=ApprovalBatchDecisionOut)
+async def approval_decisions(data: ApprovalBatchDecisionIn, session: Session = Depends(get_session)):
+    ids = list(dict.fromkeys(data.ids))
+    rows = session.exec(select(Approval).where(Approval.id.in_(ids), Approval.status == "pending")).all() if ids else []
+    _decide(session, rows, data)
+    decided = {r.id for r in rows}
+    await manager.broadcast({
+        "type": "approvals_decided",
+        "data": {"ids": sorted(decided), "status": "approved" if data.approve else "denied"},
+    })
+    return ApprovalBatchDecisionOut(decided=sorted(decided), skipped=[i for i in ids if i not in decided])
+
+
+# Resume: connect with ?epoch=<epoch>&resume=<last seq seen>. The hello frame says whether
+# missed events follow ("replayed") or the client must refetch over HTTP ("resync").
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, resume: Optional[int] = None, epoch: Optional[str] = None):
     try:
+        await manager.connect(websocket, resume, epoch)
         while True:
             # Keep connection alive; optionally receive pings
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 """POC dummy datasets for agent tools."""
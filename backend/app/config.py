@@ -14,6 +14,12 @@ class Settings:
     # Database
     SQLITE_PATH: str = os.getenv("SQLITE_PATH", os.path.join(os.getcwd(), "simhastha.db"))
 
+    # Message archive: days older than ARCHIVE_HOT_DAYS are compacted to gzip JSONL files under ARCHIVE_DIR
+    ARCHIVE_ENABLED: bool = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(SQLITE_PATH)), "archive"))
+    ARCHIVE_HOT_DAYS: int = int(os.getenv("ARCHIVE_HOT_DAYS", "3"))
+    ARCHIVE_INTERVAL_SECONDS: int = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
     # CORS
     FRONTEND_ORIGIN: str = os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")
 
@@ -27,6 +33,33 @@ class Settings:
     SAMWAD_LOCATION_URL: str = os.getenv("SAMWAD_LOCATION_URL", "https://www.app.samwad.tech/api/wpbox/sendlocation")
     SAMWAD_LOCATION_REQUEST_URL: str = os.getenv("SAMWAD_LOCATION_REQUEST_URL", "https://www.app.samwad.tech/api/wpbox/sendlocationrequest")
 
+    # Pooled Samwad connections: idle keep-alive, and how often the priority lane re-opens one (0 = never)
+    SAMWAD_KEEPALIVE_SECONDS: float = float(os.getenv("SAMWAD_KEEPALIVE_SECONDS", "120"))
+    SAMWAD_PREWARM_SECONDS: float = float(os.getenv("SAMWAD_PREWARM_SECONDS", "60"))
+    # Emergency lane: workers, and the webhook-to-escalation budget counted in stats
+    PRIORITY_WORKERS: int = int(os.getenv("PRIORITY_WORKERS", "2"))
+    PRIORITY_BUDGET_MS: float = float(os.getenv("PRIORITY_BUDGET_MS", "1000"))
+
+    # Per-phone token bucket in front of classification/auto-reply; overflow is coalesced, then shed
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "6"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "3"))
+    RATE_LIMIT_COALESCE_MAX_CHARS: int = int(os.getenv("RATE_LIMIT_COALESCE_MAX_CHARS", "2000"))
+    RATE_LIMIT_MAX_PHONES: int = int(os.getenv("RATE_LIMIT_MAX_PHONES", "100000"))
+
+    # Messages from one phone within the window form one turn; the window grows with turns in flight
+    COALESCE_ENABLED: bool = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+    COALESCE_WINDOW_SECONDS: float = float(os.getenv("COALESCE_WINDOW_SECONDS", "2"))
+    COALESCE_MAX_WINDOW_SECONDS: float = float(os.getenv("COALESCE_MAX_WINDOW_SECONDS", "6"))
+    COALESCE_MAX_WAIT_SECONDS: float = float(os.getenv("COALESCE_MAX_WAIT_SECONDS", "10"))
+    COALESCE_LOAD_REF: int = int(os.getenv("COALESCE_LOAD_REF", "20"))  # turns in flight that double the window
+
+    # Failed Samwad sends are retried with full-jitter exponential backoff
+    DELIVERY_MAX_ATTEMPTS: int = int(os.getenv("DELIVERY_MAX_ATTEMPTS", "5"))
+    DELIVERY_RETRY_BASE_SECONDS: float = float(os.getenv("DELIVERY_RETRY_BASE_SECONDS", "2"))
+    DELIVERY_RETRY_MAX_SECONDS: float = float(os.getenv("DELIVERY_RETRY_MAX_SECONDS", "300"))
+    DELIVERY_RETRY_POLL_SECONDS: float = float(os.getenv("DELIVERY_RETRY_POLL_SECONDS", "2"))
+
     # AI (Ollama/OpenAI-compatible) chat settings
     # Base URL should end at /v1 (the client appends /chat/completions)
     AI_BASE_URL: str = os.getenv("AI_BASE_URL", "http://127.0.0.1:11434/v1")
@@ -35,6 +68,11 @@ class Settings:
     AI_TEMPERATURE: float = float(os.getenv("AI_TEMPERATURE", "0.4"))
     AI_MAX_TOKENS: int = int(os.getenv("AI_MAX_TOKENS", "500"))
     AI_KEEP_ALIVE: str = os.getenv("AI_KEEP_ALIVE", "600m")
+    # Ping the model with the fixed prompts on startup and at this interval to keep it loaded
+    AI_WARM_ENABLED: bool = os.getenv("AI_WARM_ENABLED", "true").lower() == "true"
+    AI_WARM_INTERVAL_SECONDS: int = int(os.getenv("AI_WARM_INTERVAL_SECONDS", "60"))
+    # /healthz returns 503 until the model answered a warm ping
+    HEALTHZ_REQUIRE_MODEL: bool = os.getenv("HEALTHZ_REQUIRE_MODEL", "false").lower() == "true"
     AI_AUTOREPLY: bool = os.getenv("AI_AUTOREPLY", "false").lower() == "true"
 
     # Ops / escalation
@@ -49,8 +87,55 @@ class Settings:
     SANITATION_ETA_MINUTES: int = int(os.getenv("SANITATION_ETA_MINUTES", "12"))
     MEDICAL_ETA_MINUTES: int = int(os.getenv("MEDICAL_ETA_MINUTES", "7"))
 
+    # Language detection cache (normalized text -> language)
+    LANGUAGE_CACHE_SIZE: int = int(os.getenv("LANGUAGE_CACHE_SIZE", "8192"))
+
+    # Zone polygons (GeoJSON FeatureCollection) for resolving shared locations
+    ZONES_GEOJSON_PATH: str = os.getenv("ZONES_GEOJSON_PATH", os.path.join(os.getcwd(), "zones.geojson"))
+    ZONES_GEOHASH_PRECISION: int = int(os.getenv("ZONES_GEOHASH_PRECISION", "7"))
+
+    # Walkable venue graph (gates, ghats, sectors, corridors) for offline routing
+    ROUTE_GRAPH_PATH: str = os.getenv("ROUTE_GRAPH_PATH", os.path.join(os.getcwd(), "route_graph.json"))
+
+    # Local knowledge base (FAQs, schedules, SOPs) for answering info questions
+    KNOWLEDGE_DIR: str = os.getenv("KNOWLEDGE_DIR", os.path.join(os.getcwd(), "knowledge"))
+    KNOWLEDGE_MIN_SCORE: float = float(os.getenv("KNOWLEDGE_MIN_SCORE", "1.5"))
+    KNOWLEDGE_CONTEXT_PASSAGES: int = int(os.getenv("KNOWLEDGE_CONTEXT_PASSAGES", "3"))
+
+    # Crowd-density heatmap
+    HEATMAP_GEOHASH_PRECISION: int = int(os.getenv("HEATMAP_GEOHASH_PRECISION", "7"))
+    HEATMAP_PUSH_SECONDS: int = int(os.getenv("HEATMAP_PUSH_SECONDS", "10"))
+    HEATMAP_FLUSH_SECONDS: int = int(os.getenv("HEATMAP_FLUSH_SECONDS", "300"))
+
+    # Per-phone conversation state (in-memory LRU, write-behind to SQLite)
+    CONVERSATION_STATE_MAX: int = int(os.getenv("CONVERSATION_STATE_MAX", "50000"))
+    CONVERSATION_FLUSH_SECONDS: int = int(os.getenv("CONVERSATION_FLUSH_SECONDS", "5"))
+    CONVERSATION_PENDING_TTL_SECONDS: int = int(os.getenv("CONVERSATION_PENDING_TTL_SECONDS", "900"))
+
+    # Near-duplicate cache for LLM replies
+    REPLY_CACHE_ENABLED: bool = os.getenv("REPLY_CACHE_ENABLED", "true").lower() == "true"
+    REPLY_CACHE_REQUIRE_APPROVAL: bool = os.getenv("REPLY_CACHE_REQUIRE_APPROVAL", "true").lower() == "true"
+    REPLY_CACHE_TTL_SECONDS: int = int(os.getenv("REPLY_CACHE_TTL_SECONDS", "21600"))
+    REPLY_CACHE_MAX_DISTANCE: int = int(os.getenv("REPLY_CACHE_MAX_DISTANCE", "16"))  # SimHash bits out of 64
+    REPLY_CACHE_MIN_OVERLAP: float = float(os.getenv("REPLY_CACHE_MIN_OVERLAP", "0.75"))  # word Jaccard
+    REPLY_CACHE_MAX_ENTRIES: int = int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "2000"))  # per language
+
+    # Rolling conversation summaries: messages folded into the summary per LLM call
+    SUMMARY_CHUNK_MESSAGES: int = int(os.getenv("SUMMARY_CHUNK_MESSAGES", "40"))
+
+    # Seconds after startup before lazily loaded dependencies are preloaded
+    WARMUP_DELAY_SECONDS: float = float(os.getenv("WARMUP_DELAY_SECONDS", "1"))
+
     # Agent approvals
     AGENT_AUTO_APPROVE_HIGHRISK: bool = os.getenv("AGENT_AUTO_APPROVE_HIGHRISK", "false").lower() == "true"
+    # WebSocket events kept in memory for clients resuming after a reconnect
+    WS_REPLAY_BUFFER: int = int(os.getenv("WS_REPLAY_BUFFER", "1000"))
+
+    # Workers executing approved high-risk actions
+    APPROVAL_WORKERS: int = int(os.getenv("APPROVAL_WORKERS", "4"))
+    # Batch tool invocation
+    AGENT_BATCH_PARALLELISM: int = int(os.getenv("AGENT_BATCH_PARALLELISM", "8"))
+    AGENT_BATCH_MAX_CALLS: int = int(os.getenv("AGENT_BATCH_MAX_CALLS", "500"))
 
 
 @lru_cache
@@ -1,13 +1,67 @@
+import logging
+import time
+from sqlalchemy import Table, event
+from sqlalchemy.orm import Session as _OrmSession
+from sqlalchemy.schema import CreateTable
 from sqlmodel import SQLModel, create_engine, Session
 from .config import get_settings
+from .services.metrics import DB_COMMIT_SECONDS
 
 
 settings = get_settings()
+logger = logging.getLogger("simhastha.database")
 engine = create_engine(f"sqlite:///{settings.SQLITE_PATH}", echo=settings.DEBUG, connect_args={"check_same_thread": False})
 
 
+@event.listens_for(_OrmSession, "before_commit")
+def _commit_started(session) -> None:
+    session.info["commit_t0"] = time.perf_counter()
+
+
+@event.listens_for(_OrmSession, "after_commit")
+def _commit_done(session) -> None:
+    t0 = session.info.pop("commit_t0", None)
+    if t0 is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - t0)
+
+
+def _rebuild_autoincrement(table: Table) -> None:
+    """Recreate a table made before it was declared AUTOINCREMENT; SQLite cannot ALTER that in.
+
+    Rows keep their ids and the sequence starts after the current max id.
+    Indexes and triggers go with the old table; init_db and the search index
+    recreate them.
+    """
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)).fetchone()
+        if row is None or "AUTOINCREMENT" in (row[0] or "").upper():
+            return
+        tmp = f"{table.name}__rebuild"
+        create = str(CreateTable(table).compile(engine)).strip()
+        create = create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {tmp} ", 1)
+        cols = ", ".join(c.name for c in table.columns)
+        # one script between BEGIN and COMMIT, so a crash leaves the old table untouched
+        conn.executescript(
+            f"BEGIN; DROP TABLE IF EXISTS {tmp}; {create}; "
+            f"INSERT INTO {tmp} ({cols}) SELECT {cols} FROM {table.name}; "
+            f"DROP TABLE {table.name}; ALTER TABLE {tmp} RENAME TO {table.name}; COMMIT;"
+        )
+        logger.info("rebuilt table=%s with AUTOINCREMENT", table.name)
+    finally:
+        raw.close()
+
+
 def init_db() -> None:
+    for table in SQLModel.metadata.sorted_tables:
+        if table.dialect_options["sqlite"]["autoincrement"]:
+            _rebuild_autoincrement(table)
     SQLModel.metadata.create_all(engine)
+    # create_all skips existing tables; add indexes declared later to those as well
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 
 def get_session() -> Session:
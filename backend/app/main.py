@@ -1,13 +1,27 @@
+import asyncio
 import orjson
 import logging
 import sys
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .config import get_settings
 from .database import init_db
 from .api import router
+from .services.heatmap import run_publisher as run_heatmap_publisher
+from .services.conversation import run_flusher as run_conversation_flusher
+from .services.warmup import run_warmup
+from .services import model_warm
+from .services.approvals import approval_queue
+from .services.search import init_search_index
+from .services.archive import ensure_id_high_water, run_archiver
+from .services.delivery import run_retrier as run_delivery_retrier
+from .services.priority import lane as priority_lane
+from .services.samwad import close_client as close_samwad_client
+from .services.coalesce import debouncer
+from .services.ratelimit import limiter
+from .services.metrics import registry as metrics_registry
 
 
 def orjson_dumps(v, *, default):
@@ -39,14 +53,47 @@ app.add_middleware(
 app.include_router(router)
 
 
+_background_tasks = []
+
+
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     init_db()
+    ensure_id_high_water()
+    init_search_index()
+    _background_tasks.append(asyncio.create_task(run_heatmap_publisher()))
+    _background_tasks.append(asyncio.create_task(run_conversation_flusher()))
+    _background_tasks.append(asyncio.create_task(run_warmup()))
+    _background_tasks.append(asyncio.create_task(model_warm.run_scheduler()))
+    _background_tasks.append(asyncio.create_task(approval_queue.run()))
+    _background_tasks.append(asyncio.create_task(run_archiver()))
+    _background_tasks.append(asyncio.create_task(run_delivery_retrier()))
+    _background_tasks.append(asyncio.create_task(priority_lane.run()))
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # buffered turns would otherwise be dropped unanswered; limiter flushes feed the debouncer
+    await limiter.drain()
+    await debouncer.drain()
+    for t in _background_tasks:
+        t.cancel()
+    await close_samwad_client()
 
 
 @app.get("/healthz")
-def healthz():
-    return {"status": "ok"}
+def healthz(response: Response):
+    model = model_warm.status()
+    if settings.HEALTHZ_REQUIRE_MODEL and not model["ready"]:
+        # keep the load balancer away until the model is loaded
+        response.status_code = 503
+        return {"status": "warming", "model": model}
+    return {"status": "ok", "model": model}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
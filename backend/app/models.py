@@ -1,10 +1,19 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class Message(SQLModel, table=True):
+    # hot tier only: days older than ARCHIVE_HOT_DAYS move to services/archive.py partitions.
+    # AUTOINCREMENT so ids freed by compaction are never reused (ids are the sync cursor).
+    __table_args__ = (
+        Index("ix_message_timestamp", "timestamp"),
+        Index("ix_message_phone_number_timestamp", "phone_number", "timestamp"),
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     phone_number: str
     body: str
@@ -21,6 +30,14 @@ class ReplyTemplate(SQLModel, table=True):
 
 # New domain models
 class Feedback(SQLModel, table=True):
+    # Issues listing filters on one column and pages newest-first; rowid rides along as the tie-breaker
+    __table_args__ = (
+        Index("ix_feedback_created_at", "created_at"),
+        Index("ix_feedback_category_created_at", "category", "created_at"),
+        Index("ix_feedback_status_created_at", "status", "created_at"),
+        Index("ix_feedback_zone_created_at", "zone", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     phone_number: str
     category: str  # sanitation | emergency | info | other
@@ -50,7 +67,7 @@ class Contact(SQLModel, table=True):
 # Phase 1+: Assignment for feedback (separate table to avoid altering Feedback)
 class FeedbackAssignment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    feedback_id: int
+    feedback_id: int = Field(index=True)
     assignee: str
     note: Optional[str] = None
     assigned_at: datetime = Field(default_factory=datetime.utcnow)
@@ -66,11 +83,88 @@ class ZoneConfig(SQLModel, table=True):
 
 # Agent approvals for high-risk actions
 class Approval(SQLModel, table=True):
+    __table_args__ = (Index("ix_approval_status_created_at", "status", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     tool_name: str
     args_json: str  # stored as JSON string
-    status: str = "pending"  # pending | approved | denied
+    status: str = "pending"  # pending | approved (queued) | running | executed | failed | denied
     result_json: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     decided_at: Optional[datetime] = None
     decided_by: Optional[str] = None
+
+
+# Crowd-density snapshots (geohash cell counts per sliding window)
+class HeatmapSnapshot(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    taken_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    window_minutes: int
+    cell: str
+    count: int
+
+
+# Per-phone conversation state (write-behind copy of the in-memory store)
+class ConversationState(SQLModel, table=True):
+    phone_number: str = Field(primary_key=True)
+    last_intent: Optional[str] = None
+    pending_destination: Optional[str] = None
+    location_requested: bool = False
+    language: Optional[str] = None
+    zone: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# Rolling per-phone summary; last_message_id is the watermark of what it covers
+class ConversationSummary(SQLModel, table=True):
+    phone_number: str = Field(primary_key=True)
+    summary: str = ""
+    last_message_id: int = 0
+    message_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# LLM replies kept for near-duplicate questions (see services/reply_cache.py)
+class CachedReply(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    language: str = Field(index=True)
+    text_key: str
+    reply: str
+    approved: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# One compressed cold partition of Message rows per UTC day (see services/archive.py)
+class MessageArchive(SQLModel, table=True):
+    day: str = Field(primary_key=True)  # YYYY-MM-DD
+    path: str
+    rows: int = 0
+    min_id: int = 0
+    max_id: int = 0
+    bytes: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# Ledger of sends through Samwad and their delivery status (see services/delivery.py)
+class OutboundMessage(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_outboundmessage_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_outboundmessage_zone_created_at", "zone", "created_at"),
+        Index("ix_outboundmessage_broadcast_id_created_at", "broadcast_id", "created_at"),
+        Index("ix_outboundmessage_created_at", "created_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    phone_number: str
+    body: str
+    provider_id: Optional[str] = Field(default=None, index=True)
+    status: str = "queued"  # queued | sent | delivered | read | retrying | failed
+    attempts: int = 0
+    last_error: Optional[str] = None
+    zone: Optional[str] = None
+    broadcast_id: Optional[int] = None  # AdminNotice id for broadcast sends
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    read_at: Optional[datetime] = None
+    next_attempt_at: Optional[datetime] = None
@@ -28,6 +28,8 @@ class SendReplyIn(BaseModel):
 
 class MessagesResponse(BaseModel):
     messages: List[MessageOut]
+    last_id: Optional[int] = None  # pass back as ?since= to fetch only newer messages
+    has_more: bool = False
 
 
 # New schemas for tools and admin
@@ -53,8 +55,35 @@ class FeedbackOut(BaseModel):
         from_attributes = True
 
 
+class FeedbackWithAssigneeOut(FeedbackOut):
+    assignee: Optional[str] = None  # current (latest) assignment, if any
+    assignment_note: Optional[str] = None
+    assigned_at: Optional[datetime] = None
+
+
 class FeedbackListOut(BaseModel):
-    items: List[FeedbackOut]
+    items: List[FeedbackWithAssigneeOut]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next (older) page
+
+
+class SearchHitOut(BaseModel):
+    kind: str  # message | feedback
+    id: int
+    phone_number: str
+    timestamp: datetime
+    score: float  # bm25, lower is better
+    snippet: Optional[str] = None
+    text: Optional[str] = None
+    zone: Optional[str] = None
+    category: Optional[str] = None
+    status: Optional[str] = None
+    is_from_admin: Optional[bool] = None
+
+
+class SearchOut(BaseModel):
+    hits: List[SearchHitOut]
+    has_more: bool = False
+    archived_through: Optional[str] = None  # messages up to this UTC day are archived and not searched
 
 
 # Templates CRUD
@@ -111,6 +140,21 @@ class AIReplyOut(BaseModel):
     raw: Optional[dict] = None
 
 
+class ReplyCacheEntryOut(BaseModel):
+    id: int
+    language: str
+    text_key: str
+    reply: str
+    approved: bool
+    hits: int
+    created_at: datetime
+
+
+class ReplyCacheDecisionIn(BaseModel):
+    approve: bool
+    reply: Optional[str] = None  # edited text to serve instead of the LLM reply
+
+
 # Phase 1+: issue assignment / status update
 class IssueStatusUpdateIn(BaseModel):
     id: int
@@ -172,6 +216,8 @@ class SummarizeIn(BaseModel):
 
 class SummarizeOut(BaseModel):
     summary: str
+    cached: bool = False
+    partial: bool = False
 
 
 # Phase 1+: send media via Samwad
@@ -220,6 +266,13 @@ class ZoneConfigOut(BaseModel):
         from_attributes = True
 
 
+# Routing: edge closures during crowd control
+class RouteClosureIn(BaseModel):
+    from_node: str
+    to_node: str
+    closed: bool = True
+
+
 # Agent tools registry and approvals
 class AgentToolOut(BaseModel):
     name: str
@@ -241,6 +294,17 @@ class AgentInvokeOut(BaseModel):
     error: Optional[str] = None
 
 
+class AgentBatchIn(BaseModel):
+    calls: List[AgentInvokeIn]
+    parallelism: Optional[int] = None  # concurrent non-DB calls; defaults to AGENT_BATCH_PARALLELISM
+    atomic: bool = False  # roll back every DB call if one fails
+
+
+class AgentBatchItemOut(AgentInvokeOut):
+    index: int
+    tool: str
+
+
 class ApprovalOut(BaseModel):
     id: int
     tool_name: str
@@ -259,3 +323,12 @@ class ApprovalDecisionIn(BaseModel):
     approve: bool
     actor: Optional[str] = None
     note: Optional[str] = None
+
+
+class ApprovalBatchDecisionIn(ApprovalDecisionIn):
+    ids: List[int]
+
+
+class ApprovalBatchDecisionOut(BaseModel):
+    decided: List[int]
+    skipped: List[int]  # unknown or no longer pending
@@ -1,57 +1,109 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Optional, Tuple
-import httpx
+import logging
+import time
 from ..config import get_settings
+from . import prompts
+from .metrics import LLM_SECONDS, timed
 
 
 settings = get_settings()
+logger = logging.getLogger("simhastha.ai")
+# httpx is imported inside chat_completion so process start does not pay for it
 
 
 def default_system_prompt(company: Optional[str] = None) -> str:
-    name = company or settings.APP_NAME
-    return (
-        "You are a highly engaging, positive festival assistant for Simhastha. "
-        f"Greet users warmly and keep responses concise. You represent {name}. "
-        "Understand intent (sanitation/emergency/info/guidance) and provide clear, empathetic replies. "
-        "Do not invent facts. If you need to escalate, say you will inform the authorities."
-    )
+    return prompts.reply_prompt(company or settings.APP_NAME)
+
+
+# Per-call-kind counters: calls, errors, prompt/completion tokens, total latency
+_usage: Dict[str, Dict[str, float]] = {}
+
+
+def _record_usage(kind: str, data: Optional[Dict[str, Any]], ms: float) -> None:
+    u = _usage.setdefault(kind, {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_ms": 0.0})
+    u["calls"] += 1
+    u["total_ms"] += ms
+    if data is None:
+        u["errors"] += 1
+        return
+    usage = data.get("usage") or {}
+    # OpenAI-style usage block, or Ollama's native eval counters
+    pt = int(usage.get("prompt_tokens") or data.get("prompt_eval_count") or 0)
+    ct = int(usage.get("completion_tokens") or data.get("eval_count") or 0)
+    u["prompt_tokens"] += pt
+    u["completion_tokens"] += ct
+    logger.debug("llm call kind=%s prompt_tokens=%d completion_tokens=%d ms=%.0f", kind, pt, ct, ms)
+
+
+def usage_stats() -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for kind, u in _usage.items():
+        calls = u["calls"] or 1
+        out[kind] = {
+            "calls": int(u["calls"]),
+            "errors": int(u["errors"]),
+            "prompt_tokens": int(u["prompt_tokens"]),
+            "completion_tokens": int(u["completion_tokens"]),
+            "avg_prompt_tokens": round(u["prompt_tokens"] / calls, 1),
+            "avg_ms": round(u["total_ms"] / calls, 1),
+        }
+    return out
 
 
 async def chat_completion(messages: List[Dict[str, str]], *,
                           model: Optional[str] = None,
                           temperature: Optional[float] = None,
-                          max_tokens: Optional[int] = None) -> Dict[str, Any]:
-    """Call an OpenAI/Ollama-compatible chat completions endpoint."""
+                          max_tokens: Optional[int] = None,
+                          options: Optional[Dict[str, Any]] = None,
+                          kind: str = "chat") -> Dict[str, Any]:
+    """Call an OpenAI/Ollama-compatible chat completions endpoint.
+
+    ``options`` are extra Ollama model options (e.g. num_ctx); temperature and
+    the token limit are always mirrored there. ``kind`` labels the call in
+    usage_stats().
+    """
     base = settings.AI_BASE_URL.rstrip('/')
     # Be tolerant if AI_BASE_URL was mistakenly set to the full endpoint
     url = base if base.endswith('/chat/completions') else f"{base}/chat/completions"
+    temperature = settings.AI_TEMPERATURE if temperature is None else temperature
+    max_tokens = settings.AI_MAX_TOKENS if max_tokens is None else max_tokens
     payload = {
         "model": model or settings.AI_MODEL,
         "messages": messages,
-        "temperature": settings.AI_TEMPERATURE if temperature is None else temperature,
-        "max_tokens": settings.AI_MAX_TOKENS if max_tokens is None else max_tokens,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
         # Ollama extras are ignored by OpenAI; harmless if unsupported
         "keep_alive": settings.AI_KEEP_ALIVE,
-        "options": {"num_predict": settings.AI_MAX_TOKENS},
+        "options": {**(options or {}), "temperature": temperature, "num_predict": max_tokens},
     }
     headers = {
         "Authorization": f"Bearer {settings.AI_API_KEY}",
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
-    async with httpx.AsyncClient(timeout=180) as client:
-        resp = await client.post(url, headers=headers, json=payload)
-        resp.raise_for_status()
-        return resp.json()
-
-
-async def generate_reply(user_text: str, *, company: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
-    system = default_system_prompt(company)
-    messages = [
-        {"role": "system", "content": system},
-        {"role": "user", "content": user_text},
-    ]
-    data = await chat_completion(messages)
+    import httpx
+    t0 = time.perf_counter()
+    data = None
+    try:
+        async with httpx.AsyncClient(timeout=180) as client:
+            resp = await client.post(url, headers=headers, json=payload)
+            resp.raise_for_status()
+            data = resp.json()
+            return data
+    finally:
+        _record_usage(kind, data, (time.perf_counter() - t0) * 1000)
+
+
+@timed(LLM_SECONDS, status_label="status", function="generate_reply")
+async def generate_reply(user_text: str, *, company: Optional[str] = None,
+                         context: Optional[List[str]] = None) -> Tuple[str, Dict[str, Any]]:
+    """Free-form reply; ``context`` passages from the knowledge base go before the message."""
+    if context:
+        notes = "\n".join(f"- {c}" for c in context)
+        user_text = f"{prompts.CONTEXT_LEAD}{notes}\n\nMessage: {user_text}"
+    messages = prompts.build_messages(prompts.REPLY, user_text, company=company)
+    data = await chat_completion(messages, kind=prompts.REPLY)
     reply = (
         (data.get("choices") or [{}])[0]
         .get("message", {})
@@ -60,16 +112,10 @@ async def generate_reply(user_text: str, *, company: Optional[str] = None) -> Tu
     return reply or "", data
 
 
+@timed(LLM_SECONDS, status_label="status", function="translate")
 async def translate(text: str, target_language: str) -> Tuple[str, Dict[str, Any]]:
-    system = (
-        "You are a translation assistant. Translate the user's message to the target language faithfully, "
-        "preserving meaning and tone. Return only the translated text."
-    )
-    messages = [
-        {"role": "system", "content": system},
-        {"role": "user", "content": f"Target language: {target_language}\nText: {text}"},
-    ]
-    data = await chat_completion(messages, temperature=0.2)
+    messages = prompts.build_messages(prompts.TRANSLATOR, f"{target_language}\nText: {text}")
+    data = await chat_completion(messages, temperature=0.2, kind=prompts.TRANSLATOR)
     out = (
         (data.get("choices") or [{}])[0]
         .get("message", {})
@@ -78,23 +124,15 @@ async def translate(text: str, target_language: str) -> Tuple[str, Dict[str, Any
     return out or "", data
 
 
+@timed(LLM_SECONDS, status_label="status", function="classify_intent")
 async def classify_intent(text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """Classify text into one of predefined intents with confidence.
 
     Returns a tuple: (result, raw_response) where result is a dict
     like {"intent": str, "confidence": float, "reason": str}.
     """
-    system = (
-        "You are an intent classifier for civic festival support. "
-        "Return STRICT JSON with fields: intent (one of: sanitation, emergency, info, guidance, directions, lost_found, other), "
-        "confidence (0..1), reason (short). No extra text."
-        "Interpret synonyms and Hindi phrases, e.g., 'kho gaya/kho gyi' => lost_found; 'how to reach/route/raasta' => guidance/directions."
-    )
-    user = f"Classify this message: {text}"
-    data = await chat_completion([
-        {"role": "system", "content": system},
-        {"role": "user", "content": user},
-    ], temperature=0.1, max_tokens=200)
+    data = await chat_completion(prompts.build_messages(prompts.CLASSIFIER, text),
+                                 temperature=0.1, max_tokens=200, kind=prompts.CLASSIFIER)
     content = (
         (data.get("choices") or [{}])[0]
         .get("message", {})
@@ -110,7 +148,7 @@ async def classify_intent(text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         if start != -1 and end != -1:
             obj = _json.loads(content[start:end+1])
             intent = str(obj.get("intent", "other")).lower()
-            if intent not in {"sanitation", "emergency", "info", "guidance", "directions", "lost_found", "other"}:
+            if intent not in prompts.INTENTS:
                 intent = "other"
             conf = float(obj.get("confidence", 0) or 0)
             reason = str(obj.get("reason", ""))
@@ -120,23 +158,25 @@ async def classify_intent(text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     return result, data
 
 
-async def summarize_conversation(pairs: List[Tuple[str, str]]) -> Tuple[str, Dict[str, Any]]:
+@timed(LLM_SECONDS, status_label="status", function="summarize_conversation")
+async def summarize_conversation(pairs: List[Tuple[str, str]], *,
+                                 previous: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
     """Summarize a conversation as a short brief.
 
     pairs: list of (speaker, text) where speaker is "user" or "admin".
+    previous: an earlier summary that ``pairs`` continue; it is updated
+    rather than re-summarizing the whole chat.
     Returns (summary, raw_response).
     """
-    system = (
-        "You summarize short WhatsApp conversations succinctly (2-4 sentences). "
-        "Mention key issues, requests, actions, and current status."
-    )
     # Build a simple transcript
     transcript = "\n".join([f"{('User' if who=='user' else 'Admin')}: {msg}" for who, msg in pairs])
-    user = f"Summarize this chat briefly:\n\n{transcript}"
-    data = await chat_completion([
-        {"role": "system", "content": system},
-        {"role": "user", "content": user},
-    ], temperature=0.2, max_tokens=250)
+    if previous:
+        messages = prompts.build_messages(prompts.SUMMARY_UPDATER, f"{previous}\n\nNew messages:\n{transcript}")
+        kind = prompts.SUMMARY_UPDATER
+    else:
+        messages = prompts.build_messages(prompts.SUMMARIZER, transcript)
+        kind = prompts.SUMMARIZER
+    data = await chat_completion(messages, temperature=0.2, max_tokens=250, kind=kind)
     out = (
         (data.get("choices") or [{}])[0]
         .get("message", {})
@@ -0,0 +1,69 @@
+"""Background execution of approved agent actions.
+
+Deciding an approval only records the decision and queues the id; a small
+pool of workers runs the tool afterwards, so approving a broadcast does not
+hold the HTTP request open. Status moves pending -> approved (queued) ->
+running -> executed | failed, or pending -> denied. The api module sets
+``executor``; approvals left queued by a restart are picked up again.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, Optional
+from sqlmodel import Session, select
+from ..config import get_settings
+from ..database import engine
+from ..models import Approval
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.approvals")
+
+
+class ApprovalQueue:
+    def __init__(self) -> None:
+        self._queue: Optional["asyncio.Queue[int]"] = None
+        self.executor: Optional[Callable[[int], Awaitable[None]]] = None
+
+    def _q(self) -> "asyncio.Queue[int]":
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def enqueue(self, ids: Iterable[int]) -> None:
+        q = self._q()
+        for i in ids:
+            q.put_nowait(i)
+
+    def depth(self) -> int:
+        return self._q().qsize() if self._queue is not None else 0
+
+    async def _worker(self, n: int) -> None:
+        q = self._q()
+        while True:
+            approval_id = await q.get()
+            try:
+                if self.executor is not None:
+                    await self.executor(approval_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("approval worker=%d id=%d failed error=%s", n, approval_id, str(e))
+            finally:
+                q.task_done()
+
+    async def run(self) -> None:
+        with Session(engine) as s:
+            # queued before a restart; "running" ones may have half-run, so they are not retried
+            ids = s.exec(select(Approval.id).where(Approval.status == "approved")
+                         .order_by(Approval.created_at.asc())).all()
+        self.enqueue(ids)
+        workers = [asyncio.create_task(self._worker(n)) for n in range(max(1, settings.APPROVAL_WORKERS))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+
+
+approval_queue = ApprovalQueue()
@@ -0,0 +1,270 @@
+"""Hot/cold tiers for the message log.
+
+The ``message`` table holds only the last ``ARCHIVE_HOT_DAYS`` UTC days. A
+background loop compacts each older day into ``messages-YYYY-MM-DD.jsonl.gz``
+under ``ARCHIVE_DIR`` (rows sorted by timestamp, id), records it in
+``MessageArchive`` and deletes those rows in the same transaction. Rows that
+arrive late for an archived day are merged into its file on the next pass.
+
+``iter_messages`` routes a time range to the cold files and the hot table
+it overlaps and merges both in timestamp order; ``messages_after`` does the
+same for the id cursor used by /api/messages and summaries. Full-text
+search only covers the hot table (``archived_through`` says up to where).
+"""
+from __future__ import annotations
+import asyncio
+import gzip
+import heapq
+import itertools
+import json
+import logging
+import os
+from datetime import date, datetime, time as dtime, timedelta
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import delete, func, text
+from sqlmodel import Session, select
+from ..config import get_settings
+from ..database import engine
+from ..models import Message, MessageArchive
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.archive")
+
+_CHUNK = 5000
+_lock = asyncio.Lock()
+
+
+def _row(m: Message) -> Dict[str, Any]:
+    return {"id": m.id, "phone_number": m.phone_number, "body": m.body, "timestamp": m.timestamp.isoformat(),
+            "language": m.language, "is_from_admin": m.is_from_admin}
+
+
+def _read(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            rec["timestamp"] = datetime.fromisoformat(rec["timestamp"])
+            yield rec
+
+
+def _day_bounds(day: date) -> tuple:
+    start = datetime.combine(day, dtime.min)
+    return start, start + timedelta(days=1)
+
+
+def compact_day(day: date) -> Optional[MessageArchive]:
+    """Move one day's hot rows into its cold file; returns the updated catalog row.
+
+    Hot rows (read in keyset chunks) and the existing file are both sorted by
+    (timestamp, id), so they are merged straight into the new file without
+    holding either in memory. Only rows that existed when the pass started are
+    moved; later arrivals stay hot until the next pass.
+    """
+    start, end = _day_bounds(day)
+    with Session(engine) as session:
+        upto = session.exec(
+            select(func.max(Message.id)).where(Message.timestamp >= start, Message.timestamp < end)
+        ).one()
+        if upto is None:
+            return None
+        entry = session.get(MessageArchive, day.isoformat())
+        hot = _iter_hot(start, end, None, max_id=upto)
+        old = _read(entry.path) if entry is not None and os.path.exists(entry.path) else iter(())
+        os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+        path = os.path.join(settings.ARCHIVE_DIR, f"messages-{day.isoformat()}.jsonl.gz")
+        tmp = path + ".tmp"
+        count, moved, min_id, max_id = 0, 0, None, None
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            # hot first so a row left behind by an interrupted pass is written once, from the table
+            merged = heapq.merge(((r, 0) for r in hot), ((r, 1) for r in old),
+                                 key=lambda x: (x[0]["timestamp"], x[0]["id"], x[1]))
+            last = None
+            for r, tier in merged:
+                key = (r["timestamp"], r["id"])
+                if key == last:
+                    continue
+                last = key
+                moved += tier == 0
+                count += 1
+                min_id = r["id"] if min_id is None else min(min_id, r["id"])
+                max_id = r["id"] if max_id is None else max(max_id, r["id"])
+                f.write(json.dumps(dict(r, timestamp=r["timestamp"].isoformat()), ensure_ascii=False))
+                f.write("\n")
+        os.replace(tmp, path)
+        entry = entry or MessageArchive(day=day.isoformat(), path=path)
+        entry.path = path
+        entry.rows = count
+        entry.min_id = min_id
+        entry.max_id = max_id
+        entry.bytes = os.path.getsize(path)
+        entry.created_at = datetime.utcnow()
+        session.add(entry)
+        # the file is complete before the rows go; a crash in between leaves them hot and they are re-merged
+        session.exec(delete(Message).where(Message.timestamp >= start, Message.timestamp < end, Message.id <= upto))
+        session.commit()
+        session.refresh(entry)
+        logger.info("archived day=%s rows=%d moved=%d bytes=%d", entry.day, entry.rows, moved, entry.bytes)
+        return entry
+
+
+def compact(now: Optional[datetime] = None) -> List[MessageArchive]:
+    """Archive every day older than the hot window."""
+    cutoff = datetime.combine((now or datetime.utcnow()).date() - timedelta(days=settings.ARCHIVE_HOT_DAYS), dtime.min)
+    with Session(engine) as session:
+        days = session.exec(
+            select(func.date(Message.timestamp)).where(Message.timestamp < cutoff).distinct()
+        ).all()
+    out = []
+    for d in sorted(days):
+        entry = compact_day(date.fromisoformat(d))
+        if entry is not None:
+            out.append(entry)
+    return out
+
+
+def partitions() -> List[MessageArchive]:
+    with Session(engine) as session:
+        return session.exec(select(MessageArchive).order_by(MessageArchive.day)).all()
+
+
+def _iter_cold(since: Optional[datetime], until: Optional[datetime], phone: Optional[str]) -> Iterator[Dict[str, Any]]:
+    for entry in partitions():
+        start, end = _day_bounds(date.fromisoformat(entry.day))
+        if (since and end <= since) or (until and start >= until) or not os.path.exists(entry.path):
+            continue
+        for r in _read(entry.path):
+            if (since and r["timestamp"] < since) or (until and r["timestamp"] >= until):
+                continue
+            if phone and r["phone_number"] != phone:
+                continue
+            yield r
+
+
+def _iter_hot(since: Optional[datetime], until: Optional[datetime], phone: Optional[str], *,
+              max_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    last = None  # (timestamp, id) keyset so each chunk is a short indexed query
+    with Session(engine) as session:
+        while True:
+            q = select(Message)
+            if since:
+                q = q.where(Message.timestamp >= since)
+            if until:
+                q = q.where(Message.timestamp < until)
+            if phone:
+                q = q.where(Message.phone_number == phone)
+            if max_id is not None:
+                q = q.where(Message.id <= max_id)
+            if last:
+                q = q.where((Message.timestamp > last[0]) | ((Message.timestamp == last[0]) & (Message.id > last[1])))
+            rows = session.exec(q.order_by(Message.timestamp, Message.id).limit(_CHUNK)).all()
+            for m in rows:
+                yield dict(_row(m), timestamp=m.timestamp)
+            if len(rows) < _CHUNK:
+                return
+            last = (rows[-1].timestamp, rows[-1].id)
+
+
+def iter_messages(since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  phone: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Messages in [since, until) from both tiers, ordered by (timestamp, id)."""
+    return heapq.merge(_iter_cold(since, until, phone), _iter_hot(since, until, phone),
+                       key=lambda r: (r["timestamp"], r["id"]))
+
+
+def _cold_after(after_id: int, phone: Optional[str], newest: bool) -> Iterator[Dict[str, Any]]:
+    """Archived rows with id > ``after_id`` in id order (descending if ``newest``), opening partitions lazily.
+
+    Files are sorted by timestamp, and late rows make id ranges overlap across
+    days, so each partition is sorted on its own when opened. A partition is
+    opened only once the merge reaches its first id; at most the overlapping
+    ones are in memory, and a consumer that stops early never reads the rest.
+    """
+    sign = -1 if newest else 1
+    first = (lambda e: -e.max_id) if newest else (lambda e: e.min_id)
+    pending = sorted((e for e in partitions() if e.max_id is not None and e.max_id > after_id
+                      and os.path.exists(e.path)), key=first, reverse=True)
+    heap: List[tuple] = []
+    seq = itertools.count()  # tie-break so dicts are never compared
+    while heap or pending:
+        while pending and (not heap or first(pending[-1]) <= heap[0][0]):
+            entry = pending.pop()
+            for r in _read(entry.path):
+                if r["id"] > after_id and (not phone or r["phone_number"] == phone):
+                    heapq.heappush(heap, (sign * r["id"], next(seq), r))
+        if heap:
+            yield heapq.heappop(heap)[2]
+
+
+def messages_after(after_id: int = 0, *, phone: Optional[str] = None,
+                   limit: Optional[int] = None, newest: bool = False) -> List[Dict[str, Any]]:
+    """Messages with id > ``after_id`` from both tiers, in id order.
+
+    With ``newest`` the last ``limit`` of them are returned instead of the
+    first (still in id order). Only partitions whose ``max_id`` passes the
+    cursor are opened, and only as far as ``limit`` needs, so a client that
+    is caught up never touches the cold files.
+    """
+    def hot() -> Iterator[Dict[str, Any]]:
+        last = None
+        with Session(engine) as session:
+            while True:
+                q = select(Message).where(Message.id > after_id)
+                if phone:
+                    q = q.where(Message.phone_number == phone)
+                if last is not None:
+                    q = q.where(Message.id < last if newest else Message.id > last)
+                rows = session.exec(q.order_by(Message.id.desc() if newest else Message.id).limit(_CHUNK)).all()
+                for m in rows:
+                    yield dict(_row(m), timestamp=m.timestamp)
+                if len(rows) < _CHUNK:
+                    return
+                last = rows[-1].id
+
+    out = list(itertools.islice(heapq.merge(_cold_after(after_id, phone, newest), hot(),
+                                            key=itemgetter("id"), reverse=newest), limit))
+    if newest:
+        out.reverse()
+    return out
+
+
+def ensure_id_high_water() -> None:
+    """Keep the message id sequence past every archived id.
+
+    ``message`` is AUTOINCREMENT, but a database that compacted its newest
+    rows before that (or was rebuilt from the hot rows alone) may have a
+    sequence below ids that live only in the archive.
+    """
+    with engine.begin() as conn:
+        high = conn.execute(text("SELECT COALESCE(MAX(max_id), 0) FROM messagearchive")).scalar()
+        seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'message'")).scalar()
+        if high and (seq or 0) < high:
+            conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'message'"))
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('message', :seq)"), {"seq": high})
+            logger.info("message id sequence raised from %s to %s", seq or 0, high)
+
+
+def archived_through() -> Optional[str]:
+    """Latest archived UTC day (YYYY-MM-DD), or None when nothing has been archived."""
+    with Session(engine) as session:
+        return session.exec(select(func.max(MessageArchive.day))).one()
+
+
+async def run_archiver() -> None:
+    if not settings.ARCHIVE_ENABLED:
+        return
+    while True:
+        try:
+            async with _lock:
+                await asyncio.to_thread(compact)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("archive pass failed error=%s", str(e))
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+async def compact_now() -> List[MessageArchive]:
+    async with _lock:
+        return await asyncio.to_thread(compact)
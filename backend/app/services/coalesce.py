@@ -0,0 +1,118 @@
+"""Debounce multi-part messages into one conversational turn.
+
+Pilgrims often split one request across quick messages ("hello", "zone 4",
+"toilet very dirty"). ``add`` buffers each text per phone and (re)arms a
+timer; when no new message arrives within the window, or the turn has
+waited ``COALESCE_MAX_WAIT_SECONDS`` since its first message, ``processor``
+gets the joined text once, plus the joined non-urgent texts (urgent ones are
+handled by the priority lane and must not be classified twice). ``drain``
+flushes whatever is still buffered on shutdown.
+
+The window adapts to load: it starts at ``COALESCE_WINDOW_SECONDS`` and
+grows toward ``COALESCE_MAX_WINDOW_SECONDS`` as more turns are being
+processed at once, merging more aggressively when the model is busy.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from ..config import get_settings
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.coalesce")
+
+# (phone, joined text, message count, joined non-urgent text)
+Processor = Callable[[str, str, int, str], Awaitable[None]]
+
+
+class _Turn:
+    __slots__ = ("texts", "plain", "count", "first_at", "timer", "task")
+
+    def __init__(self, now: float) -> None:
+        self.texts: List[str] = []
+        self.plain: List[str] = []  # texts that were not urgent
+        self.count = 0
+        self.first_at = now
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class Debouncer:
+    def __init__(self) -> None:
+        self._turns: Dict[str, _Turn] = {}
+        self._running: Set[asyncio.Task] = set()  # strong refs until each flush finishes
+        self.processor: Optional[Processor] = None
+        self.inflight = 0
+        self.turns = 0
+        self.messages = 0
+
+    def window(self) -> float:
+        base = settings.COALESCE_WINDOW_SECONDS
+        grown = base * (1 + self.inflight / max(1, settings.COALESCE_LOAD_REF))
+        return min(settings.COALESCE_MAX_WINDOW_SECONDS, grown)
+
+    def add(self, phone: str, text: str, *, count: int = 1, urgent: bool = False) -> None:
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        turn = self._turns.get(phone)
+        if turn is None:
+            turn = self._turns[phone] = _Turn(now)
+        elif turn.timer is not None:
+            turn.timer.cancel()
+        turn.texts.append(text)
+        if not urgent:
+            turn.plain.append(text)
+        turn.count += count
+        delay = min(self.window(), max(0.0, settings.COALESCE_MAX_WAIT_SECONDS - (now - turn.first_at)))
+        turn.timer = loop.call_later(delay, self._start, phone, turn)
+
+    def _start(self, phone: str, turn: _Turn) -> None:
+        if self._turns.get(phone) is not turn:
+            return
+        del self._turns[phone]
+        turn.task = asyncio.get_running_loop().create_task(self._flush(phone, turn))
+        self._running.add(turn.task)
+        turn.task.add_done_callback(self._running.discard)
+
+    async def _flush(self, phone: str, turn: _Turn) -> None:
+        if self.processor is None:
+            return
+        self.turns += 1
+        self.messages += turn.count
+        self.inflight += 1
+        try:
+            await self.processor(phone, "\n".join(turn.texts), turn.count, "\n".join(turn.plain))
+        except Exception as e:
+            logger.warning("turn failed phone=%s error=%s", phone, str(e))
+        finally:
+            self.inflight -= 1
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Flush every buffered turn now and wait (up to ``timeout``) for running ones."""
+        for phone, turn in list(self._turns.items()):
+            if turn.timer is not None:
+                turn.timer.cancel()
+            self._start(phone, turn)
+        if self._running:
+            _done, pending = await asyncio.wait(set(self._running), timeout=timeout)
+            if pending:
+                logger.warning("shutdown left %d turns unfinished", len(pending))
+
+    def depth(self) -> int:
+        return len(self._turns)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.COALESCE_ENABLED,
+            "window_seconds": round(self.window(), 2),
+            "pending_turns": self.depth(),
+            "inflight_turns": self.inflight,
+            "turns": self.turns,
+            "messages": self.messages,
+            "messages_per_turn": round(self.messages / self.turns, 2) if self.turns else 0.0,
+        }
+
+
+debouncer = Debouncer()
@@ -0,0 +1,156 @@
+"""Per-phone conversation state kept in memory with write-behind to SQLite.
+
+Holds what the reply pipeline needs between messages (last intent, pending
+destination, whether a location was requested, language, zone) so follow-ups
+do not re-scan the message history. The pending destination and location
+request are dropped once a conversation has been idle for
+``CONVERSATION_PENDING_TTL_SECONDS``. The store is a bounded LRU; changed
+records are written back by a background loop, and evicted ones are queued
+for the next flush.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session
+from ..config import get_settings
+from ..database import engine
+from ..models import ConversationState
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.conversation")
+
+
+class StateRecord:
+    __slots__ = (
+        "phone_number",
+        "last_intent",
+        "pending_destination",
+        "location_requested",
+        "language",
+        "zone",
+        "updated_at",
+        "dirty",
+    )
+
+    def __init__(self, phone_number: str) -> None:
+        self.phone_number = phone_number
+        self.last_intent: Optional[str] = None
+        self.pending_destination: Optional[str] = None
+        self.location_requested = False
+        self.language: Optional[str] = None
+        self.zone: Optional[str] = None
+        self.updated_at = datetime.utcnow()
+        self.dirty = False
+
+    def update(self, **fields) -> None:
+        changed = False
+        for k, v in fields.items():
+            if getattr(self, k) != v:
+                setattr(self, k, v)
+                changed = True
+        if changed:
+            self.updated_at = datetime.utcnow()
+            self.dirty = True
+
+    def expire_pending(self, ttl_seconds: int) -> None:
+        if (self.pending_destination or self.location_requested) \
+                and datetime.utcnow() - self.updated_at > timedelta(seconds=ttl_seconds):
+            self.update(pending_destination=None, location_requested=False)
+
+
+class ConversationStore:
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._items: "OrderedDict[str, StateRecord]" = OrderedDict()
+        self._evicted: Dict[str, StateRecord] = {}
+        self._failed: List[Tuple] = []
+
+    def get(self, phone_number: str) -> StateRecord:
+        rec = self._items.get(phone_number)
+        if rec is not None:
+            self._items.move_to_end(phone_number)
+            return rec
+        rec = self._evicted.pop(phone_number, None) or self._load(phone_number)
+        self._items[phone_number] = rec
+        while len(self._items) > self.max_size:
+            _, old = self._items.popitem(last=False)
+            if old.dirty:
+                self._evicted[old.phone_number] = old
+        return rec
+
+    def _load(self, phone_number: str) -> StateRecord:
+        rec = StateRecord(phone_number)
+        try:
+            with Session(engine) as s:
+                row = s.get(ConversationState, phone_number)
+                if row is not None:
+                    rec.last_intent = row.last_intent
+                    rec.pending_destination = row.pending_destination
+                    rec.location_requested = row.location_requested
+                    rec.language = row.language
+                    rec.zone = row.zone
+                    rec.updated_at = row.updated_at
+        except Exception as e:
+            logger.warning("conversation state load failed phone=%s error=%s", phone_number, str(e))
+        return rec
+
+    def collect(self) -> List[Tuple]:
+        """Snapshot dirty records for writing; call from the event loop thread."""
+        pending = [r for r in self._items.values() if r.dirty] + list(self._evicted.values())
+        self._evicted.clear()
+        rows, self._failed = self._failed, []
+        for r in pending:
+            r.dirty = False
+            rows.append((r.phone_number, r.last_intent, r.pending_destination,
+                         r.location_requested, r.language, r.zone, r.updated_at))
+        return rows
+
+    def write(self, rows: List[Tuple]) -> int:
+        """Persist a snapshot from collect(); safe to run in a worker thread."""
+        latest = {row[0]: row for row in rows}
+        try:
+            with Session(engine) as s:
+                for pn, intent, dest, requested, lang, zone, updated_at in latest.values():
+                    row = s.get(ConversationState, pn) or ConversationState(phone_number=pn)
+                    row.last_intent = intent
+                    row.pending_destination = dest
+                    row.location_requested = requested
+                    row.language = lang
+                    row.zone = zone
+                    row.updated_at = updated_at
+                    s.add(row)
+                s.commit()
+        except Exception as e:
+            self._failed = list(latest.values()) + self._failed
+            logger.warning("conversation state flush failed count=%d error=%s", len(latest), str(e))
+            return 0
+        return len(latest)
+
+    def flush(self) -> int:
+        rows = self.collect()
+        return self.write(rows) if rows else 0
+
+
+store = ConversationStore(settings.CONVERSATION_STATE_MAX)
+
+
+def get_state(phone_number: str) -> StateRecord:
+    rec = store.get(phone_number)
+    rec.expire_pending(settings.CONVERSATION_PENDING_TTL_SECONDS)
+    return rec
+
+
+async def run_flusher() -> None:
+    try:
+        while True:
+            await asyncio.sleep(settings.CONVERSATION_FLUSH_SECONDS)
+            rows = store.collect()
+            if rows:
+                await asyncio.to_thread(store.write, rows)
+    except asyncio.CancelledError:
+        store.flush()
+        raise
@@ -0,0 +1,197 @@
+"""Outbound delivery ledger for Samwad sends.
+
+``send`` records every text send as an ``OutboundMessage`` row with the
+provider message id, attempt count and status. Failed sends are marked
+``retrying`` with a full-jitter exponential backoff and picked up by
+``run_retrier`` until ``DELIVERY_MAX_ATTEMPTS``, then marked ``failed``.
+Provider status callbacks (sent/delivered/read/failed) arriving on the
+webhook are applied by ``ingest_statuses``; a status never moves backwards.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlmodel import Session, select
+from ..config import get_settings
+from ..database import engine
+from ..models import OutboundMessage
+from .samwad import send_via_samwad
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.delivery")
+
+_RANK = {"queued": 0, "retrying": 0, "failed": 1, "sent": 2, "delivered": 3, "read": 4}
+_PROVIDER_STATUS = {"sent": "sent", "delivered": "delivered", "read": "read", "seen": "read",
+                    "failed": "failed", "undelivered": "failed", "error": "failed"}
+_ID_KEYS = ("message_id", "messageId", "wamid", "id")
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    cap = min(settings.DELIVERY_RETRY_MAX_SECONDS, settings.DELIVERY_RETRY_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def _provider_id(resp: Dict[str, Any]) -> Optional[str]:
+    for d in (resp, resp.get("data") if isinstance(resp.get("data"), dict) else None):
+        if not d:
+            continue
+        for k in _ID_KEYS:
+            if d.get(k):
+                return str(d[k])
+        msgs = d.get("messages")
+        if isinstance(msgs, list) and msgs and isinstance(msgs[0], dict) and msgs[0].get("id"):
+            return str(msgs[0]["id"])
+    return None
+
+
+def _record(row_id: int, resp: Dict[str, Any], retry: bool) -> OutboundMessage:
+    with Session(engine) as s:
+        row = s.get(OutboundMessage, row_id)
+        row.attempts += 1
+        if (resp or {}).get("status") == "ok":
+            row.provider_id = _provider_id(resp) or row.provider_id
+            if _RANK[row.status] < _RANK["sent"]:
+                row.status = "sent"
+            row.sent_at = row.sent_at or datetime.utcnow()
+            row.next_attempt_at = None
+            row.last_error = None
+        else:
+            row.last_error = str((resp or {}).get("error") or (resp or {}).get("text") or resp)[:500]
+            if retry and row.attempts < settings.DELIVERY_MAX_ATTEMPTS:
+                row.status = "retrying"
+                row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(row.attempts))
+            else:
+                row.status = "failed"
+                row.next_attempt_at = None
+        s.add(row)
+        s.commit()
+        s.refresh(row)
+        return row
+
+
+async def send(phone_number: str, body: str, *, zone: Optional[str] = None, broadcast_id: Optional[int] = None,
+               image: Optional[Tuple[str, bytes, str]] = None) -> Dict[str, Any]:
+    """Send through Samwad and record it; returns the provider response like ``send_via_samwad``."""
+    with Session(engine) as s:
+        row = OutboundMessage(phone_number=phone_number, body=body, zone=zone, broadcast_id=broadcast_id)
+        s.add(row)
+        s.commit()
+        row_id = row.id
+    resp = await send_via_samwad(phone_number, body, image=image)
+    # image bytes are not kept, so media sends are not retried
+    row = _record(row_id, resp, retry=image is None)
+    resp = dict(resp or {})
+    resp["outbound_id"] = row.id
+    if row.status == "retrying":
+        logger.info("send failed, retrying id=%s phone=%s error=%s", row.id, phone_number, row.last_error)
+    return resp
+
+
+async def retry_due(limit: int = 100) -> int:
+    now = datetime.utcnow()
+    with Session(engine) as s:
+        due = s.exec(
+            select(OutboundMessage)
+            .where(OutboundMessage.status == "retrying", OutboundMessage.next_attempt_at <= now)
+            .order_by(OutboundMessage.next_attempt_at)
+            .limit(limit)
+        ).all()
+        jobs = [(r.id, r.phone_number, r.body) for r in due]
+
+    async def one(row_id: int, phone: str, body: str) -> None:
+        resp = await send_via_samwad(phone, body)
+        row = _record(row_id, resp, retry=True)
+        if row.status == "failed":
+            logger.warning("send gave up id=%s phone=%s attempts=%d error=%s", row.id, phone, row.attempts, row.last_error)
+
+    await asyncio.gather(*(one(*j) for j in jobs))
+    return len(jobs)
+
+
+async def run_retrier() -> None:
+    while True:
+        await asyncio.sleep(settings.DELIVERY_RETRY_POLL_SECONDS)
+        try:
+            await retry_due()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("retry pass failed error=%s", str(e))
+
+
+def parse_statuses(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Delivery receipts in a webhook payload: Meta ``statuses`` arrays or a flat {id, status} body."""
+    out: List[Dict[str, Any]] = []
+    if not isinstance(data, dict):
+        return out
+    if data.get("object") == "whatsapp_business_account":
+        for entry in data.get("entry") or []:
+            for change in (entry or {}).get("changes") or []:
+                out.extend((change or {}).get("value", {}).get("statuses") or [])
+    elif isinstance(data.get("statuses"), list):
+        out.extend(data["statuses"])
+    elif data.get("status") in _PROVIDER_STATUS and any(data.get(k) for k in _ID_KEYS) and not data.get("body"):
+        out.append(data)
+    return [s for s in out if isinstance(s, dict)]
+
+
+def ingest_statuses(statuses: List[Dict[str, Any]]) -> int:
+    """Apply provider receipts to the ledger; returns the number of rows updated."""
+    updated = 0
+    with Session(engine) as s:
+        for st in statuses:
+            pid = next((str(st[k]) for k in _ID_KEYS if st.get(k)), None)
+            status = _PROVIDER_STATUS.get(str(st.get("status") or "").lower())
+            if not pid or not status:
+                continue
+            row = s.exec(select(OutboundMessage).where(OutboundMessage.provider_id == pid)).first()
+            if row is None:
+                continue
+            # a failure receipt normally follows "sent"; otherwise statuses only move forward
+            if status == "failed" and row.status in ("delivered", "read", "failed"):
+                continue
+            if status != "failed" and _RANK[status] <= _RANK[row.status]:
+                continue
+            try:
+                at = datetime.utcfromtimestamp(int(st["timestamp"]))
+            except (KeyError, TypeError, ValueError):
+                at = datetime.utcnow()
+            row.status = status
+            if status in ("delivered", "read"):
+                row.delivered_at = row.delivered_at or at
+            if status == "read":
+                row.read_at = at
+            if status == "failed":
+                row.last_error = str(st.get("errors") or st.get("error") or "provider reported failure")[:500]
+            s.add(row)
+            updated += 1
+        s.commit()
+    return updated
+
+
+def stats(since: datetime, by: str = "zone") -> List[Dict[str, Any]]:
+    """Sends, failure rate and delivery latency per zone or per broadcast since ``since``."""
+    col = {"zone": "zone", "broadcast": "broadcast_id"}[by]
+    sql = text(
+        f"SELECT {col} AS grp, COUNT(*) AS total, "
+        "SUM(status = 'failed') AS failed, SUM(status = 'retrying') AS retrying, "
+        "SUM(status IN ('delivered', 'read')) AS delivered, SUM(status = 'read') AS read, "
+        "AVG(attempts) AS avg_attempts, "
+        "AVG((julianday(delivered_at) - julianday(created_at)) * 86400.0) AS avg_delivery_s, "
+        "MAX((julianday(delivered_at) - julianday(created_at)) * 86400.0) AS max_delivery_s "
+        f"FROM outboundmessage WHERE created_at >= :since{' AND broadcast_id IS NOT NULL' if by == 'broadcast' else ''} "
+        f"GROUP BY {col} ORDER BY total DESC"
+    ).bindparams(since=since.isoformat(sep=" "))
+    with engine.connect() as conn:
+        rows = [dict(r._mapping) for r in conn.execute(sql)]
+    for r in rows:
+        r["failure_rate"] = round((r["failed"] or 0) / r["total"], 4) if r["total"] else 0.0
+        for k in ("avg_attempts", "avg_delivery_s", "max_delivery_s"):
+            if r[k] is not None:
+                r[k] = round(r[k], 3)
+    return rows
@@ -0,0 +1,173 @@
+"""Streaming bulk exports of messages, feedback and assignments.
+
+Rows are read in fixed-size keyset chunks (``WHERE id > :last ORDER BY id
+LIMIT n``) with the filters in SQL, and encoded chunk by chunk, so memory
+stays flat regardless of export size. Messages come from
+``archive.iter_messages`` and include the cold tier. The generators are
+synchronous; Starlette iterates them in its threadpool, so a long export
+does not block the event loop.
+
+Formats: ``csv``, ``ndjson`` and ``parquet`` (needs the optional pyarrow
+package; one row group per chunk).
+"""
+from __future__ import annotations
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import orjson
+from sqlmodel import Session, select
+from ..database import engine
+from ..models import Feedback, FeedbackAssignment
+from . import archive
+
+
+CHUNK_ROWS = 5000
+FORMATS = ("csv", "ndjson", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+COLUMNS: Dict[str, List[str]] = {
+    "messages": ["id", "phone_number", "body", "timestamp", "language", "is_from_admin"],
+    "feedback": ["id", "phone_number", "category", "status", "location", "zone", "message", "created_at"],
+    "assignments": ["id", "feedback_id", "assignee", "note", "assigned_at"],
+}
+
+
+# column types for Parquet; anything not listed is a string
+_INT_COLUMNS = frozenset(("id", "feedback_id"))
+_TIME_COLUMNS = frozenset(("timestamp", "created_at", "assigned_at"))
+_BOOL_COLUMNS = frozenset(("is_from_admin",))
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+def _iter_model(model, where: list) -> Iterator[Dict[str, Any]]:
+    last = 0
+    with Session(engine) as session:
+        while True:
+            rows = session.exec(select(model).where(model.id > last, *where).order_by(model.id).limit(CHUNK_ROWS)).all()
+            for r in rows:
+                yield r.model_dump()
+            if len(rows) < CHUNK_ROWS:
+                return
+            last = rows[-1].id
+            session.expunge_all()
+
+
+def iter_rows(dataset: str, *, since: Optional[datetime] = None, until: Optional[datetime] = None,
+              phone: Optional[str] = None, category: Optional[str] = None, status: Optional[str] = None,
+              zone: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    if dataset == "messages":
+        return archive.iter_messages(since, until, phone)
+    if dataset == "feedback":
+        where = []
+        if since:
+            where.append(Feedback.created_at >= since)
+        if until:
+            where.append(Feedback.created_at < until)
+        for col, val in (("phone_number", phone), ("category", category), ("status", status), ("zone", zone)):
+            if val:
+                where.append(getattr(Feedback, col) == val)
+        return _iter_model(Feedback, where)
+    if dataset == "assignments":
+        where = []
+        if since:
+            where.append(FeedbackAssignment.assigned_at >= since)
+        if until:
+            where.append(FeedbackAssignment.assigned_at < until)
+        return _iter_model(FeedbackAssignment, where)
+    raise KeyError(dataset)
+
+
+def _chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for r in rows:
+        chunk.append(r)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv(columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for chunk in _chunks(rows):
+        for r in chunk:
+            writer.writerow([v.isoformat() if isinstance(v, datetime) else v for v in (r.get(c) for c in columns)])
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson(columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for chunk in _chunks(rows):
+        yield b"".join(orjson.dumps({c: r.get(c) for c in columns}) + b"\n" for r in chunk)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # the parquet writer records column chunk offsets from tell()
+        return self._pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def _parquet_modules():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("parquet export needs pyarrow")
+    return pa, pq
+
+
+def _parquet(columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    pa, pq = _parquet_modules()
+    # explicit schema: a chunk where a column is all null would otherwise infer the wrong type
+    schema = pa.schema([
+        (c, pa.int64() if c in _INT_COLUMNS else pa.timestamp("us") if c in _TIME_COLUMNS
+         else pa.bool_() if c in _BOOL_COLUMNS else pa.string())
+        for c in columns
+    ])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    for chunk in _chunks(rows):
+        writer.write_table(pa.Table.from_pylist([{c: r.get(c) for c in columns} for r in chunk], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+_ENCODERS = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}
+
+
+def stream(dataset: str, fmt: str, **filters: Any) -> Iterator[bytes]:
+    """Encoded export body; raises ExportUnavailable before streaming if the format cannot be produced."""
+    if fmt == "parquet":
+        _parquet_modules()
+    return _ENCODERS[fmt](COLUMNS[dataset], iter_rows(dataset, **filters))
@@ -0,0 +1,294 @@
+"""Zone lookup for shared WhatsApp locations.
+
+Zone polygons are read from a GeoJSON FeatureCollection (settings.ZONES_GEOJSON_PATH).
+Each feature needs a ``zone`` (or ``name``) property and a Polygon/MultiPolygon
+geometry. At load time every geohash cell touching a polygon is precomputed into
+a table: cells lying fully inside one zone map straight to its name, boundary
+cells keep a short candidate list that is settled with a point-in-polygon test.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from ..config import get_settings
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.geo")
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEO_RE = re.compile(r"^\s*geo:\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)")
+
+Ring = List[Tuple[float, float]]  # (lng, lat) pairs, GeoJSON order
+
+
+def encode_geohash(lat: float, lng: float, precision: int) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    out = []
+    bits = 0
+    ch = 0
+    even = True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits = 0
+            ch = 0
+    return "".join(out)
+
+
+def geohash_bounds(gh: str) -> Tuple[float, float, float, float]:
+    """Return (lat_lo, lat_hi, lng_lo, lng_hi) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for c in gh:
+        v = _BASE32.index(c)
+        for shift in (4, 3, 2, 1, 0):
+            bit = (v >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def geohash_center(gh: str) -> Tuple[float, float]:
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(gh)
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+def parse_geo(body: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parse a ``geo:lat,lng`` message body into (lat, lng)."""
+    if not body:
+        return None
+    m = _GEO_RE.match(body)
+    if not m:
+        return None
+    lat, lng = float(m.group(1)), float(m.group(2))
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+def _point_in_ring(lng: float, lat: float, ring: Ring) -> bool:
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / ((yj - yi) or 1e-300) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _segment_hits_box(x0: float, y0: float, x1: float, y1: float,
+                      xmin: float, xmax: float, ymin: float, ymax: float) -> bool:
+    """Liang-Barsky clip test: does segment (x0,y0)-(x1,y1) touch the box?"""
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        r = q / p
+        if p < 0:
+            if r > t1:
+                return False
+            t0 = max(t0, r)
+        else:
+            if r < t0:
+                return False
+            t1 = min(t1, r)
+    return True
+
+
+class _Zone:
+    __slots__ = ("name", "polygons", "bbox")
+
+    def __init__(self, name: str, polygons: List[List[Ring]]) -> None:
+        self.name = name
+        # each polygon: [outer, hole, hole, ...]
+        self.polygons = polygons
+        xs = [x for poly in polygons for x, _ in poly[0]]
+        ys = [y for poly in polygons for _, y in poly[0]]
+        self.bbox = (min(ys), max(ys), min(xs), max(xs))  # lat_lo, lat_hi, lng_lo, lng_hi
+
+    def contains(self, lat: float, lng: float) -> bool:
+        lat_lo, lat_hi, lng_lo, lng_hi = self.bbox
+        if not (lat_lo <= lat <= lat_hi and lng_lo <= lng <= lng_hi):
+            return False
+        for poly in self.polygons:
+            if _point_in_ring(lng, lat, poly[0]) and not any(_point_in_ring(lng, lat, h) for h in poly[1:]):
+                return True
+        return False
+
+    def edge_hits_box(self, lat_lo: float, lat_hi: float, lng_lo: float, lng_hi: float) -> bool:
+        for poly in self.polygons:
+            for ring in poly:
+                for i in range(len(ring) - 1):
+                    (x0, y0), (x1, y1) = ring[i], ring[i + 1]
+                    if _segment_hits_box(x0, y0, x1, y1, lng_lo, lng_hi, lat_lo, lat_hi):
+                        return True
+        return False
+
+
+class ZoneIndex:
+    """Precomputed geohash -> zone table over a set of zone polygons."""
+
+    def __init__(self, zones: Sequence[_Zone], precision: int) -> None:
+        self.zones = list(zones)
+        self.precision = precision
+        # value is a zone name (cell fully inside) or candidate zone indexes (boundary cell)
+        self.cells: Dict[str, Union[str, Tuple[int, ...]]] = {}
+        self._build()
+
+    def _build(self) -> None:
+        if not self.zones:
+            return
+        # Size of one cell at this precision
+        lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(encode_geohash(0.0, 0.0, self.precision))
+        dlat, dlng = lat_hi - lat_lo, lng_hi - lng_lo
+        candidates: Dict[str, List[int]] = {}
+        for idx, z in enumerate(self.zones):
+            zlat_lo, zlat_hi, zlng_lo, zlng_hi = z.bbox
+            lat = zlat_lo
+            while lat <= zlat_hi + dlat:
+                lng = zlng_lo
+                while lng <= zlng_hi + dlng:
+                    gh = encode_geohash(min(lat, 90.0), min(lng, 180.0), self.precision)
+                    lst = candidates.setdefault(gh, [])
+                    if idx not in lst:
+                        lst.append(idx)
+                    lng += dlng
+                lat += dlat
+        for gh, idxs in candidates.items():
+            clat_lo, clat_hi, clng_lo, clng_hi = geohash_bounds(gh)
+            corners = ((clat_lo, clng_lo), (clat_lo, clng_hi), (clat_hi, clng_lo), (clat_hi, clng_hi))
+            boundary: List[int] = []
+            inside: Optional[int] = None
+            for i in idxs:
+                z = self.zones[i]
+                if z.edge_hits_box(clat_lo, clat_hi, clng_lo, clng_hi):
+                    boundary.append(i)
+                elif inside is None and all(z.contains(la, ln) for la, ln in corners):
+                    # No boundary crosses the cell and its corners are inside
+                    inside = i
+            if boundary:
+                self.cells[gh] = tuple(boundary + ([inside] if inside is not None else []))
+            elif inside is not None:
+                self.cells[gh] = self.zones[inside].name
+
+    def lookup(self, lat: float, lng: float) -> Optional[str]:
+        entry = self.cells.get(encode_geohash(lat, lng, self.precision))
+        if entry is None:
+            return None
+        if isinstance(entry, str):
+            return entry
+        for i in entry:
+            if self.zones[i].contains(lat, lng):
+                return self.zones[i].name
+        return None
+
+    def centroid(self, name: str) -> Optional[Tuple[float, float]]:
+        """Rough (lat, lng) centre of a zone's bounding box."""
+        key = name.strip().lower()
+        for z in self.zones:
+            if z.name.lower() == key:
+                lat_lo, lat_hi, lng_lo, lng_hi = z.bbox
+                return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+        return None
+
+
+def _to_rings(coords: list) -> List[Ring]:
+    rings: List[Ring] = []
+    for ring in coords:
+        pts = [(float(p[0]), float(p[1])) for p in ring]
+        if pts and pts[0] != pts[-1]:
+            pts.append(pts[0])
+        if len(pts) >= 4:
+            rings.append(pts)
+    return rings
+
+
+def load_zones(path: str) -> List[_Zone]:
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    features = data.get("features") if isinstance(data, dict) else None
+    zones: List[_Zone] = []
+    for feat in features or []:
+        props = feat.get("properties") or {}
+        name = props.get("zone") or props.get("name")
+        geom = feat.get("geometry") or {}
+        gtype = geom.get("type")
+        coords = geom.get("coordinates") or []
+        if not name:
+            continue
+        if gtype == "Polygon":
+            polys = [_to_rings(coords)]
+        elif gtype == "MultiPolygon":
+            polys = [_to_rings(p) for p in coords]
+        else:
+            continue
+        polys = [p for p in polys if p]
+        if polys:
+            zones.append(_Zone(str(name), polys))
+    return zones
+
+
+_index: Optional[ZoneIndex] = None
+
+
+def reload_index(path: Optional[str] = None) -> ZoneIndex:
+    global _index
+    path = path or settings.ZONES_GEOJSON_PATH
+    zones: List[_Zone] = []
+    if path and os.path.exists(path):
+        try:
+            zones = load_zones(path)
+        except Exception as e:
+            logger.warning("zone polygons could not be loaded path=%s error=%s", path, str(e))
+    _index = ZoneIndex(zones, settings.ZONES_GEOHASH_PRECISION)
+    logger.info("zone index built zones=%d cells=%d", len(_index.zones), len(_index.cells))
+    return _index
+
+
+def get_index() -> ZoneIndex:
+    if _index is None:
+        return reload_index()
+    return _index
+
+
+def zone_for_point(lat: float, lng: float) -> Optional[str]:
+    return get_index().lookup(lat, lng)
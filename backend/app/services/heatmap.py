@@ -0,0 +1,119 @@
+"""Streaming crowd-density aggregation from location shares and zone mentions.
+
+Every observation is bucketed into a geohash cell and counted in 5/15/60
+minute sliding windows kept in memory. A background loop pushes per-cell
+deltas over the WebSocket and periodically writes snapshots to SQLite.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlmodel import Session
+from ..config import get_settings
+from ..database import engine
+from ..models import HeatmapSnapshot
+from ..websocket_manager import manager
+from .geo import encode_geohash, geohash_center, get_index
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.heatmap")
+
+WINDOWS_MINUTES = (5, 15, 60)
+
+
+class HeatmapAggregator:
+    """Not thread-safe: record, expire and snapshot only from the event loop."""
+
+    def __init__(self, precision: int, windows: Tuple[int, ...] = WINDOWS_MINUTES) -> None:
+        self.precision = precision
+        self.windows = windows
+        self._events: Dict[int, Deque[Tuple[float, str]]] = {w: deque() for w in windows}
+        self._counts: Dict[int, Dict[str, int]] = {w: {} for w in windows}
+
+    def record_point(self, lat: float, lng: float, ts: Optional[float] = None) -> str:
+        cell = encode_geohash(lat, lng, self.precision)
+        self._add(cell, ts or time.time())
+        return cell
+
+    def record_zone(self, zone: str, ts: Optional[float] = None) -> Optional[str]:
+        """Count a zone mention at the zone's centre (needs zone polygons)."""
+        c = get_index().centroid(zone)
+        if not c:
+            return None
+        return self.record_point(c[0], c[1], ts)
+
+    def _add(self, cell: str, ts: float) -> None:
+        for w in self.windows:
+            self._events[w].append((ts, cell))
+            counts = self._counts[w]
+            counts[cell] = counts.get(cell, 0) + 1
+
+    def _expire(self, now: float) -> None:
+        for w in self.windows:
+            horizon = now - w * 60
+            q = self._events[w]
+            counts = self._counts[w]
+            while q and q[0][0] < horizon:
+                _, cell = q.popleft()
+                n = counts.get(cell, 0) - 1
+                if n > 0:
+                    counts[cell] = n
+                else:
+                    counts.pop(cell, None)
+
+    def snapshot(self, window: int, now: Optional[float] = None) -> Dict[str, int]:
+        self._expire(now or time.time())
+        return dict(self._counts.get(window, {}))
+
+
+aggregator = HeatmapAggregator(settings.HEATMAP_GEOHASH_PRECISION)
+
+
+def cells_payload(counts: Dict[str, int]) -> List[Dict[str, object]]:
+    out = []
+    for cell, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+        lat, lng = geohash_center(cell)
+        out.append({"cell": cell, "lat": round(lat, 6), "lng": round(lng, 6), "count": n})
+    return out
+
+
+def _flush_snapshots(snaps: Dict[int, Dict[str, int]]) -> None:
+    taken_at = datetime.utcnow()
+    with Session(engine) as s:
+        for w, counts in snaps.items():
+            for cell, n in counts.items():
+                s.add(HeatmapSnapshot(taken_at=taken_at, window_minutes=w, cell=cell, count=n))
+        s.commit()
+
+
+async def run_publisher() -> None:
+    """Push per-cell deltas over /ws and flush snapshots to SQLite periodically."""
+    last_sent: Dict[int, Dict[str, int]] = {w: {} for w in aggregator.windows}
+    last_flush = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.HEATMAP_PUSH_SECONDS)
+        try:
+            now = time.time()
+            snaps = {w: aggregator.snapshot(w, now) for w in aggregator.windows}
+            for w, counts in snaps.items():
+                prev = last_sent[w]
+                changed = {c: n for c, n in counts.items() if prev.get(c) != n}
+                removed = [c for c in prev if c not in counts]
+                if changed or removed:
+                    await manager.broadcast({
+                        "type": "heatmap",
+                        "data": {"window": w, "changed": cells_payload(changed), "removed": removed},
+                    })
+                last_sent[w] = counts
+            if time.monotonic() - last_flush >= settings.HEATMAP_FLUSH_SECONDS:
+                last_flush = time.monotonic()
+                if any(snaps.values()):
+                    await asyncio.to_thread(_flush_snapshots, snaps)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("heatmap publish failed error=%s", str(e))
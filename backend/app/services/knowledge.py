@@ -0,0 +1,180 @@
+"""Local knowledge base for festival info questions.
+
+Passages are loaded from ``KNOWLEDGE_DIR``:
+
+- ``*.md`` / ``*.txt``: one passage per blank-line separated paragraph; a
+  ``# heading`` line sets the title of the paragraphs below it.
+- ``*.json``: a list of ``{"question": ..., "answer": ...}`` FAQ entries, or
+  for ``schedule.json`` a list of ``{"time", "event", "venue"}`` entries that
+  also back the festival schedule tool.
+
+Passages are ranked with BM25 over an in-memory inverted index. A strong
+match answers the question directly; weaker matches are handed to the LLM
+as context so it only sees the top few passages.
+"""
+from __future__ import annotations
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from ..config import get_settings
+from .text import STOPWORDS, tokenize
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.knowledge")
+
+_K1 = 1.2
+_B = 0.75
+
+
+class Passage(NamedTuple):
+    source: str
+    title: str
+    text: str
+    answer: str  # what to send when this passage answers a question directly
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+def _schedule_text(entry: Dict[str, Any]) -> str:
+    return f"{entry.get('time', '')} {entry.get('event', '')} at {entry.get('venue', '')}".strip()
+
+
+class KnowledgeIndex:
+    def __init__(self, passages: List[Passage], schedule: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.passages = passages
+        self.schedule = schedule
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+        for i, p in enumerate(passages):
+            terms = _terms(f"{p.title} {p.text}")
+            self.lengths.append(len(terms))
+            tf: Dict[str, int] = {}
+            for t in terms:
+                tf[t] = tf.get(t, 0) + 1
+            for t, n in tf.items():
+                self.postings.setdefault(t, []).append((i, n))
+        n_docs = len(passages)
+        self.avgdl = (sum(self.lengths) / n_docs) if n_docs else 0.0
+        self.idf = {
+            t: math.log(1 + (n_docs - len(ps) + 0.5) / (len(ps) + 0.5))
+            for t, ps in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[float, float, Passage]]:
+        """Top-k passages as (bm25 score, share of query terms matched, passage)."""
+        terms = set(_terms(query))
+        if not terms or not self.passages:
+            return []
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for t in terms:
+            ps = self.postings.get(t)
+            if not ps:
+                continue
+            idf = self.idf[t]
+            for i, tf in ps:
+                norm = tf + _K1 * (1 - _B + _B * self.lengths[i] / self.avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (_K1 + 1) / norm
+                matched[i] = matched.get(i, 0) + 1
+        top = sorted(scores.items(), key=lambda kv: -kv[1])[:k]
+        return [(round(s, 3), matched[i] / len(terms), self.passages[i]) for i, s in top]
+
+    def answer(self, query: str) -> Optional[str]:
+        """A stored answer when the best passage clearly matches the question."""
+        hits = self.search(query, k=3)
+        if not hits:
+            return None
+        score, coverage, p = hits[0]
+        if score < settings.KNOWLEDGE_MIN_SCORE or coverage < 0.6:
+            return None
+        tied = [h[2] for h in hits if h[0] >= score * 0.9]
+        if len(tied) == 1:
+            return p.answer
+        # near-equal entries of one file ("aarti time": morning and evening) are listed together;
+        # across files the question is ambiguous and goes to the LLM with context
+        if all(t.source == p.source for t in tied):
+            return "\n".join(dict.fromkeys(t.answer for t in tied))
+        return None
+
+
+def _load_text(path: str, source: str) -> List[Passage]:
+    with open(path, "r", encoding="utf-8") as fh:
+        blocks = fh.read().split("\n\n")
+    out: List[Passage] = []
+    title = os.path.splitext(source)[0].replace("_", " ")
+    for block in blocks:
+        lines = [ln.strip() for ln in block.strip().splitlines() if ln.strip()]
+        if lines and lines[0].startswith("#"):
+            title = lines.pop(0).lstrip("#").strip()
+        if lines:
+            text = " ".join(lines)
+            out.append(Passage(source, title, text, text))
+    return out
+
+
+def _load_json(path: str, source: str) -> Tuple[List[Passage], Optional[List[Dict[str, Any]]]]:
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    entries = data if isinstance(data, list) else (data.get("entries") or [])
+    if source == "schedule.json":
+        schedule = [e for e in entries if isinstance(e, dict) and e.get("event")]
+        lines = [_schedule_text(e) for e in schedule]
+        passages = [Passage(source, "Festival schedule time", line, line) for line in lines]
+        if lines:
+            # a whole-day passage answers "what is today's schedule"
+            passages.append(Passage(source, "Festival schedule today time timings", "; ".join(lines), "\n".join(lines)))
+        return passages, schedule
+    passages = []
+    for e in entries:
+        if isinstance(e, dict) and e.get("answer"):
+            q = str(e.get("question") or e.get("title") or "")
+            passages.append(Passage(source, q, f"{q} {e['answer']}", str(e["answer"])))
+    return passages, None
+
+
+def load_knowledge(directory: str) -> KnowledgeIndex:
+    passages: List[Passage] = []
+    schedule = None
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith((".md", ".txt")):
+                passages.extend(_load_text(path, name))
+            elif name.endswith(".json"):
+                ps, sched = _load_json(path, name)
+                passages.extend(ps)
+                schedule = sched if sched is not None else schedule
+        except Exception as e:
+            logger.warning("knowledge file skipped path=%s error=%s", path, str(e))
+    return KnowledgeIndex(passages, schedule)
+
+
+_index: Optional[KnowledgeIndex] = None
+
+
+def reload_index(directory: Optional[str] = None) -> KnowledgeIndex:
+    global _index
+    directory = directory or settings.KNOWLEDGE_DIR
+    if directory and os.path.isdir(directory):
+        _index = load_knowledge(directory)
+        logger.info("knowledge loaded passages=%d terms=%d", len(_index.passages), len(_index.postings))
+    else:
+        _index = KnowledgeIndex([])
+    return _index
+
+
+def get_index() -> KnowledgeIndex:
+    if _index is None:
+        return reload_index()
+    return _index
+
+
+def context_passages(query: str, k: Optional[int] = None) -> List[str]:
+    """Top passages for the LLM prompt."""
+    k = settings.KNOWLEDGE_CONTEXT_PASSAGES if k is None else k
+    return [p.text for score, _, p in get_index().search(query, k) if score > 0]
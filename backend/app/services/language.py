@@ -1,13 +1,88 @@
-from langdetect import detect, DetectorFactory
+"""Language identification for inbound and outbound messages.
 
+Script checks settle most messages without a statistical model: Devanagari
+text is Hindi, Gurmukhi is Punjabi, and short or Hinglish Latin text is
+labelled en/hi directly. Only longer Latin (or other-script) text goes to
+langdetect, whose profiles are loaded on first use. Results are cached on
+the normalized text.
+"""
+from __future__ import annotations
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, Optional
+from ..config import get_settings
+from .text import normalize
 
-# Ensure deterministic results
-DetectorFactory.seed = 0
 
+settings = get_settings()
 
-def detect_language(text: str) -> str:
+_DEVANAGARI_RE = re.compile(r"[\u0900-\u0963\u0966-\u097F]")
+_GURMUKHI_RE = re.compile(r"[\u0A00-\u0A7F]")
+_LATIN_WORD_RE = re.compile(r"[a-z]+")
+
+# Frequent romanized Hindi function words; one of these in a short Latin text means Hinglish
+_HINGLISH_MARKERS = frozenset((
+    "hai", "hain", "nahi", "nahin", "kya", "kaise", "kahan", "kaha", "kab", "kyun", "mera", "meri",
+    "mere", "mujhe", "hum", "aap", "apna", "ko", "ka", "ki", "ke", "se", "mein", "bhai", "ji",
+    "kripya", "krupya", "gaya", "gayi", "gyi", "raha", "rahi", "karo", "kare", "chahiye", "jaldi",
+    "paani", "pani", "rasta", "raasta", "madad", "bachao", "accha", "theek", "thik", "haan", "bahut",
+))
+# Language of the built-in reply templates; outbound template text skips detection
+TEMPLATE_LANGUAGE = "en"
+
+# Below this many letters langdetect is a coin toss; treat plain Latin text as English
+_MIN_LETTERS_FOR_MODEL = 25
+
+_detect_impl: Optional[Callable[[str], str]] = None
+_load_lock = threading.Lock()
+
+
+def _langdetect() -> Callable[[str], str]:
+    """Import langdetect and load its profiles once, on first use."""
+    global _detect_impl
+    if _detect_impl is None:
+        with _load_lock:
+            if _detect_impl is None:
+                from langdetect import DetectorFactory, detect
+                from langdetect.detector_factory import init_factory
+
+                DetectorFactory.seed = 0  # deterministic results
+                init_factory()
+                _detect_impl = detect
+    return _detect_impl
+
+
+def preload() -> None:
+    _langdetect()
+
+
+@lru_cache(maxsize=settings.LANGUAGE_CACHE_SIZE)
+def _detect_normalized(text: str) -> str:
+    if not text.isascii():
+        if _DEVANAGARI_RE.search(text):
+            return "hi"
+        if _GURMUKHI_RE.search(text):
+            return "pa"
+    elif text.startswith("geo:"):
+        return "unknown"
+    else:
+        words = _LATIN_WORD_RE.findall(text)
+        if not words:
+            return "unknown"
+        hits = sum(1 for w in words if w in _HINGLISH_MARKERS)
+        if hits and hits * 5 >= len(words):
+            return "hi"
+        if sum(len(w) for w in words) < _MIN_LETTERS_FOR_MODEL:
+            return "en"
     try:
-        return detect(text)
+        return _langdetect()(text)
     except Exception:
         return "unknown"
 
+
+def detect_language(text: str) -> str:
+    key = normalize(text)
+    if not key:
+        return "unknown"
+    return _detect_normalized(key)
@@ -0,0 +1,230 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters, gauges and fixed-bucket histograms keyed by label values. Updates
+come from the event loop and from threadpool threads (sync endpoints, DB
+commit events), so each metric guards its dicts with its own lock; an
+uncontended acquire is far below the cost of what is being measured. Gauges
+that mirror existing state (queue depths, socket counts) read it through
+callbacks at scrape time instead of being updated on the hot path.
+``render`` produces the body served at ``/metrics``.
+"""
+from __future__ import annotations
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# seconds; covers sub-ms DB commits up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    v = float(v)
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._callbacks: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels: Any) -> None:
+        """Read the value from ``fn`` at scrape time."""
+        self._callbacks[self._key(labels)] = fn
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        for k, fn in self._callbacks.items():
+            try:
+                values[k] = float(fn())
+            except Exception:
+                continue
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][i] += 1
+            series[1][0] += value
+
+    def time(self, **labels: Any) -> "_Timer":
+        return _Timer(self, labels)
+
+    def collect(self) -> List[str]:
+        out: List[str] = []
+        les = [f'le="{b}"' for b in self.buckets] + ['le="+Inf"']
+        with self._lock:
+            series = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            running = 0
+            for le, n in zip(les, counts):
+                running += n
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {running}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {running}")
+        return out
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist: Histogram, labels: Dict[str, Any]) -> None:
+        self.hist = hist
+        self.labels = labels
+        self.t0 = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.hist.observe(time.perf_counter() - self.t0, **self.labels)
+
+
+def timed(hist: Histogram, *, status_label: Optional[str] = None, **labels: Any):
+    """Decorator for async functions; with ``status_label`` also records ok/error."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            status = "error"
+            try:
+                result = await fn(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                extra = {status_label: status} if status_label else {}
+                hist.observe(time.perf_counter() - t0, **labels, **extra)
+
+        return inner
+
+    return wrap
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics.values():
+            lines.extend(m.header())
+            lines.extend(m.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Hot-path metrics; gauges backed by live state are wired up where that state lives
+WEBHOOK_SECONDS = Histogram("simhastha_webhook_seconds", "Inbound webhook handling time", ("status",))
+DB_COMMIT_SECONDS = Histogram("simhastha_db_commit_seconds", "SQLite session commit time")
+LLM_SECONDS = Histogram("simhastha_llm_seconds", "LLM call latency by function", ("function", "status"))
+SAMWAD_SECONDS = Histogram("simhastha_samwad_seconds", "Samwad API call latency", ("endpoint", "status"))
+BACKGROUND_INFLIGHT = Gauge("simhastha_background_tasks", "Background pipeline tasks currently running", ("task",))
+QUEUE_DEPTH = Gauge("simhastha_queue_depth", "Items waiting in in-process queues", ("queue",))
+WS_CONNECTIONS = Gauge("simhastha_ws_connections", "Open dashboard WebSocket connections")
+WS_BROADCAST_SECONDS = Histogram("simhastha_ws_broadcast_seconds", "Time to fan one event out to all sockets")
+WS_SEND_SECONDS = Histogram("simhastha_ws_send_seconds", "Time for one socket to accept one event (send lag)")
+WS_SEND_ERRORS = Counter("simhastha_ws_send_errors_total", "WebSocket sends that failed and dropped the socket")
+
+
+def track_inflight(task: str):
+    """Decorator counting running instances of an async background task."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def inner(*args, **kwargs):
+            BACKGROUND_INFLIGHT.inc(task=task)
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                BACKGROUND_INFLIGHT.dec(task=task)
+
+        return inner
+
+    return wrap
@@ -0,0 +1,96 @@
+"""Keeps the configured chat model loaded and its fixed prompts cached.
+
+A background loop sends a one-token request per fixed system prompt (the
+reply and classifier prompts from the registry) on
+startup and every ``AI_WARM_INTERVAL_SECONDS``. That reloads the model after
+a restart or eviction and keeps the prompt prefixes in the backend's cache.
+Latencies are recorded and ``status()`` feeds the readiness check in /healthz.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from ..config import get_settings
+from . import prompts
+from .ai import chat_completion
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.model_warm")
+
+
+def warm_prompts() -> Tuple[Tuple[str, str], ...]:
+    return tuple((name, prompts.system_prompt(name)) for name in (prompts.REPLY, prompts.CLASSIFIER))
+
+
+class ModelWarmer:
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.ready = False
+        self.cold_load_ms: Optional[float] = None  # latency of the first ping after the model went cold
+        self.latency_ms: Dict[str, float] = {}  # last one-token latency per prompt
+        self.last_ok_at: Optional[datetime] = None
+        self._last_ok = 0.0
+        self.last_error: Optional[str] = None
+        self.failures = 0
+
+    async def ping(self) -> bool:
+        for name, system in warm_prompts():
+            t0 = time.perf_counter()
+            try:
+                await chat_completion([
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": "ping"},
+                ], model=self.model, temperature=0, max_tokens=1, kind="warm")
+            except Exception as e:
+                self.ready = False
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning("model warm ping failed model=%s prompt=%s error=%s", self.model, name, str(e))
+                return False
+            ms = (time.perf_counter() - t0) * 1000
+            if not self.ready and name == prompts.REPLY:
+                self.cold_load_ms = round(ms, 1)
+            self.latency_ms[name] = round(ms, 1)
+        if not self.ready:
+            logger.info("model ready model=%s load_ms=%s", self.model, self.cold_load_ms)
+        self.ready = True
+        self.failures = 0
+        self.last_error = None
+        self.last_ok_at = datetime.utcnow()
+        self._last_ok = time.monotonic()
+        return True
+
+    def is_ready(self) -> bool:
+        # a missed round or two is tolerated; after that the model may have been evicted
+        return self.ready and time.monotonic() - self._last_ok < 3 * settings.AI_WARM_INTERVAL_SECONDS
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "enabled": settings.AI_WARM_ENABLED,
+            "ready": self.is_ready(),
+            "cold_load_ms": self.cold_load_ms,
+            "latency_ms": dict(self.latency_ms),
+            "last_ok_at": self.last_ok_at.isoformat() if self.last_ok_at else None,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+warmer = ModelWarmer(settings.AI_MODEL)
+
+
+def status() -> Dict[str, Any]:
+    return warmer.status()
+
+
+async def run_scheduler() -> None:
+    if not settings.AI_WARM_ENABLED:
+        return
+    while True:
+        await warmer.ping()
+        # retry sooner while the model is not loaded yet
+        await asyncio.sleep(settings.AI_WARM_INTERVAL_SECONDS if warmer.ready else min(10, settings.AI_WARM_INTERVAL_SECONDS))
@@ -0,0 +1,164 @@
+"""Emergency priority lane.
+
+``is_emergency`` is a keyword check over the ``TextFeatures`` the webhook
+already computed (English, romanized Hindi, Devanagari), so no LLM call sits
+between an emergency message and its escalation. The classifier still runs
+on keyword hits afterwards and recategorizes the ticket when it disagrees. Matches go on a dedicated
+queue served by ``PRIORITY_WORKERS`` workers, apart from the BackgroundTasks
+that handle everything else. ``escalate`` sends to all numbers concurrently
+through the shared Samwad client, which ``run`` keeps warm.
+
+Each job records webhook-to-escalation latency (until every send has been
+accepted or failed); ``stats`` reports percentiles against ``PRIORITY_BUDGET_MS``.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from ..config import get_settings
+from . import delivery, samwad
+from .text import TextFeatures
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.priority")
+
+# bare words that also appear in everyday questions ("fire station") are only used in phrases
+_LATIN_PHRASES = (
+    "emergency", "ambulance", "heart attack", "unconscious", "fainted", "not breathing", "bleeding",
+    "drowning", "stampede", "on fire", "caught fire", "catch fire", "fire broke out", "there is a fire",
+    "theres a fire", "injured", "accident", "collapsed", "seizure", "child missing",
+    "missing child", "lost child", "bachao", "behosh", "aag lagi", "aag lag gayi", "doob raha", "doob gaya",
+    "dub raha", "dub gaya", "bhagdad", "khoon", "ghayal", "bachcha kho", "bachha kho", "bacha kho",
+)
+# "emergency exit" and the like are directions questions, not emergencies
+_LATIN_EXCLUDE_RE = re.compile(r"\bemergency (?:exit|number|contact|helpline|ward|gate)s?\b")
+# Indic vowel signs are not \w to re, so word edges are spelled out: no Devanagari letter on either side
+_INDIC_PHRASES = ("बचाओ", "बेहोश", "आग", "आग लगी", "डूब रहा", "डूब रही", "डूब गया", "डूब गई", "भगदड़", "खून",
+                  "घायल", "एम्बुलेंस", "आपातकाल", "बच्चा खो")
+_LATIN_RE = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in _LATIN_PHRASES) + r")\b")
+_INDIC_RE = re.compile(r"(?<![\u0900-\u097F])(?:" + "|".join(re.escape(p) for p in _INDIC_PHRASES) + r")(?![\u0900-\u097F])")
+
+
+def is_emergency(features: TextFeatures) -> bool:
+    t = features.text
+    if not t or features.geo:
+        return False
+    return bool(_LATIN_RE.search(_LATIN_EXCLUDE_RE.sub(" ", t)) or (not t.isascii() and _INDIC_RE.search(t)))
+
+
+def escalation_numbers() -> List[str]:
+    raw = (settings.ESCALATION_NUMBERS or "").strip()
+    return [n.strip() for n in raw.split(",") if n.strip()] if raw else []
+
+
+async def escalate(numbers: List[str], message: str, *, zone: Optional[str] = None) -> List[str]:
+    """Send to every number at once; returns the numbers whose send failed."""
+
+    async def one(pn: str) -> bool:
+        try:
+            resp = await delivery.send(pn, message, zone=zone)
+            return (resp or {}).get("status") == "ok"
+        except Exception:
+            return False
+
+    results = await asyncio.gather(*(one(pn) for pn in numbers))
+    return [pn for pn, ok in zip(numbers, results) if not ok]
+
+
+class EmergencyJob:
+    __slots__ = ("phone_number", "body", "features", "received_at", "dispatch_ms", "feedback_id", "logged")
+
+    def __init__(self, phone_number: str, body: str, features: TextFeatures, received_at: float) -> None:
+        self.phone_number = phone_number
+        self.body = body
+        self.features = features
+        self.received_at = received_at  # time.perf_counter() when the webhook arrived
+        self.dispatch_ms: Optional[float] = None
+        self.feedback_id: Optional[int] = None  # ticket the handler logged
+        self.logged = asyncio.Event()  # set once the handler is done, ticket or not
+
+
+class PriorityLane:
+    def __init__(self) -> None:
+        self._queue: Optional["asyncio.Queue[EmergencyJob]"] = None
+        self.handler: Optional[Callable[[EmergencyJob], Awaitable[None]]] = None
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self.detected = 0
+        self.handled = 0
+        self.failed = 0
+        self.over_budget = 0
+
+    def _q(self) -> "asyncio.Queue[EmergencyJob]":
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def submit(self, job: EmergencyJob) -> None:
+        self.detected += 1
+        self._q().put_nowait(job)
+
+    def mark_dispatched(self, job: EmergencyJob) -> None:
+        job.dispatch_ms = (time.perf_counter() - job.received_at) * 1000
+        self._latencies.append(job.dispatch_ms)
+        if job.dispatch_ms > settings.PRIORITY_BUDGET_MS:
+            self.over_budget += 1
+            logger.warning("escalation over budget phone=%s ms=%.0f", job.phone_number, job.dispatch_ms)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        lat = sorted(self._latencies)
+
+        def pct(p: float) -> Optional[float]:
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 1) if lat else None
+
+        return {
+            "detected": self.detected,
+            "handled": self.handled,
+            "failed": self.failed,
+            "queued": self.depth(),
+            "budget_ms": settings.PRIORITY_BUDGET_MS,
+            "over_budget": self.over_budget,
+            "dispatch_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": lat[-1] if lat else None,
+                            "samples": len(lat)},
+        }
+
+    async def _worker(self, n: int) -> None:
+        q = self._q()
+        while True:
+            job = await q.get()
+            try:
+                if self.handler is not None:
+                    await self.handler(job)
+                self.handled += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.warning("priority worker=%d phone=%s failed error=%s", n, job.phone_number, str(e))
+            finally:
+                job.logged.set()
+                q.task_done()
+
+    async def _keep_warm(self) -> None:
+        while True:
+            await samwad.prewarm()
+            await asyncio.sleep(settings.SAMWAD_PREWARM_SECONDS)
+
+    async def run(self) -> None:
+        tasks = [asyncio.create_task(self._worker(n)) for n in range(max(1, settings.PRIORITY_WORKERS))]
+        if settings.SAMWAD_PREWARM_SECONDS > 0:
+            tasks.append(asyncio.create_task(self._keep_warm()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
+lane = PriorityLane()
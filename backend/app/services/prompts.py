@@ -0,0 +1,80 @@
+"""Prompt registry for the LLM calls.
+
+Every system prompt is built once and reused as the same string object, and
+the variable part of each request goes last in the user message. Requests of
+one kind therefore share a byte-identical prefix the model backend can serve
+from its prompt cache instead of re-processing it.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Dict, List, Optional
+from ..config import get_settings
+
+
+settings = get_settings()
+
+REPLY = "reply"
+CLASSIFIER = "classifier"
+TRANSLATOR = "translator"
+SUMMARIZER = "summarizer"
+SUMMARY_UPDATER = "summary_updater"
+
+INTENTS = ("sanitation", "emergency", "info", "guidance", "directions", "lost_found", "other")
+
+_SYSTEM: Dict[str, str] = {
+    CLASSIFIER: (
+        "You are an intent classifier for civic festival support. "
+        "Return STRICT JSON with fields: intent (one of: sanitation, emergency, info, guidance, directions, lost_found, other), "
+        "confidence (0..1), reason (short). No extra text."
+        "Interpret synonyms and Hindi phrases, e.g., 'kho gaya/kho gyi' => lost_found; 'how to reach/route/raasta' => guidance/directions."
+    ),
+    TRANSLATOR: (
+        "You are a translation assistant. Translate the user's message to the target language faithfully, "
+        "preserving meaning and tone. Return only the translated text."
+    ),
+    SUMMARIZER: (
+        "You summarize short WhatsApp conversations succinctly (2-4 sentences). "
+        "Mention key issues, requests, actions, and current status."
+    ),
+    SUMMARY_UPDATER: (
+        "You maintain a running summary of a WhatsApp conversation. Given the previous summary and the "
+        "messages that followed it, return the updated summary succinctly (2-4 sentences). "
+        "Mention key issues, requests, actions, and current status; drop details that are resolved or superseded."
+    ),
+}
+
+# Fixed lead-in of each user message; the per-call text is appended after it
+USER_PREFIX: Dict[str, str] = {
+    REPLY: "",
+    CLASSIFIER: "Classify this message: ",
+    TRANSLATOR: "Target language: ",
+    SUMMARIZER: "Summarize this chat briefly:\n\n",
+    SUMMARY_UPDATER: "Previous summary:\n",
+}
+
+# Lead-in for knowledge-base passages given to the reply prompt
+CONTEXT_LEAD = "Festival notes (use them if relevant, do not add other facts):\n"
+
+
+@lru_cache(maxsize=16)
+def reply_prompt(company: Optional[str] = None) -> str:
+    name = company or settings.APP_NAME
+    return (
+        "You are a highly engaging, positive festival assistant for Simhastha. "
+        f"Greet users warmly and keep responses concise. You represent {name}. "
+        "Understand intent (sanitation/emergency/info/guidance) and provide clear, empathetic replies. "
+        "Do not invent facts. If you need to escalate, say you will inform the authorities."
+    )
+
+
+def system_prompt(name: str, *, company: Optional[str] = None) -> str:
+    if name == REPLY:
+        return reply_prompt(company or settings.APP_NAME)
+    return _SYSTEM[name]
+
+
+def build_messages(name: str, user_text: str, *, company: Optional[str] = None) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt(name, company=company)},
+        {"role": "user", "content": USER_PREFIX[name] + user_text},
+    ]
@@ -0,0 +1,143 @@
+"""Per-phone flood control in front of the AI stages.
+
+Each phone has a token bucket (``RATE_LIMIT_BURST`` tokens, refilled at
+``RATE_LIMIT_PER_MINUTE``). A message that finds a token is processed
+normally. Past that, messages are coalesced: their text is buffered and one
+deferred flush hands the concatenated text to ``processor`` when the next
+token is due, so a burst of 20 messages costs one classification instead of
+20. Once the buffer holds ``RATE_LIMIT_COALESCE_MAX_CHARS`` further messages
+are shed (stored by the caller, never processed). Buckets live in a bounded
+LRU; all state is in memory and only touched from the event loop.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from ..config import get_settings
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.ratelimit")
+
+PROCESS = "process"
+COALESCED = "coalesced"
+SHED = "shed"
+
+Processor = Callable[[str, str, int], Awaitable[None]]  # (phone, merged text, message count)
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "pending", "pending_chars", "flush")
+
+    def __init__(self, now: float) -> None:
+        self.tokens = float(settings.RATE_LIMIT_BURST)
+        self.updated = now
+        self.pending: List[str] = []
+        self.pending_chars = 0
+        self.flush: Optional[asyncio.Task] = None
+
+
+class PhoneLimiter:
+    def __init__(self) -> None:
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._running: Set[asyncio.Task] = set()  # strong refs until each flush finishes
+        self._waiting = 0  # flushes still in their delay; kept as a count so /metrics never scans buckets
+        self._wake = asyncio.Event()  # set by drain() to cut every flush delay short
+        self.processor: Optional[Processor] = None
+        self.processed = 0
+        self.coalesced = 0
+        self.shed = 0
+        self.flushes = 0
+
+    @property
+    def rate(self) -> float:
+        return settings.RATE_LIMIT_PER_MINUTE / 60.0
+
+    def _bucket(self, phone: str, now: float) -> _Bucket:
+        b = self._buckets.get(phone)
+        if b is None:
+            b = self._buckets[phone] = _Bucket(now)
+            if len(self._buckets) > settings.RATE_LIMIT_MAX_PHONES:
+                # evict the least recently seen idle phone; ones with a pending flush stay
+                for key, old in self._buckets.items():
+                    if old.flush is None and key != phone:
+                        del self._buckets[key]
+                        break
+        else:
+            self._buckets.move_to_end(phone)
+            b.tokens = min(float(settings.RATE_LIMIT_BURST), b.tokens + (now - b.updated) * self.rate)
+            b.updated = now
+        return b
+
+    def admit(self, phone: str, text: str) -> str:
+        """PROCESS, COALESCED (buffered for a deferred flush) or SHED."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return PROCESS
+        now = time.monotonic()
+        b = self._bucket(phone, now)
+        if not b.pending and b.tokens >= 1:
+            b.tokens -= 1
+            self.processed += 1
+            return PROCESS
+        if b.pending_chars + len(text) > settings.RATE_LIMIT_COALESCE_MAX_CHARS:
+            self.shed += 1
+            return SHED
+        b.pending.append(text)
+        b.pending_chars += len(text)
+        self.coalesced += 1
+        if b.flush is None:
+            delay = max(0.0, (1 - b.tokens) / self.rate) if self.rate > 0 else 60.0
+            b.flush = asyncio.get_running_loop().create_task(self._flush(phone, b, delay))
+            self._waiting += 1
+            self._running.add(b.flush)
+            b.flush.add_done_callback(self._running.discard)
+        return COALESCED
+
+    async def _flush(self, phone: str, b: _Bucket, delay: float) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            b.flush = None
+            self._waiting -= 1
+        texts, b.pending, b.pending_chars = b.pending, [], 0
+        now = time.monotonic()
+        b.tokens = max(0.0, min(float(settings.RATE_LIMIT_BURST), b.tokens + (now - b.updated) * self.rate) - 1)
+        b.updated = now
+        if not texts or self.processor is None:
+            return
+        self.flushes += 1
+        try:
+            await self.processor(phone, "\n".join(texts), len(texts))
+        except Exception as e:
+            logger.warning("coalesced flush failed phone=%s error=%s", phone, str(e))
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Flush every held-back buffer now and wait (up to ``timeout``) for the flushes."""
+        self._wake.set()
+        if self._running:
+            _done, pending = await asyncio.wait(set(self._running), timeout=timeout)
+            if pending:
+                logger.warning("shutdown left %d coalesced flushes unfinished", len(pending))
+
+    def depth(self) -> int:
+        return self._waiting
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.RATE_LIMIT_ENABLED,
+            "per_minute": settings.RATE_LIMIT_PER_MINUTE,
+            "burst": settings.RATE_LIMIT_BURST,
+            "processed": self.processed,
+            "coalesced": self.coalesced,
+            "shed": self.shed,
+            "flushes": self.flushes,
+            "phones": len(self._buckets),
+            "pending_flushes": self.depth(),
+        }
+
+
+limiter = PhoneLimiter()
@@ -0,0 +1,232 @@
+"""Near-duplicate cache for LLM replies.
+
+Questions are keyed by their canonical content words (lower-cased,
+punctuation and stopwords dropped, Hinglish mapped to English) and sketched with a 64-bit SimHash of
+character 3-grams and words. A lookup searches only entries of the same
+language: sketches within ``REPLY_CACHE_MAX_DISTANCE`` bits are candidates,
+and one is served when its words overlap at least ``REPLY_CACHE_MIN_OVERLAP``
+(Jaccard) and it names the same numbers. New LLM replies are stored as pending; with
+``REPLY_CACHE_REQUIRE_APPROVAL`` only replies an admin approved are served.
+Entries expire after ``REPLY_CACHE_TTL_SECONDS`` (their rows are deleted
+too) and are kept in SQLite so approvals survive restarts. All methods run on
+the event loop; the admin endpoints are async so they never race it.
+"""
+from __future__ import annotations
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from ..config import get_settings
+from ..database import engine
+from ..models import CachedReply
+from .text import STOPWORDS, tokenize
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.reply_cache")
+
+_MASK = (1 << 64) - 1
+
+
+def cache_key(text: str) -> str:
+    tokens = tokenize(text)
+    return " ".join(t for t in tokens if t not in STOPWORDS) or " ".join(tokens)
+
+
+def simhash(key: str) -> int:
+    """64-bit SimHash over character 3-grams plus whole words (words weighted twice)."""
+    padded = f" {key} "
+    feats = [hash(padded[i:i + 3]) & _MASK for i in range(max(1, len(padded) - 2))]
+    feats += [hash(w) & _MASK for w in key.split()] * 2
+    half = len(feats) / 2
+    out = 0
+    # column-wise bit counts over the binary strings, most significant bit first
+    for bit, column in enumerate(zip(*(format(h, "064b") for h in feats))):
+        if column.count("1") > half:
+            out |= 1 << (63 - bit)
+    return out
+
+
+def _similar(a: frozenset, b: frozenset) -> float:
+    # numbers name places ("gate 2" vs "gate 3"); never treat those as paraphrases
+    if {t for t in a if any(c.isdigit() for c in t)} != {t for t in b if any(c.isdigit() for c in t)}:
+        return 0.0
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class _Entry:
+    __slots__ = ("id", "language", "key", "words", "sketch", "reply", "approved", "created_at", "hits")
+
+    def __init__(self, row: CachedReply) -> None:
+        self.id = row.id
+        self.language = row.language
+        self.key = row.text_key
+        self.words = frozenset(row.text_key.split())
+        self.sketch = simhash(row.text_key)  # str hashes are per-process; recompute on load
+        self.reply = row.reply
+        self.approved = row.approved
+        self.created_at = row.created_at
+        self.hits = 0
+
+
+class ReplyCache:
+    def __init__(self) -> None:
+        self._by_lang: Dict[str, List[_Entry]] = {}
+        self._by_id: Dict[int, _Entry] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            horizon = datetime.utcnow() - timedelta(seconds=settings.REPLY_CACHE_TTL_SECONDS)
+            try:
+                with Session(engine) as s:
+                    s.exec(delete(CachedReply).where(CachedReply.created_at < horizon))
+                    s.commit()
+                    for row in s.exec(select(CachedReply)):
+                        self._add(_Entry(row))
+            except Exception as e:
+                logger.warning("reply cache load failed error=%s", str(e))
+            self._loaded = True
+
+    def _add(self, e: _Entry) -> None:
+        self._by_lang.setdefault(e.language, []).append(e)
+        self._by_id[e.id] = e
+
+    def _drop(self, e: _Entry) -> None:
+        self._by_id.pop(e.id, None)
+        bucket = self._by_lang.get(e.language, [])
+        if e in bucket:
+            bucket.remove(e)
+
+    def _expire(self, stale: List[_Entry]) -> None:
+        """Drop expired entries and their rows, so they stop counting toward the size cap."""
+        for e in stale:
+            self._drop(e)
+        try:
+            with Session(engine) as s:
+                s.exec(delete(CachedReply).where(CachedReply.id.in_([e.id for e in stale])))
+                s.commit()
+        except Exception as e:
+            logger.warning("reply cache expiry failed error=%s", str(e))
+
+    def _nearest(self, key: str, language: str) -> Optional[_Entry]:
+        bucket = self._by_lang.get(language)
+        if not bucket:
+            return None
+        horizon = datetime.utcnow() - timedelta(seconds=settings.REPLY_CACHE_TTL_SECONDS)
+        sketch = simhash(key)
+        words = frozenset(key.split())
+        best, best_score = None, (settings.REPLY_CACHE_MIN_OVERLAP, False)
+        stale = []
+        for e in bucket:
+            if e.created_at < horizon:
+                stale.append(e)
+                continue
+            # the sketch is the cheap prefilter; word overlap confirms the match
+            if e.key != key and bin(e.sketch ^ sketch).count("1") > settings.REPLY_CACHE_MAX_DISTANCE:
+                continue
+            score = (_similar(words, e.words), e.approved)  # approved entries win ties
+            if score >= best_score:
+                best, best_score = e, score
+        if stale:
+            self._expire(stale)
+        return best
+
+    def lookup(self, text: str, language: Optional[str]) -> Optional[str]:
+        """Cached reply for a near-duplicate question, or None."""
+        key = cache_key(text)
+        if not key:
+            return None
+        self._ensure_loaded()
+        e = self._nearest(key, language or "unknown")
+        if e is None:
+            return None
+        e.hits += 1  # pending entries count demand too, so admins see what to approve
+        if settings.REPLY_CACHE_REQUIRE_APPROVAL and not e.approved:
+            return None
+        return e.reply
+
+    def store(self, text: str, language: Optional[str], reply: str) -> None:
+        key = cache_key(text)
+        if not key or not reply:
+            return
+        self._ensure_loaded()
+        language = language or "unknown"
+        if self._nearest(key, language) is not None:
+            return
+        bucket = self._by_lang.get(language, [])
+        try:
+            with Session(engine) as s:
+                if len(bucket) >= settings.REPLY_CACHE_MAX_ENTRIES:
+                    # evict the oldest pending entry of this language; approved ones stay
+                    old = next((e for e in bucket if not e.approved), None)
+                    if old is None:
+                        return
+                    row = s.get(CachedReply, old.id)
+                    if row:
+                        s.delete(row)
+                    self._drop(old)
+                row = CachedReply(language=language, text_key=key, reply=reply,
+                                  approved=not settings.REPLY_CACHE_REQUIRE_APPROVAL)
+                s.add(row)
+                s.commit()
+                s.refresh(row)
+            self._add(_Entry(row))
+        except Exception as e:
+            logger.warning("reply cache store failed error=%s", str(e))
+
+    def entries(self, approved: Optional[bool] = None) -> List[_Entry]:
+        self._ensure_loaded()
+        horizon = datetime.utcnow() - timedelta(seconds=settings.REPLY_CACHE_TTL_SECONDS)
+        stale = [e for e in self._by_id.values() if e.created_at < horizon]
+        if stale:
+            self._expire(stale)
+        out = [e for e in self._by_id.values() if approved is None or e.approved == approved]
+        return sorted(out, key=lambda e: (-e.hits, e.id))
+
+    def decide(self, entry_id: int, approve: bool, reply: Optional[str] = None) -> Optional[_Entry]:
+        """Approve (optionally with an edited reply) or reject and remove an entry."""
+        self._ensure_loaded()
+        e = self._by_id.get(entry_id)
+        with Session(engine) as s:
+            row = s.get(CachedReply, entry_id)
+            if row is None or e is None:
+                return None
+            if not approve:
+                s.delete(row)
+                s.commit()
+                self._drop(e)
+                return e
+            row.approved = True
+            if reply:
+                row.reply = reply
+            s.add(row)
+            s.commit()
+        e.approved = True
+        e.reply = reply or e.reply
+        return e
+
+    def invalidate(self, language: Optional[str] = None) -> int:
+        """Remove every entry, or those of one language."""
+        self._ensure_loaded()
+        with Session(engine) as s:
+            q = select(CachedReply)
+            if language:
+                q = q.where(CachedReply.language == language)
+            rows = s.exec(q).all()
+            for row in rows:
+                s.delete(row)
+            s.commit()
+        for e in [e for e in self._by_id.values() if not language or e.language == language]:
+            self._drop(e)
+        return len(rows)
+
+
+cache = ReplyCache()
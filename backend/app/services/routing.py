@@ -0,0 +1,278 @@
+"""Offline walking routes over the venue graph.
+
+The graph is read from a JSON file (settings.ROUTE_GRAPH_PATH):
+
+    {"nodes": [{"id": "gate-2", "name": "Gate 2", "kind": "gate",
+                "lat": 23.18, "lng": 75.77, "aliases": ["gate no 2"]}, ...],
+     "edges": [{"from": "gate-2", "to": "ghat-3", "meters": 350,
+                "via": "Ram Ghat Road", "oneway": false}, ...]}
+
+All-pairs shortest paths are precomputed into a next-hop table (Dijkstra from
+every node), so answering a route is a walk along at most a few dozen hops.
+Admins can close edges during crowd control; the tables are rebuilt and
+swapped in atomically so concurrent readers never see a half-built state.
+Closures are directed: closing a two-way edge closes both directions, while
+separate one-way edges (A->B and B->A) are closed independently.
+"""
+from __future__ import annotations
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from ..config import get_settings
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.routing")
+
+WALK_METERS_PER_MINUTE = 60  # slow crowd pace
+_WS_RE = re.compile(r"[\s_-]+")
+
+
+def _norm(name: str) -> str:
+    return _WS_RE.sub(" ", (name or "").strip().lower())
+
+
+class _Edge:
+    __slots__ = ("to", "meters", "via")
+
+    def __init__(self, to: int, meters: float, via: Optional[str]) -> None:
+        self.to = to
+        self.meters = meters
+        self.via = via
+
+
+Arc = Tuple[int, int]  # directed (from, to)
+
+
+class _Tables:
+    """Closures plus the routing tables computed for them; replaced as a unit, never mutated."""
+    __slots__ = ("closed", "next_hop", "dist")
+
+    def __init__(self, closed: FrozenSet[Arc], next_hop: List[List[int]], dist: List[List[float]]) -> None:
+        self.closed = closed
+        # next_hop[src][dst] -> index of the edge in adj[src] to take, -1 if unreachable
+        self.next_hop = next_hop
+        self.dist = dist
+
+
+class RouteGraph:
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> None:
+        self.nodes = nodes
+        self.index: Dict[str, int] = {}
+        for i, n in enumerate(nodes):
+            for key in [n["id"], n.get("name") or n["id"], *(n.get("aliases") or [])]:
+                self.index.setdefault(_norm(str(key)), i)
+        self.adj: List[List[_Edge]] = [[] for _ in nodes]
+        self.edge_keys: Set[Arc] = set()
+        self.two_way: Set[Arc] = set()  # arcs that came from a two-way edge, in both directions
+        self.edge_count = 0
+        for e in edges:
+            a = self.index.get(_norm(str(e.get("from", ""))))
+            b = self.index.get(_norm(str(e.get("to", ""))))
+            if a is None or b is None or a == b:
+                continue
+            meters = float(e.get("meters") or self._haversine(a, b))
+            via = e.get("via")
+            self.adj[a].append(_Edge(b, meters, via))
+            self.edge_keys.add((a, b))
+            if not e.get("oneway"):
+                self.adj[b].append(_Edge(a, meters, via))
+                self.edge_keys.add((b, a))
+                self.two_way.update(((a, b), (b, a)))
+            self.edge_count += 1
+        self._write_lock = threading.Lock()
+        self._tables = self._precompute(frozenset())
+
+    @property
+    def closed(self) -> FrozenSet[Arc]:
+        return self._tables.closed
+
+    def _haversine(self, a: int, b: int) -> float:
+        na, nb = self.nodes[a], self.nodes[b]
+        if None in (na.get("lat"), na.get("lng"), nb.get("lat"), nb.get("lng")):
+            return 100.0
+        return haversine_m(na["lat"], na["lng"], nb["lat"], nb["lng"])
+
+    def _precompute(self, closed: FrozenSet[Arc]) -> _Tables:
+        n = len(self.nodes)
+        next_hop: List[List[int]] = []
+        dist: List[List[float]] = []
+        for src in range(n):
+            d = [math.inf] * n
+            first = [-1] * n  # edge index out of src on the shortest path
+            d[src] = 0.0
+            heap: List[Tuple[float, int]] = [(0.0, src)]
+            while heap:
+                du, u = heapq.heappop(heap)
+                if du > d[u]:
+                    continue
+                for ei, e in enumerate(self.adj[u]):
+                    if (u, e.to) in closed:
+                        continue
+                    nd = du + e.meters
+                    if nd < d[e.to]:
+                        d[e.to] = nd
+                        first[e.to] = ei if u == src else first[u]
+                        heapq.heappush(heap, (nd, e.to))
+            next_hop.append(first)
+            dist.append(d)
+        return _Tables(closed, next_hop, dist)
+
+    def set_closures(self, closed: Set[Arc]) -> None:
+        """Replace all closures; readers keep using the old tables until the new ones are swapped in."""
+        with self._write_lock:
+            self._tables = self._precompute(frozenset(k for k in closed if k in self.edge_keys))
+
+    def set_closed(self, a: int, b: int, closed: bool) -> bool:
+        """Close or reopen a -> b; a two-way edge is closed or reopened in both directions."""
+        if (a, b) not in self.edge_keys:
+            return False
+        keys = {(a, b), (b, a)} if (a, b) in self.two_way else {(a, b)}
+        with self._write_lock:
+            current = self._tables.closed
+            updated = current | keys if closed else current - keys
+            if updated != current:
+                self._tables = self._precompute(updated)
+        return True
+
+    def resolve(self, name: Optional[str]) -> Optional[int]:
+        if not name:
+            return None
+        return self.index.get(_norm(name))
+
+    def nearest(self, lat: float, lng: float) -> Optional[int]:
+        best, best_d = None, math.inf
+        for i, n in enumerate(self.nodes):
+            if n.get("lat") is None or n.get("lng") is None:
+                continue
+            d = haversine_m(lat, lng, n["lat"], n["lng"])
+            if d < best_d:
+                best, best_d = i, d
+        return best
+
+    def route(self, src: int, dst: int) -> Optional[Dict[str, Any]]:
+        t = self._tables  # one snapshot for the whole walk
+        if t.dist[src][dst] == math.inf:
+            return None
+        legs: List[Dict[str, Any]] = []
+        u = src
+        while u != dst:
+            e = self.adj[u][t.next_hop[u][dst]]
+            legs.append({"to": self.nodes[e.to].get("name") or self.nodes[e.to]["id"], "meters": round(e.meters), "via": e.via})
+            u = e.to
+        meters = round(t.dist[src][dst])
+        return {
+            "origin": self.nodes[src].get("name") or self.nodes[src]["id"],
+            "destination": self.nodes[dst].get("name") or self.nodes[dst]["id"],
+            "meters": meters,
+            "minutes": max(1, round(meters / WALK_METERS_PER_MINUTE)),
+            "legs": legs,
+        }
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def route_steps(route: Dict[str, Any]) -> List[str]:
+    steps = [f"Start at {route['origin']}"]
+    for leg in route["legs"]:
+        via = f" via {leg['via']}" if leg.get("via") else ""
+        steps.append(f"Walk ~{leg['meters']}m{via} to {leg['to']}")
+    steps.append(f"Arrive at {route['destination']} (~{route['minutes']} min)")
+    return steps
+
+
+_graph: Optional[RouteGraph] = None
+
+
+def reload_graph(path: Optional[str] = None) -> Optional[RouteGraph]:
+    global _graph
+    path = path or settings.ROUTE_GRAPH_PATH
+    graph = None
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            nodes = [n for n in (data.get("nodes") or []) if n.get("id")]
+            graph = RouteGraph(nodes, data.get("edges") or [])
+            logger.info("route graph loaded nodes=%d edges=%d", len(graph.nodes), graph.edge_count)
+        except Exception as e:
+            logger.warning("route graph could not be loaded path=%s error=%s", path, str(e))
+    # keep closures across reloads where the edge still exists
+    if graph is not None and _graph is not None and _graph.closed:
+        kept: Set[Arc] = set()
+        for a, b in _graph.closed:
+            ia, ib = graph.resolve(_graph.nodes[a]["id"]), graph.resolve(_graph.nodes[b]["id"])
+            if ia is not None and ib is not None:
+                kept.add((ia, ib))
+        graph.set_closures(kept)
+    _graph = graph
+    return graph
+
+
+_loaded = False
+
+
+def get_graph() -> Optional[RouteGraph]:
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        reload_graph()
+    return _graph
+
+
+def find_route(origin: Optional[str], destination: Optional[str], *,
+               point: Optional[Tuple[float, float]] = None) -> Optional[Dict[str, Any]]:
+    """Shortest walking route between two named places (or from a lat/lng point).
+
+    Returns None when there is no graph, a name is unknown or the destination
+    is cut off by closures; callers fall back to generic guidance.
+    """
+    g = get_graph()
+    if g is None or not g.nodes:
+        return None
+    dst = g.resolve(destination)
+    src = g.resolve(origin)
+    if src is None and point is not None:
+        src = g.nearest(*point)
+    if src is None and origin:
+        # zone names that are not graph nodes: start from the node nearest the zone
+        from .geo import get_index
+        c = get_index().centroid(origin)
+        if c:
+            src = g.nearest(*c)
+    if src is None or dst is None:
+        return None
+    return g.route(src, dst)
+
+
+def set_closure(a: str, b: str, closed: bool) -> bool:
+    g = get_graph()
+    if g is None:
+        return False
+    ia, ib = g.resolve(a), g.resolve(b)
+    if ia is None or ib is None:
+        return False
+    return g.set_closed(ia, ib, closed)
+
+
+def list_closures() -> List[Dict[str, str]]:
+    g = get_graph()
+    if g is None:
+        return []
+    out = []
+    for a, b in g.closed:
+        if (a, b) in g.two_way and a > b:
+            continue  # a closed two-way edge is listed once
+        out.append({"from": g.nodes[a]["id"], "to": g.nodes[b]["id"]})
+    return sorted(out, key=lambda x: (x["from"], x["to"]))
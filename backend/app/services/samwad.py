@@ -1,11 +1,66 @@
+import functools
+import logging
+import time
 from typing import Dict, Any, Optional, Tuple
-import httpx
+from urllib.parse import urlparse
 from ..config import get_settings
+from .metrics import SAMWAD_SECONDS
 
 
 settings = get_settings()
+logger = logging.getLogger("simhastha.samwad")
+# httpx is imported on first use so process start does not pay for it
 
+_client = None
 
+
+def get_client():
+    """Shared client so sends reuse pooled keep-alive connections instead of a new TLS handshake each."""
+    global _client
+    if _client is None or _client.is_closed:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            timeout=20,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20,
+                                keepalive_expiry=settings.SAMWAD_KEEPALIVE_SECONDS),
+        )
+    return _client
+
+
+async def prewarm() -> None:
+    """Open (or refresh) a pooled connection to the Samwad host so the next send skips connect + TLS."""
+    u = urlparse(settings.SAMWAD_SEND_URL)
+    try:
+        await get_client().head(f"{u.scheme}://{u.netloc}/", timeout=5)
+    except Exception as e:
+        logger.debug("samwad prewarm failed error=%s", str(e))
+
+
+def _measured(endpoint: str):
+    """Record latency by the ok/error status the senders report (they return errors, not raise)."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            out = await fn(*args, **kwargs)
+            SAMWAD_SECONDS.observe(time.perf_counter() - t0, endpoint=endpoint, status=(out or {}).get("status", "error"))
+            return out
+
+        return inner
+
+    return wrap
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@_measured("sendmessage")
 async def send_via_samwad(
     phone_number: str,
     body: str,
@@ -36,23 +91,23 @@ async def send_via_samwad(
         files = {"image": (fname, content, mime or "application/octet-stream")}
 
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.post(url, data=data, files=files)
-            # Try to parse JSON; if not JSON, return text
-            try:
-                out = resp.json()
-            except Exception:
-                out = {"status_code": resp.status_code, "text": resp.text[:2000]}
-            out.setdefault("status_code", resp.status_code)
-            if resp.is_success:
-                out.setdefault("status", "ok")
-            else:
-                out.setdefault("status", "error")
-            return out
+        resp = await get_client().post(url, data=data, files=files)
+        # Try to parse JSON; if not JSON, return text
+        try:
+            out = resp.json()
+        except Exception:
+            out = {"status_code": resp.status_code, "text": resp.text[:2000]}
+        out.setdefault("status_code", resp.status_code)
+        if resp.is_success:
+            out.setdefault("status", "ok")
+        else:
+            out.setdefault("status", "error")
+        return out
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+@_measured("sendlocation")
 async def send_location_pin(
     phone_number: str,
     latitude: float,
@@ -74,19 +129,19 @@ async def send_location_pin(
     if address:
         data["address"] = address
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.post(url, data=data)
-            try:
-                out = resp.json()
-            except Exception:
-                out = {"status_code": resp.status_code, "text": resp.text[:2000]}
-            out.setdefault("status_code", resp.status_code)
-            out.setdefault("status", "ok" if resp.is_success else "error")
-            return out
+        resp = await get_client().post(url, data=data)
+        try:
+            out = resp.json()
+        except Exception:
+            out = {"status_code": resp.status_code, "text": resp.text[:2000]}
+        out.setdefault("status_code", resp.status_code)
+        out.setdefault("status", "ok" if resp.is_success else "error")
+        return out
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+@_measured("sendlocationrequest")
 async def request_location(
     phone_number: str,
     body: str = "Please share your location",
@@ -95,14 +150,13 @@ async def request_location(
     url = settings.SAMWAD_LOCATION_REQUEST_URL
     payload = {"token": settings.SAMWAD_TOKEN, "phone": str(phone_number), "body": body}
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.post(url, json=payload)
-            try:
-                out = resp.json()
-            except Exception:
-                out = {"status_code": resp.status_code, "text": resp.text[:2000]}
-            out.setdefault("status_code", resp.status_code)
-            out.setdefault("status", "ok" if resp.is_success else "error")
-            return out
+        resp = await get_client().post(url, json=payload)
+        try:
+            out = resp.json()
+        except Exception:
+            out = {"status_code": resp.status_code, "text": resp.text[:2000]}
+        out.setdefault("status_code", resp.status_code)
+        out.setdefault("status", "ok" if resp.is_success else "error")
+        return out
     except Exception as e:
         return {"status": "error", "error": str(e)}
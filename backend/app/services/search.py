@@ -0,0 +1,160 @@
+"""Full-text search over message bodies and feedback text.
+
+SQLite FTS5 tables ``message_fts`` and ``feedback_fts`` index the ``message``
+and ``feedback`` tables as external content; triggers keep them in sync on
+insert, update and delete, and they are backfilled once when first created.
+Queries are ranked with bm25(). If the SQLite build lacks FTS5, search
+falls back to a LIKE scan.
+"""
+from __future__ import annotations
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import DateTime, bindparam, text
+from ..database import engine
+from .text import HINGLISH, STOPWORDS, words
+
+
+logger = logging.getLogger("simhastha.search")
+
+# (fts table, content table, indexed column)
+_INDEXES = (("message_fts", "message", "body"), ("feedback_fts", "feedback", "message"))
+
+# unicode61 treats Indic vowel signs and viramas as separators ("पानी" -> "पान"); keep them in tokens
+_INDIC_MARKS = "".join(
+    chr(c) for lo, hi in ((0x0900, 0x0903), (0x093A, 0x094F), (0x0951, 0x0957), (0x0962, 0x0963),
+                          (0x0A01, 0x0A03), (0x0A3C, 0x0A51), (0x0A70, 0x0A71), (0x0A75, 0x0A75))
+    for c in range(lo, hi + 1)
+)
+_TOKENIZE = f"unicode61 remove_diacritics 2 tokenchars '{_INDIC_MARKS}'"
+
+_available: Optional[bool] = None
+
+
+def _ddl(fts: str, table: str, col: str) -> List[str]:
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({col}, content='{table}', content_rowid='id', "
+        f"tokenize=\"{_TOKENIZE}\")",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); "
+        f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END",
+    ]
+
+
+def init_search_index() -> bool:
+    """Create the FTS tables and triggers if missing; backfill new tables."""
+    global _available
+    try:
+        with engine.begin() as conn:
+            for fts, table, col in _INDEXES:
+                exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"),
+                                      {"n": fts}).first()
+                for stmt in _ddl(fts, table, col):
+                    conn.execute(text(stmt))
+                if not exists:
+                    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+                    logger.info("search index built table=%s", table)
+        _available = True
+    except Exception as e:
+        logger.warning("full-text search unavailable, using LIKE fallback error=%s", str(e))
+        _available = False
+    return _available
+
+
+def fts_query(query: str, match_all: bool = False) -> str:
+    """FTS5 MATCH expression for free text.
+
+    Terms are quoted phrases so user input cannot inject FTS syntax; a
+    Hinglish word also matches its canonical English form ("paani" OR "water").
+    """
+    ws = words(query)
+    terms = [w for w in dict.fromkeys(ws) if w not in STOPWORDS] or list(dict.fromkeys(ws))
+    groups = []
+    for w in terms:
+        alts = dict.fromkeys((w, HINGLISH.get(w, w)))
+        groups.append("(" + " OR ".join(f'"{a}"' for a in alts) + ")" if len(alts) > 1 else f'"{w}"')
+    return (" AND " if match_all else " OR ").join(groups)
+
+
+_DT = {"since": DateTime(), "until": DateTime()}
+
+
+def _run(sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stmt = text(sql).bindparams(*(bindparam(k, type_=v) for k, v in _DT.items() if k in params))
+    with engine.connect() as conn:
+        return [dict(r._mapping) for r in conn.execute(stmt, params)]
+
+
+def search_messages(query: str, *, phone: Optional[str] = None, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None, match_all: bool = False,
+                    limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    where = []
+    if phone:
+        where.append("m.phone_number = :phone")
+        params["phone"] = phone
+    if since:
+        where.append("m.timestamp >= :since")
+        params["since"] = since
+    if until:
+        where.append("m.timestamp < :until")
+        params["until"] = until
+    if _available:
+        params["q"] = fts_query(query, match_all)
+        if not params["q"]:
+            return []
+        sql = (
+            "SELECT m.id, m.phone_number, m.body AS text, m.timestamp, m.is_from_admin, "
+            "bm25(message_fts) AS score, snippet(message_fts, 0, '[', ']', '…', 12) AS snippet "
+            "FROM message_fts JOIN message m ON m.id = message_fts.rowid "
+            "WHERE message_fts MATCH :q" + "".join(f" AND {w}" for w in where) +
+            " ORDER BY score LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["like"] = f"%{query}%"
+        sql = (
+            "SELECT m.id, m.phone_number, m.body AS text, m.timestamp, m.is_from_admin, 0.0 AS score, "
+            "m.body AS snippet FROM message m WHERE m.body LIKE :like" + "".join(f" AND {w}" for w in where) +
+            " ORDER BY m.id DESC LIMIT :limit OFFSET :offset"
+        )
+    return _run(sql, params)
+
+
+def search_feedback(query: str, *, phone: Optional[str] = None, zone: Optional[str] = None,
+                    category: Optional[str] = None, status: Optional[str] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    match_all: bool = False, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    where = []
+    for col, val in (("phone_number", phone), ("zone", zone), ("category", category), ("status", status)):
+        if val:
+            where.append(f"f.{col} = :{col}")
+            params[col] = val
+    if since:
+        where.append("f.created_at >= :since")
+        params["since"] = since
+    if until:
+        where.append("f.created_at < :until")
+        params["until"] = until
+    cols = "f.id, f.phone_number, f.message AS text, f.created_at AS timestamp, f.zone, f.category, f.status"
+    if _available:
+        params["q"] = fts_query(query, match_all)
+        if not params["q"]:
+            return []
+        sql = (
+            f"SELECT {cols}, bm25(feedback_fts) AS score, snippet(feedback_fts, 0, '[', ']', '…', 12) AS snippet "
+            "FROM feedback_fts JOIN feedback f ON f.id = feedback_fts.rowid "
+            "WHERE feedback_fts MATCH :q" + "".join(f" AND {w}" for w in where) +
+            " ORDER BY score LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["like"] = f"%{query}%"
+        sql = (
+            f"SELECT {cols}, 0.0 AS score, f.message AS snippet FROM feedback f WHERE f.message LIKE :like" +
+            "".join(f" AND {w}" for w in where) + " ORDER BY f.id DESC LIMIT :limit OFFSET :offset"
+        )
+    return _run(sql, params)
@@ -0,0 +1,71 @@
+"""Rolling per-conversation summaries.
+
+Each phone has a stored summary and the id of the last message it covers.
+On request, the most recent ``max_messages`` after that watermark are folded
+into the previous summary in fixed-size chunks, so every LLM call sees a
+bounded transcript; an older backlog beyond that is skipped (and logged),
+like the plain "last N messages" summary this replaced. The watermark only
+moves past chunks that produced a summary, and the result says whether the
+fold stopped early. With no new messages the stored summary is returned as is.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import weakref
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from sqlmodel import Session
+from ..config import get_settings
+from ..models import ConversationSummary
+from . import archive
+from .ai import summarize_conversation
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.summaries")
+
+# entries go away once no request holds the lock
+_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def get_summary(session: Session, phone_number: str, max_messages: int = 50) -> Tuple[str, bool, bool]:
+    """Return (summary, cached, partial).
+
+    The last ``max_messages`` new messages are folded in; ``partial`` is set
+    when a chunk failed and later messages are left for the next request.
+    """
+    limit = max(1, max_messages)
+    lock = _locks.get(phone_number)
+    if lock is None:
+        lock = _locks[phone_number] = asyncio.Lock()
+    async with lock:  # concurrent requests for one phone share a single update
+        row = session.get(ConversationSummary, phone_number)
+        watermark = row.last_message_id if row else 0
+        # includes archived days, so compaction never skips unsummarized messages
+        new: List[Dict[str, Any]] = archive.messages_after(watermark, phone=phone_number, limit=limit + 1, newest=True)
+        previous = row.summary if row else ""
+        if not new:
+            return previous, True, False
+        if len(new) > limit:
+            new = new[1:]
+            logger.info("summary backlog skipped phone=%s ids=%d..%d", phone_number, watermark + 1, new[0]["id"] - 1)
+        summary, done = previous, 0
+        step = max(1, settings.SUMMARY_CHUNK_MESSAGES)
+        for i in range(0, len(new), step):
+            chunk = new[i:i + step]
+            pairs = [("admin" if m["is_from_admin"] else "user", m["body"]) for m in chunk]
+            out, _raw = await summarize_conversation(pairs, previous=summary or None)
+            if not out:
+                break  # keep the watermark before this chunk so it is retried
+            summary, done = out, i + len(chunk)
+        partial = done < len(new)
+        if not done:
+            return previous, False, partial
+        row = session.get(ConversationSummary, phone_number) or ConversationSummary(phone_number=phone_number)
+        row.summary = summary
+        row.last_message_id = new[done - 1]["id"]
+        row.message_count += done
+        row.updated_at = datetime.utcnow()
+        session.add(row)
+        session.commit()
+        return summary, False, partial
@@ -0,0 +1,157 @@
+"""Single-pass text analysis for the reply pipeline.
+
+``analyze`` runs once per inbound message and returns a frozen ``TextFeatures``
+with the normalized text, Hinglish tokens mapped to canonical English, and the
+zone / destination / item mentions the pipeline stages need. All patterns are
+compiled once at import.
+"""
+from __future__ import annotations
+import re
+import unicodedata
+from typing import List, NamedTuple, Optional, Tuple
+from .geo import parse_geo
+
+
+# Latin, Devanagari (minus dandas) and Gurmukhi letters/digits incl. combining marks; "9-B" stays one token
+_WORD = r"[0-9A-Za-z\u00C0-\u024F\u0900-\u0963\u0966-\u097F\u0A00-\u0A7F]+"
+_TOKEN_RE = re.compile(_WORD + r"(?:-" + _WORD + r")*")
+# zone labels carry a digit ("4", "9-B", "A12") or are a single letter ("Sector A")
+_LABEL_RE = re.compile(r"[a-z]?\d[a-z0-9-]{0,4}|[a-z]")
+_GLUED_RE = re.compile(r"(zone|sector|gate|ghat)(\d[a-z0-9-]{0,4})")  # "zone4"
+_KINDS = frozenset(("zone", "sector", "gate", "ghat"))
+_KIND_PREFIXES = tuple(_KINDS)
+_FROM_WORDS = frozenset(("from", "se"))
+DIGITS_RE = re.compile(r"(\d{1,3})")
+
+
+def _alternation(phrases: Tuple[str, ...]) -> "re.Pattern[str]":
+    return re.compile("|".join(re.escape(p) for p in phrases))
+
+
+GUIDANCE_PHRASES = (
+    "how to reach", "how do i get", "route", "directions", "raasta", "rasta",
+    "kaise pahu", "kaise pahun", "kaise jaa", "lost my way", "lost way", "rasta bhool",
+)
+ITEM_WORDS = ("wallet", "purse", "phone", "mobile", "bag", "keys", "id card", "aadhaar", "pan card")
+LOST_PHRASES = ("kho gaya", "kho gyi", "gum gaya", "stolen", "missing item")
+
+_GUIDANCE_RE = _alternation(GUIDANCE_PHRASES)
+_ITEM_RE = _alternation(ITEM_WORDS)
+_LOST_RE = _alternation(LOST_PHRASES)
+
+# Romanized Hindi / Devanagari -> canonical token
+HINGLISH: dict = {
+    "raasta": "route", "rasta": "route", "rastaa": "route", "रास्ता": "route",
+    "shauchalay": "toilet", "shauchalaya": "toilet", "sauchalay": "toilet", "शौचालय": "toilet",
+    "paani": "water", "pani": "water", "पानी": "water",
+    "ganda": "dirty", "gandi": "dirty", "gandagi": "dirty", "गंदा": "dirty", "गंदगी": "dirty",
+    "madad": "help", "bachao": "help", "मदद": "help", "बचाओ": "help",
+    "khoya": "lost", "kho": "lost", "gum": "lost", "खोया": "lost", "खो": "lost",
+    "ghaat": "ghat", "घाट": "ghat",
+    "darwaza": "gate", "dwar": "gate", "द्वार": "gate",
+    "bimar": "sick", "beemar": "sick", "बीमार": "sick",
+    "doctor": "doctor", "daaktar": "doctor", "डॉक्टर": "doctor",
+    "kahan": "where", "kaha": "where", "कहाँ": "where", "कहां": "where",
+    "samay": "time", "time": "time", "समय": "time",
+    "aarti": "aarti", "arti": "aarti", "आरती": "aarti",
+}
+
+# Function words (English and romanized Hindi) ignored when matching questions
+STOPWORDS = frozenset((
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "in", "on", "at", "for", "and", "or", "what",
+    "when", "which", "who", "how", "i", "me", "my", "we", "you", "it", "this", "that", "do", "does", "can",
+    "please", "pls", "tell", "about", "there", "any", "where", "get", "find", "hai", "kya", "ka", "ki", "ke",
+    "ko", "se", "mein", "kab", "milega", "milegi", "hoga", "hogi",
+))
+
+
+class TextFeatures(NamedTuple):
+    raw: str
+    text: str  # NFKC, lower-cased, whitespace collapsed
+    tokens: Tuple[str, ...]  # canonical tokens (Hinglish mapped to English)
+    zone: Optional[str]  # first zone/sector/gate/ghat mention, e.g. "Zone 4"
+    origin: Optional[str]  # first zone mention that is not the destination
+    destination: Optional[str]  # "Main Ghat", "Ghat 3", "Gate 2"...
+    items: Tuple[str, ...]  # lost-item keywords
+    hint: Optional[str]  # heuristic intent: guidance | lost_found
+    geo: Optional[Tuple[float, float]]
+
+    def has(self, token: str) -> bool:
+        return token in self.tokens
+
+
+def _fold(text: str) -> str:
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def normalize(text: str) -> str:
+    return _fold(text or "").lower()
+
+
+def words(text: str) -> Tuple[str, ...]:
+    """Normalized tokens as written (no Hinglish mapping)."""
+    return tuple(_TOKEN_RE.findall(normalize(text)))
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Normalized canonical tokens, as in ``TextFeatures.tokens``."""
+    ws = words(text)
+    return tuple(map(HINGLISH.get, ws, ws))
+
+
+def _mentions(tokens: Tuple[str, ...]) -> List[Tuple[str, str, bool]]:
+    """Zone-like mentions as (kind, label, after_from) in one pass over the tokens."""
+    out: List[Tuple[str, str, bool]] = []
+    n = len(tokens)
+    for i, w in enumerate(tokens):
+        if w in _KINDS:
+            if i + 1 < n and _LABEL_RE.fullmatch(tokens[i + 1]):
+                out.append((w, tokens[i + 1].upper(), i > 0 and tokens[i - 1] in _FROM_WORDS))
+        elif w.startswith(_KIND_PREFIXES):
+            m = _GLUED_RE.fullmatch(w)
+            if m:
+                out.append((m.group(1), m.group(2).upper(), i > 0 and tokens[i - 1] in _FROM_WORDS))
+    return out
+
+
+def _destination(t: str, tokens: Tuple[str, ...], mentions: List[Tuple[str, str, bool]]) -> Optional[str]:
+    if "main ghat" in t or (not t.isascii() and any(a == "main" and b == "ghat" for a, b in zip(tokens, tokens[1:]))):
+        return "Main Ghat"
+    candidates = [(k, v) for k, v, after_from in mentions if not after_from]
+    for kind, label in candidates:
+        if kind == "ghat" and label.isdigit() and len(label) <= 2:
+            return f"Ghat {label}"
+    for kind, label in candidates:
+        if kind != "ghat":
+            return f"{kind.title()} {label}"
+    if "ghat" in t or "ghat" in tokens:
+        return "Main Ghat"
+    return None
+
+
+def analyze(body: str) -> TextFeatures:
+    raw = body or ""
+    geo = parse_geo(raw) if raw.lstrip().startswith("geo:") else None
+    t = _fold(raw).lower()
+    if geo:
+        return TextFeatures(raw, t, (), None, None, None, (), None, geo)
+    words = _TOKEN_RE.findall(t)
+    tokens = tuple(map(HINGLISH.get, words, words))
+    zone = origin = dest = None
+    if any(k in t for k in _KIND_PREFIXES) or not _KINDS.isdisjoint(tokens):
+        mentions = _mentions(tokens)
+        names = [f"{k.title()} {v}" for k, v, _ in mentions]
+        dest = _destination(t, tokens, mentions)
+        if names:
+            zone = names[0]
+            # "... from zone 4" names where the pilgrim is, not where they are going
+            origin = next((z for z in names if z != dest), None)
+    items = tuple(_ITEM_RE.findall(t))
+    hint: Optional[str] = None
+    if _GUIDANCE_RE.search(t):
+        hint = "guidance"
+    elif items or _LOST_RE.search(t):
+        hint = "lost_found"
+    return TextFeatures(raw, t, tokens, zone, origin, dest, items, hint, geo)
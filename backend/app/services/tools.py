@@ -0,0 +1,168 @@
+"""Table-driven registry for agent tools.
+
+Each tool is a ``ToolSpec`` built once at import: its handler, risk level,
+public ``params`` description and an argument validator compiled from those
+params. Dispatch is a dict lookup; per-tool call/error/latency counters are
+kept in memory. The public listing is serialized once with an ETag so
+agents can poll it with If-None-Match.
+
+Param types: ``string``, ``int``, ``float``, ``bool``, ``string[]``, or an
+enum like ``new|in_progress|resolved``; a trailing ``?`` makes it optional.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[[Dict[str, Any], Any, bool], Awaitable[Dict[str, Any]]]
+Validator = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class ToolArgError(ValueError):
+    pass
+
+
+def _coerce_string(v: Any) -> str:
+    if isinstance(v, (dict, list)):
+        raise ValueError
+    return str(v)
+
+
+def _coerce_int(v: Any) -> int:
+    if isinstance(v, bool) or (isinstance(v, float) and not v.is_integer()):
+        raise ValueError
+    return int(v)
+
+
+def _coerce_bool(v: Any) -> bool:
+    if isinstance(v, bool):
+        return v
+    if str(v).lower() in ("true", "1", "yes"):
+        return True
+    if str(v).lower() in ("false", "0", "no"):
+        return False
+    raise ValueError
+
+
+def _coerce_string_list(v: Any) -> List[str]:
+    if isinstance(v, str):
+        return [v]
+    if not isinstance(v, (list, tuple)):
+        raise ValueError
+    return [_coerce_string(x) for x in v]
+
+
+_COERCERS: Dict[str, Callable[[Any], Any]] = {
+    "string": _coerce_string,
+    "int": _coerce_int,
+    "float": float,
+    "bool": _coerce_bool,
+    "string[]": _coerce_string_list,
+}
+
+
+def compile_params(params: Dict[str, str]) -> Validator:
+    """Build a validator that checks required args and coerces types.
+
+    Unknown args pass through untouched (some tools accept aliases).
+    """
+    fields: List[Tuple[str, bool, Callable[[Any], Any], str]] = []
+    for name, spec in params.items():
+        optional = spec.endswith("?")
+        kind = spec.rstrip("?")
+        if kind in _COERCERS:
+            coerce = _COERCERS[kind]
+        elif "|" in kind:
+            choices = frozenset(kind.split("|"))
+
+            def coerce(v: Any, _choices=choices) -> str:
+                if v not in _choices:
+                    raise ValueError
+                return v
+        else:
+            raise ValueError(f"unsupported param type {spec!r} for {name}")
+        fields.append((name, optional, coerce, kind))
+
+    def validate(args: Dict[str, Any]) -> Dict[str, Any]:
+        out = dict(args)
+        for name, optional, coerce, kind in fields:
+            v = args.get(name)
+            if v is None or v == "":
+                if not optional:
+                    raise ToolArgError(f"missing {name}")
+                continue
+            try:
+                out[name] = coerce(v)
+            except (TypeError, ValueError):
+                raise ToolArgError(f"{name} must be {kind}")
+        return out
+
+    return validate
+
+
+class ToolSpec:
+    __slots__ = ("name", "risk", "description", "params", "handler", "db_only", "needs_approval",
+                 "validate", "calls", "errors", "total_ms")
+
+    def __init__(self, name: str, risk: str, description: str, params: Dict[str, str], handler: Handler, *,
+                 db_only: bool = False, needs_approval: bool = False) -> None:
+        self.name = name
+        self.risk = risk
+        self.description = description
+        self.params = params
+        self.handler = handler
+        self.db_only = db_only  # only writes rows; batches run these in one transaction
+        self.needs_approval = needs_approval  # routed through Approval unless auto-approved
+        self.validate = compile_params(params)
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def public(self) -> Dict[str, Any]:
+        return {"name": self.name, "risk": self.risk, "description": self.description, "params": self.params}
+
+
+class ToolRegistry:
+    def __init__(self) -> None:
+        self._specs: Dict[str, ToolSpec] = {}
+        self._payload: Optional[bytes] = None
+        self._etag = ""
+
+    def register(self, spec: ToolSpec) -> None:
+        self._specs[spec.name] = spec
+        self._payload = None
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    def names(self, predicate: Callable[[ToolSpec], bool]) -> frozenset:
+        return frozenset(s.name for s in self._specs.values() if predicate(s))
+
+    def listing(self) -> Tuple[bytes, str]:
+        """Serialized public listing and its ETag, computed once per registry change."""
+        if self._payload is None:
+            self._payload = json.dumps([s.public() for s in self._specs.values()]).encode()
+            self._etag = '"' + hashlib.sha1(self._payload).hexdigest()[:16] + '"'
+        return self._payload, self._etag
+
+    async def run(self, spec: ToolSpec, args: Dict[str, Any], session: Any, commit: bool = True) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            return await spec.handler(spec.validate(args), session, commit)
+        except Exception:
+            spec.errors += 1
+            raise
+        finally:
+            spec.calls += 1
+            spec.total_ms += (time.perf_counter() - t0) * 1000
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            s.name: {
+                "calls": s.calls,
+                "errors": s.errors,
+                "avg_ms": round(s.total_ms / s.calls, 2) if s.calls else 0.0,
+            }
+            for s in self._specs.values()
+        }
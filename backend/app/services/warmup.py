@@ -0,0 +1,48 @@
+"""Background warm-up of lazily loaded dependencies.
+
+Startup only imports what serving a request needs; langdetect profiles,
+httpx and the zone/route/knowledge indexes load on first use. This task loads them
+in a worker thread shortly after the server starts accepting connections,
+so a restart is fast and the first real messages do not pay the cost.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from ..config import get_settings
+from . import geo, knowledge, language, routing
+
+
+settings = get_settings()
+logger = logging.getLogger("simhastha.warmup")
+
+
+def _import_httpx() -> None:
+    import httpx  # noqa: F401
+
+
+STEPS = (
+    ("langdetect", language.preload),
+    ("httpx", _import_httpx),
+    ("zones", geo.get_index),
+    ("routes", routing.get_graph),
+    ("knowledge", knowledge.get_index),
+)
+
+
+def warm() -> None:
+    for name, step in STEPS:
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning("warmup step failed step=%s error=%s", name, str(e))
+            continue
+        logger.debug("warmup step=%s ms=%.1f", name, (time.perf_counter() - t0) * 1000)
+
+
+async def run_warmup() -> None:
+    # startup hooks finish before uvicorn binds the socket; wait so we never delay it
+    await asyncio.sleep(settings.WARMUP_DELAY_SECONDS)
+    await asyncio.to_thread(warm)
+    logger.info("warmup done")
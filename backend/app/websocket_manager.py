@@ -1,29 +1,96 @@
-from typing import Set
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import orjson
 from fastapi import WebSocket
+from .config import get_settings
+from .services.metrics import WS_BROADCAST_SECONDS, WS_CONNECTIONS, WS_SEND_ERRORS, WS_SEND_SECONDS
+
+
+settings = get_settings()
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
+    """Fan-out of JSON events to dashboard sockets.
+
+    Every broadcast gets a sequence number ("seq") and is kept in a bounded
+    ring buffer, so a reconnecting client can resume from the last seq it saw.
+    ``epoch`` changes on every process start; a client holding another epoch
+    (or a seq older than the buffer) must resync over HTTP instead.
+    """
+
+    def __init__(self, buffer_size: int = 1000) -> None:
         self.active_connections: Set[WebSocket] = set()
+        self.epoch = format(int(time.time() * 1000), "x")
+        self.seq = 0
+        self._buffer: Deque[Tuple[int, str]] = deque(maxlen=buffer_size)
+        # sockets still receiving hello/replay; live events queue here meanwhile
+        self._joining: Dict[WebSocket, Deque[str]] = {}
 
-    async def connect(self, websocket: WebSocket) -> None:
+    async def connect(self, websocket: WebSocket, resume: Optional[int] = None, epoch: Optional[str] = None) -> None:
+        """Accept, send the hello frame and any replay, then join the live fan-out.
+
+        Events broadcast while those frames are going out are held for this
+        socket and sent right after them, so the client sees every seq once
+        and in order.
+        """
         await websocket.accept()
-        self.active_connections.add(websocket)
+        replay = self.replay_since(resume, epoch) if resume is not None else None
+        hello = {
+            "type": "hello",
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "resync": resume is not None and replay is None,
+            "replayed": len(replay or []),
+        }
+        backlog: Deque[str] = deque()
+        self._joining[websocket] = backlog
+        try:
+            await websocket.send_text(orjson.dumps(hello).decode())
+            for msg in replay or []:
+                await websocket.send_text(msg)
+            while backlog:
+                await websocket.send_text(backlog.popleft())
+            # no await between the empty check and joining, so nothing slips in between
+            self.active_connections.add(websocket)
+        finally:
+            self._joining.pop(websocket, None)
 
     def disconnect(self, websocket: WebSocket) -> None:
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
 
-    async def broadcast(self, message: str) -> None:
+    def replay_since(self, seq: int, epoch: Optional[str]) -> Optional[List[str]]:
+        """Buffered events after ``seq``, or None when they are no longer all available."""
+        if epoch != self.epoch or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self._buffer or self._buffer[0][0] > seq + 1:
+            return None
+        return [msg for s, msg in self._buffer if s > seq]
+
+    async def broadcast(self, event: Dict[str, Any]) -> None:
+        """Number ``event`` (a JSON-ready dict), buffer it for replay and send it to every socket."""
+        self.seq += 1
+        message = orjson.dumps({"seq": self.seq, **event}).decode()
+        self._buffer.append((self.seq, message))
+        for backlog in self._joining.values():
+            backlog.append(message)
         to_remove = []
-        for connection in self.active_connections:
+        t0 = time.perf_counter()
+        for connection in list(self.active_connections):
+            t1 = time.perf_counter()
             try:
                 await connection.send_text(message)
             except Exception:
                 to_remove.append(connection)
+            WS_SEND_SECONDS.observe(time.perf_counter() - t1)
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - t0)
         for c in to_remove:
+            WS_SEND_ERRORS.inc()
             self.disconnect(c)
 
 
-manager = ConnectionManager()
-
+manager = ConnectionManager(settings.WS_REPLAY_BUFFER)
+WS_CONNECTIONS.set_function(lambda: len(manager.active_connections))
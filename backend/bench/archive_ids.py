@@ -0,0 +1,84 @@
+"""Message ids stay unique across hot/cold compaction.
+
+Creates a throwaway database with a pre-AUTOINCREMENT ``message`` table,
+runs init_db (which rebuilds it), fills a few old days, archives all of
+them so the hot table is empty, then inserts again. The new id must be
+above every archived id, and ``messages_after`` must return each id once,
+in order, whole or paged with ``limit``.
+
+Run from backend/:  python -m bench.archive_ids [--rows N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update(SQLITE_PATH=os.path.join(tmp, "bench.db"), ARCHIVE_DIR=os.path.join(tmp, "archive"),
+                      ARCHIVE_HOT_DAYS="1")
+    from sqlmodel import Session, func, select
+    from app.database import engine, init_db
+    from app.models import Message
+    from app.services import archive
+
+    raw = engine.raw_connection()
+    raw.driver_connection.execute(
+        "CREATE TABLE message (id INTEGER NOT NULL PRIMARY KEY, phone_number VARCHAR NOT NULL, "
+        "body VARCHAR NOT NULL, timestamp DATETIME NOT NULL, language VARCHAR, is_from_admin BOOLEAN NOT NULL)"
+    )
+    raw.driver_connection.commit()
+    raw.close()
+    init_db()
+    archive.ensure_id_high_water()
+
+    start = datetime.utcnow() - timedelta(days=6)
+    with Session(engine) as session:
+        for i in range(args.rows):
+            # random hours so late rows make partition id ranges overlap
+            ts = start + timedelta(hours=random.randint(0, 96))
+            session.add(Message(phone_number=f"+91{i % 7}", body=f"m{i}", timestamp=ts, is_from_admin=False))
+        session.commit()
+
+    t0 = time.perf_counter()
+    archive.compact()
+    print(f"compacted {args.rows} rows into {len(archive.partitions())} partitions in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    with Session(engine) as session:
+        assert session.exec(select(func.count(Message.id))).one() == 0, "hot table not empty after full compaction"
+        new = Message(phone_number="+910", body="after compaction", timestamp=datetime.utcnow(), is_from_admin=False)
+        session.add(new)
+        session.commit()
+        session.refresh(new)
+    archived_max = max(e.max_id for e in archive.partitions())
+    assert new.id > archived_max, f"id {new.id} reused (archive holds up to {archived_max})"
+
+    t0 = time.perf_counter()
+    ids = [r["id"] for r in archive.messages_after(0)]
+    full_ms = (time.perf_counter() - t0) * 1000
+    assert ids == sorted(set(ids)) and len(ids) == args.rows + 1, "messages_after returned duplicate or unordered ids"
+    t0 = time.perf_counter()
+    paged, cursor = [], 0
+    while True:
+        page = archive.messages_after(cursor, limit=100)
+        if not page:
+            break
+        paged += [r["id"] for r in page]
+        cursor = page[-1]["id"]
+    assert paged == ids, "paging with limit disagrees with a full read"
+    t0_first = time.perf_counter()
+    archive.messages_after(0, limit=10)
+    print(f"new id {new.id} > archived max {archived_max}")
+    print(f"messages_after: full {full_ms:.0f} ms, paged {(t0_first - t0) * 1000:.0f} ms, "
+          f"first page {(time.perf_counter() - t0_first) * 1000:.1f} ms")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Import cost of the application at process start.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+reports the cumulative import time of every app module and of the heaviest
+third-party packages, plus total wall time. Modules that should stay lazy
+(langdetect, httpx) are flagged if they show up.
+
+Run from backend/:  python -m bench.startup_imports [--top N]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+LAZY = ("langdetect", "httpx")
+
+
+def profile():
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - t0
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cum_us)))
+    return wall, rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    wall, rows = profile()
+    app_rows = [(name, cum) for name, _, cum in rows if name.split(".")[0] == "app"]
+    top_level = {}
+    for name, _, cum in rows:
+        # a package's own row includes everything it pulled in
+        if "." not in name and name != "app":
+            top_level[name] = cum
+
+    print(f"wall time (interpreter + import app.main): {wall * 1000:.0f} ms")
+    print("\napp modules (cumulative ms):")
+    for name, cum in sorted(app_rows, key=lambda r: -r[1]):
+        print(f"  {cum / 1000:8.1f}  {name}")
+    print(f"\ntop {args.top} third-party/stdlib packages (cumulative ms):")
+    for pkg, cum in sorted(top_level.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {cum / 1000:8.1f}  {pkg}")
+    loaded = sorted({name.split(".")[0] for name, _, _ in rows} & set(LAZY))
+    print("\nlazy modules imported at startup:", ", ".join(loaded) or "none")
+
+
+if __name__ == "__main__":
+    main()
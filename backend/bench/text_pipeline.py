@@ -0,0 +1,74 @@
+"""Per-message CPU cost of text handling in the reply pipeline.
+
+Compares the previous inline handling (repeated lower(), keyword scans and
+uncompiled re.search calls spread over the webhook, classify/log and reply
+tasks) with a single services.text.analyze() pass.
+
+Run from backend/:  python -m bench.text_pipeline
+"""
+import re
+import timeit
+
+from app.services.text import analyze
+
+SAMPLES = [
+    "how to reach ghat 3 from zone 4",
+    "Toilet near Sector 9 is very dirty, please clean",
+    "mera wallet kho gaya gate 5 ke paas",
+    "Main ghat kaise jaa sakte hai?",
+    "What time is the evening aarti today?",
+    "emergency! old man fainted near ghat 2",
+    "geo:23.1823,75.7681",
+    "hello",
+]
+
+_zone_re = re.compile(r"\b(zone|sector|gate|ghat)\s*([A-Za-z0-9-]{1,6})\b", re.IGNORECASE)
+
+
+def _extract_zone(text):
+    m = _zone_re.search(text or "")
+    return f"{m.group(1).title()} {m.group(2)}" if m else None
+
+
+def legacy(body):
+    # webhook: geo check + destination scan
+    if body.startswith("geo:"):
+        body.split(":", 1)[1].split(",", 1)
+    t = body.lower()
+    if "main ghat" not in t:
+        re.search(r"ghat\s*(\d{1,2})", t)
+    # classify/log task: zone
+    _extract_zone(body)
+    # reply task: zone, heuristics, two destination blocks
+    _extract_zone(body)
+    t = body.lower()
+    any(k in t for k in ["how to reach", "how do i get", "route", "directions", "raasta", "rasta",
+                         "kaise pahu", "kaise pahun", "kaise jaa", "lost my way", "lost way", "rasta bhool"])
+    any(k in t for k in ["wallet", "purse", "phone", "mobile", "bag", "keys", "id card", "aadhaar", "pan card"])
+    any(k in t for k in ["kho gaya", "kho gyi", "gum gaya", "stolen", "missing item"])
+    t = body.lower()
+    if "main ghat" not in t:
+        re.search(r"ghat\s*(\d{1,2})", t)
+    t2 = body.lower()
+    if "main ghat" not in t2:
+        if not re.search(r"\bghat\s*(\d{1,2})\b", t2):
+            re.search(r"\b(zone|sector|gate)\s*([A-Za-z0-9-]{1,6})\b", t2)
+    # _resolve_etas
+    z = _extract_zone(body)
+    if z:
+        re.search(r"(\d{1,3})", z)
+
+
+def current(body):
+    analyze(body)
+
+
+def main(number=20000):
+    for name, fn in (("legacy", legacy), ("analyze", current)):
+        total = timeit.timeit(lambda: [fn(b) for b in SAMPLES], number=number)
+        per_msg_us = total / (number * len(SAMPLES)) * 1e6
+        print(f"{name:8s} {per_msg_us:7.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
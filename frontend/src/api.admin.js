@@ -96,6 +96,16 @@ export const decideApproval = async (id, approve, actor='admin') => {
   return data
 }
 
+export const decideApprovals = async (ids, approve, actor='admin') => {
+  const { data } = await adminApi.post('/api/admin/approvals/decisions', { ids, approve, actor })
+  return data
+}
+
+export const getApproval = async (id) => {
+  const { data } = await adminApi.get(`/api/admin/approvals/${id}`)
+  return data
+}
+
 // Messages by phone
 export const listMessagesByPhone = async (phone_number) => {
   const { data } = await adminApi.get(`/api/messages/by_phone/${encodeURIComponent(phone_number)}`)
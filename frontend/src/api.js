@@ -9,6 +9,19 @@ export const fetchMessages = async () => {
   return data.messages
 }
 
+// Messages with id > since; follow has_more/last_id until caught up
+export const fetchMessagesSince = async (since, limit = 1000) => {
+  const out = []
+  let cursor = since
+  for (;;) {
+    const { data } = await api.get('/api/messages', { params: { since: cursor, limit } })
+    out.push(...data.messages)
+    cursor = data.last_id ?? cursor
+    if (!data.has_more) break
+  }
+  return { messages: out, lastId: cursor }
+}
+
 export const sendReply = async ({ phone_number, body }) => {
   const { data } = await api.post('/api/reply', { phone_number, body })
   return data
@@ -1,5 +1,5 @@
-import React, { useEffect, useMemo, useState } from 'react'
-import { fetchMessages, sendReply } from '../api'
+import React, { useEffect, useMemo, useRef, useState } from 'react'
+import { fetchMessagesSince, sendReply } from '../api'
 import ConversationList from '../components/ConversationList'
 import ChatWindow from '../components/ChatWindow'
 import MessageInput from '../components/MessageInput'
@@ -13,21 +13,66 @@ export default function Conversations() {
   const [filter, setFilter] = useState('')
   const [context, setContext] = useState(null)
 
+  // Sync cursors: last message id fetched over HTTP, last WS event seq and the server epoch
+  const sync = useRef({ lastId: 0, seq: 0, epoch: null })
+
+  const mergeMessages = (incoming) => {
+    if (!incoming.length) return
+    setMessages((prev) => {
+      const seen = new Set(prev.map((m) => m.id))
+      const fresh = incoming.filter((m) => !seen.has(m.id))
+      return fresh.length ? [...prev, ...fresh] : prev
+    })
+    sync.current.lastId = Math.max(sync.current.lastId, ...incoming.map((m) => m.id))
+  }
+
+  const catchUp = async () => {
+    const { messages: delta } = await fetchMessagesSince(sync.current.lastId)
+    mergeMessages(delta)
+  }
+
   useEffect(() => {
-    fetchMessages().then(setMessages)
-    const ws = new WebSocket(WS_URL)
-    ws.onmessage = (e) => {
-      try {
-        const payload = JSON.parse(e.data)
-        if (payload.type === 'message') {
-          setMessages((prev) => [...prev, payload.data])
-        }
-      } catch {}
+    let ws = null
+    let closed = false
+    let retry = 0
+    let ping = null
+
+    const connect = () => {
+      const { seq, epoch } = sync.current
+      const url = epoch ? `${WS_URL}?resume=${seq}&epoch=${encodeURIComponent(epoch)}` : WS_URL
+      ws = new WebSocket(url)
+      ws.onopen = () => { retry = 0 }
+      ws.onmessage = (e) => {
+        try {
+          const payload = JSON.parse(e.data)
+          if (payload.type === 'hello') {
+            // first connect, server restart or too far behind: fetch what we missed over HTTP
+            if (!sync.current.epoch || payload.resync) catchUp().catch(() => {})
+            sync.current.epoch = payload.epoch
+            if (payload.resync || !sync.current.seq) sync.current.seq = payload.seq
+            return
+          }
+          if (payload.seq) {
+            if (payload.seq <= sync.current.seq) return
+            sync.current.seq = payload.seq
+          }
+          if (payload.type === 'message') {
+            mergeMessages([payload.data])
+          }
+        } catch {}
+      }
+      ws.onclose = () => {
+        if (closed) return
+        retry += 1
+        setTimeout(connect, Math.min(30000, 1000 * 2 ** Math.min(retry, 5)))
+      }
     }
-    const ping = setInterval(() => {
-      try { ws.readyState === 1 && ws.send('ping') } catch {}
+
+    connect()
+    ping = setInterval(() => {
+      try { ws && ws.readyState === 1 && ws.send('ping') } catch {}
     }, 30000)
-    return () => { clearInterval(ping); ws.close() }
+    return () => { closed = true; clearInterval(ping); ws && ws.close() }
   }, [])
 
   const conversations = useMemo(() => {
@@ -53,7 +98,7 @@ export default function Conversations() {
   const handleSend = async (text) => {
     if (!selectedPhone) return
     const saved = await sendReply({ phone_number: selectedPhone, body: text })
-    setMessages((prev) => [...prev, saved])
+    mergeMessages([saved])
   }
 
   useEffect(() => {
@@ -7,18 +7,21 @@ export default function Issues() {
   const [error, setError] = useState('')
   const [filters, setFilters] = useState({ category: '', status: '', zone: '' })
   const [drawer, setDrawer] = useState(null) // selected item for details
+  const [cursor, setCursor] = useState(null) // keyset cursor for the next (older) page
 
-  const load = async () => {
-    setLoading(true)
+  const load = async (more = false) => {
+    if (!more) setLoading(true)
     try {
       const params = new URLSearchParams()
       if (filters.category) params.set('category', filters.category)
       if (filters.status) params.set('status', filters.status)
       if (filters.zone) params.set('zone', filters.zone)
+      if (more && cursor) params.set('cursor', cursor)
       // Reuse endpoint from fallback path
       const url = '/api/tools/feedback/list' + (params.toString() ? ('?' + params.toString()) : '')
       const data = await fetch((import.meta.env.VITE_API_BASE || 'http://localhost:8000') + url).then(r=>r.json())
-      setItems(data.items || [])
+      setItems((prev) => (more ? [...prev, ...(data.items || [])] : (data.items || [])))
+      setCursor(data.next_cursor || null)
     } catch (e) { setError(String(e)) } finally { setLoading(false) }
   }
 
@@ -33,7 +36,7 @@ export default function Issues() {
     const assignee = prompt('Assign to (username/team):')
     if (!assignee) return
     await assignIssue({ feedback_id, assignee, note: 'via admin UI' })
-    alert('Assigned')
+    setItems((prev) => prev.map((r) => (r.id === feedback_id ? { ...r, assignee } : r)))
   }
 
   return (
@@ -54,7 +57,7 @@ export default function Issues() {
           <option value="resolved">resolved</option>
         </select>
         <input className="border rounded px-2 py-1" placeholder="Zone (e.g., Zone 4)" value={filters.zone} onChange={(e)=>setFilters(f=>({...f,zone:e.target.value}))} />
-        <button className="px-2 py-1 border rounded" onClick={load}>Refresh</button>
+        <button className="px-2 py-1 border rounded" onClick={() => load()}>Refresh</button>
       </div>
       {loading && <div>Loading…</div>}
       {error && <div className="text-red-600">{error}</div>}
@@ -67,6 +70,7 @@ export default function Issues() {
               <th className="py-2 pr-2">Category</th>
               <th className="py-2 pr-2">Status</th>
               <th className="py-2 pr-2">Zone</th>
+              <th className="py-2 pr-2">Assignee</th>
               <th className="py-2 pr-2">Created</th>
               <th className="py-2 pr-2">Actions</th>
             </tr>
@@ -79,6 +83,7 @@ export default function Issues() {
                 <td className="py-2 pr-2">{r.category}</td>
                 <td className="py-2 pr-2">{r.status}</td>
                 <td className="py-2 pr-2">{r.zone || '-'}</td>
+                <td className="py-2 pr-2">{r.assignee || '-'}</td>
                 <td className="py-2 pr-2">{new Date(r.created_at).toLocaleString()}</td>
                 <td className="py-2 pr-2 space-x-2">
                   <button className="px-2 py-1 border rounded" onClick={() => onAssign(r.id)}>Assign</button>
@@ -94,6 +99,9 @@ export default function Issues() {
           </tbody>
         </table>
       )}
+      {!loading && cursor && (
+        <button className="mt-3 px-2 py-1 border rounded" onClick={() => load(true)}>Load more</button>
+      )}
       {!loading && items.length === 0 && (
         <div className="text-gray-500">No issues yet. They will appear as the agent logs them.</div>
       )}